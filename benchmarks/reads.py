@@ -0,0 +1,155 @@
+"""Mede as leituras pelo endpoint real `GET /appointments/`, como um servidor WSGI com threads.
+
+Gera `--rows` agendamentos em uma cópia temporária da pasta instance e faz `--requests` requisições:
+* sequencial: uma após a outra, em uma única thread;
+* threads: divididas entre `--threads` threads, como um worker WSGI com várias threads.
+
+O cache de respostas fica desligado (cada requisição executa a view); use `--response-cache` para ligá-lo.
+
+As leituras usam o snapshot em memória de cada partição, que só é refeito a partir do csv quando a
+partição muda (ver DataHandler.snapshot). Por isso:
+* `--write-every N` altera um agendamento a cada N requisições, como se fosse outro worker, forçando
+  a releitura da partição alterada;
+* `--latency-ms` simula um disco lento em cada leitura de csv, ou seja, em cada snapshot refeito.
+A saída mostra quantas leituras de csv cada etapa fez.
+
+Foi por esses números que as views continuam síncronas, sem uma versão async com um pool de I/O:
+com 2000 linhas, 200 requisições fazem 0 leituras de csv (20 com uma escrita a cada 10 requisições),
+e o tempo de cada requisição (~13 ms) é CPU (filtros e serialização), que threads ou corrotinas não
+sobrepõem. A versão async chegou a ser medida com o mesmo cenário e ficou mais lenta que a síncrona
+(1621.8 contra 3605.8 leituras/s), pelo custo de entregar cada leitura ao pool.
+
+Uso:
+    JWT_SECRET_KEY=... python benchmarks/reads.py --rows 2000 --requests 200 --threads 8
+    JWT_SECRET_KEY=... python benchmarks/reads.py --rows 2000 --requests 200 --write-every 10 --latency-ms 5
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token
+from my_app import create_app
+from my_app.utils.data_handler import DataHandler
+from my_app.utils.partitioned_handler import PartitionedDataHandler
+
+## leituras de csv feitas durante a etapa atual
+csv_reads = 0
+csv_reads_lock = threading.Lock()
+
+
+def prepare_instance(app, rows: int) -> str:
+    """Copia as tabelas para um diretório temporário e gera `rows` agendamentos (particionados por mês)."""
+    path = tempfile.mkdtemp(prefix="petshop-bench-")
+    for name in os.listdir(app.instance_path):
+        if name.endswith(".csv"):
+            shutil.copy(os.path.join(app.instance_path, name), path)
+
+    ## tabela no formato antigo (um csv), migrada para partições mensais na primeira leitura
+    with open(os.path.join(path, "appointments.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "pet_id", "service_id", "employee_id", "status", "scheduled_at", "created_at"])
+        for id in range(1, rows + 1):
+            writer.writerow([id, 1, 1, 1, "scheduled", f"2030-{id % 12 + 1:02d}-01T10:00:00.000000", "2025-01-01 10:00:00.000000"])
+
+    app.instance_path = path
+    return path
+
+
+def track_csv_reads(latency: float):
+    """Conta as leituras de csv (snapshots refeitos) e aplica a latência simulada em cada uma."""
+    iter_rows = DataHandler.iter_rows
+
+    def tracked_iter_rows(self, *args, **kwargs):
+        global csv_reads
+        ## as partições são lidas pelo DataHandler; o iter_rows da tabela particionada apenas as percorre
+        if not isinstance(self, PartitionedDataHandler):
+            with csv_reads_lock:
+                csv_reads += 1
+            if latency:
+                time.sleep(latency)
+        yield from iter_rows(self, *args, **kwargs)
+
+    DataHandler.iter_rows = tracked_iter_rows
+
+
+def run(app, headers: dict, requests: int, threads: int, write_every: int = 0) -> tuple:
+    """Retorna (tempo total, leituras de csv)."""
+    global csv_reads
+    counter = iter(range(requests))
+    counter_lock = threading.Lock()
+
+    def worker(count: int):
+        client = app.test_client()
+        for _ in range(count):
+            with counter_lock:
+                index = next(counter)
+            if write_every and index % write_every == write_every - 1:
+                with app.app_context():
+                    handler = PartitionedDataHandler("appointments")
+                    handler.update({"id": 1, "status": "scheduled" if index % 2 else "finished"})
+                    ## como se a escrita viesse de outro worker: este processo não recebe o snapshot novo
+                    DataHandler._snapshots.pop(handler.partition(handler.state()["ids"]["1"]).filename, None)
+
+            response = client.get("/appointments/", headers=headers)
+            assert response.status_code == 200, response.status_code
+
+    counts = [requests // threads + (1 if index < requests % threads else 0) for index in range(threads)]
+    workers = [threading.Thread(target=worker, args=(count,)) for count in counts]
+
+    csv_reads = 0
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, csv_reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--write-every", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--response-cache", action="store_true")
+    args = parser.parse_args()
+
+    if not args.response_cache:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+        os.environ["RESPONSE_CACHE_SIZE_APPOINTMENTS"] = "0"
+
+    app = create_app()
+    path = prepare_instance(app, args.rows)
+    track_csv_reads(args.latency_ms / 1000)
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    try:
+        ## aquece os snapshots, os índices e o cache de JSON
+        run(app, headers, 1, 1)
+
+        results = [
+            ("sequencial", *run(app, headers, args.requests, 1, args.write_every)),
+            (f"{args.threads} threads", *run(app, headers, args.requests, args.threads, args.write_every)),
+        ]
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    print(
+        f"{args.requests} x GET /appointments/ com {args.rows} linhas "
+        f"(escrita a cada {args.write_every or '-'} requisições, latência simulada: {args.latency_ms} ms)"
+    )
+    for name, elapsed, reads in results:
+        print(f"  {name:<12} {elapsed * 1000:9.1f} ms total  {args.requests / elapsed:9.1f} req/s  {reads:5d} leituras de csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,17 @@ from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 from datetime import timedelta
 from flask_smorest import Api
+from .utils.auth import jwt_required
 import textwrap
 
 def create_app():
     load_dotenv()
     app = Flask(__name__, instance_relative_config=True) 
+
+    from .utils.json_provider import FastJSONProvider, fragment_cache
+    app.json = FastJSONProvider(app)
+    app.config["JSON_FRAGMENT_CACHE_SIZE"] = int(os.getenv("JSON_FRAGMENT_CACHE_SIZE", 20000))
+    fragment_cache.max_size = app.config["JSON_FRAGMENT_CACHE_SIZE"]
     
     app.config["API_TITLE"] = "Petshop FLASK API"
     app.config["API_VERSION"] = "v1"
@@ -51,9 +57,50 @@ def create_app():
         }
     }
 
+    ## cache de respostas GET: tamanho padrão por blueprint e exceções (0 desativa)
+    app.config["RESPONSE_CACHE_SIZE"] = int(os.getenv("RESPONSE_CACHE_SIZE", 256))
+    app.config["RESPONSE_CACHE_SIZES"] = {
+        "appointments": int(os.getenv("RESPONSE_CACHE_SIZE_APPOINTMENTS", 512)),
+    }
+
+    app.config["BATCH_MAX_REQUESTS"] = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+
+    ## janela (ms) para agrupar creates concorrentes em uma única escrita (0 desativa)
+    ## WRITE_FSYNC faz fsync após cada append, com ou sem a janela (com ela, um fsync por lote)
+    app.config["WRITE_BUFFER_WINDOW_MS"] = int(os.getenv("WRITE_BUFFER_WINDOW_MS", 0))
+    app.config["WRITE_FSYNC"] = os.getenv("WRITE_FSYNC", "0") == "1"
+
+    ## hash de senhas: método do werkzeug (ex.: "scrypt", "scrypt:16384:8:1", "pbkdf2:sha256:600000")
+    ## e quantidade de threads do pool de hash (0 usa min(4, CPUs)). Hashes antigos são refeitos no login.
+    app.config["PASSWORD_HASH_METHOD"] = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.getenv("PASSWORD_HASH_WORKERS", 0))
+
+    ## limite de tentativas de login: "tentativas/segundos" por IP e por email ("0" desativa)
+    ## "memory" guarda os contadores por processo; "file" compartilha entre os workers (instance/login_throttle.json)
+    app.config["LOGIN_THROTTLE_IP"] = os.getenv("LOGIN_THROTTLE_IP", "20/60")
+    app.config["LOGIN_THROTTLE_EMAIL"] = os.getenv("LOGIN_THROTTLE_EMAIL", "5/60")
+    app.config["LOGIN_THROTTLE_STORE"] = os.getenv("LOGIN_THROTTLE_STORE", "memory")
+
+    ## horário de funcionamento usado em /appointments/availability: "HH:MM-HH:MM", dias da semana
+    ## abertos (0 = segunda ... 6 = domingo) e intervalo (minutos) entre os horários oferecidos
+    app.config["BUSINESS_HOURS"] = os.getenv("BUSINESS_HOURS", "08:00-18:00")
+    app.config["BUSINESS_DAYS"] = [int(day) for day in os.getenv("BUSINESS_DAYS", "0,1,2,3,4,5").split(",")]
+    app.config["SLOT_STEP_MINUTES"] = int(os.getenv("SLOT_STEP_MINUTES", 30))
+
+    ## arquivamento de agendamentos finalizados/cancelados com mais de ARCHIVE_AFTER_DAYS dias
+    ## (`flask archive-appointments`); ARCHIVE_INTERVAL (segundos) roda o mesmo arquivamento em segundo plano (0 desativa)
+    app.config["ARCHIVE_AFTER_DAYS"] = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+    app.config["ARCHIVE_INTERVAL"] = float(os.getenv("ARCHIVE_INTERVAL", 0))
+
+    ## agendamentos recorrentes: ao criar uma regra, as ocorrências dos próximos RECURRENCE_HORIZON_DAYS dias
+    ## são checadas contra a agenda; a mesma janela limita a expansão de consultas com `from` e sem `to`
+    app.config["RECURRENCE_HORIZON_DAYS"] = int(os.getenv("RECURRENCE_HORIZON_DAYS", 90))
+
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
     app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=1)
+    ## intervalo mínimo (segundos) entre as checagens do arquivo de tokens revogados
+    app.config["REVOCATION_RELOAD_INTERVAL"] = float(os.getenv("REVOCATION_RELOAD_INTERVAL", 1))
 
     try:
         os.makedirs(app.instance_path)
@@ -68,6 +115,7 @@ def create_app():
     from .api.employees import employees_bp
     from .api.auth import auth_bp
     from .api.services import services_bp
+    from .api.batch import batch_bp
 
     api.register_blueprint(auth_bp, url_prefix='/auth')
     api.register_blueprint(services_bp, url_prefix='/services')
@@ -75,8 +123,31 @@ def create_app():
     api.register_blueprint(clients_bp, url_prefix='/clients')
     api.register_blueprint(pets_bp, url_prefix='/pets')
     api.register_blueprint(appointments_bp, url_prefix='/appointments')
+    api.register_blueprint(batch_bp, url_prefix='/batch')
+
+    from .commands import register_commands
+    register_commands(app)
+
+    from .utils.archive import start_archive_job
+    from .services.appointments import Appointments
+    start_archive_job(app, lambda: Appointments().archive(app.config["ARCHIVE_AFTER_DAYS"]))
 
     jwt = JWTManager(app)
+
+    from .utils.revocation import revocation_store
+    revocation_store.init_app(app)
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return revocation_store.is_revoked(jwt_payload["jti"])
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return jsonify({
+            "success": False,
+            "point": "revoked_token",
+            "message": "Token revogado. Faça login novamente."
+        }), 401
     
     @jwt.unauthorized_loader
     def custom_unauthorized_response(err):
@@ -106,6 +177,18 @@ def create_app():
     @app.route('/health')
     def health_check():
         return "OK", 200
+
+    @app.route('/metrics')
+    @jwt_required()
+    def metrics():
+        from .utils.response_cache import response_cache_stats
+        from .utils.throttle import login_throttle
+
+        return jsonify({
+            "response_cache": response_cache_stats(),
+            "login_throttle": login_throttle.get_stats(),
+            "revoked_tokens": revocation_store.stats()
+        }), 200
     
 
     return app
\ No newline at end of file
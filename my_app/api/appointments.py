@@ -1,17 +1,38 @@
 from flask import  jsonify, request
 from flask_smorest import Blueprint
-from flask_jwt_extended import jwt_required
+from ..utils.auth import jwt_required
+from marshmallow import fields
 from ..services.appointments import Appointments
-from ..utils.validate import schemaValidate, ValidationFailedSchema
-from ..schemas.appointments import GetAppointmentResponseSchema, GetAppointmentsByIDResponseNoutFoundSchema, GetAppointmentsByIDResponseSchema, CreateAppointmentResponseFailedSchema, CreateAppointmentSchema, DeleteAppointmentResponseFailedSchema, UpdateAppointmentSchema, UpdateAppointmentResponseFailedSchema
-from ..schemas.generic import GenericSuccessSchema
+from ..utils.expand import parse_expand
+from ..utils.bulk import bulk_response
+from ..utils.conditional import conditional
+from ..utils.json_provider import encode_rows
+from ..utils.response_cache import cached
+from ..utils.streaming import wants_stream, stream_rows
+from ..utils.transfer import export_response, read_import_rows, transfer_format
+from ..utils.validate import ValidationFailedSchema, validateBody, loadItem
+from ..schemas.appointments import GetAppointmentResponseSchema, GetAppointmentsByIDResponseNoutFoundSchema, GetAppointmentsByIDResponseSchema, CreateAppointmentResponseFailedSchema, CreateAppointmentSchema, DeleteAppointmentResponseFailedSchema, ImportAppointmentSchema, UpdateAppointmentSchema, UpdateAppointmentResponseFailedSchema
+from ..schemas.recurrences import CreateRecurrenceSchema, RecurrenceExceptionSchema
+from ..schemas.generic import GenericSuccessSchema, BulkIdsSchema, BulkItemsSchema, extendSchema
 
 appointments_bp = Blueprint('appointments', __name__, description="Gestão de Agendamentos")
 
+## schemas de entrada instanciados uma única vez
+create_schema = CreateAppointmentSchema()
+update_schema = UpdateAppointmentSchema()
+bulk_update_schema = extendSchema(UpdateAppointmentSchema, "BulkUpdateAppointmentSchema", id=fields.Integer(required=True))()
+import_schema = ImportAppointmentSchema()
+bulk_items_schema = BulkItemsSchema()
+bulk_ids_schema = BulkIdsSchema()
+create_recurrence_schema = CreateRecurrenceSchema()
+recurrence_exception_schema = RecurrenceExceptionSchema()
+
 @appointments_bp.route('/', methods=['GET'])
 @appointments_bp.response(200, GetAppointmentResponseSchema, description="Lista de agendamentos")
 @appointments_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("appointments")
+@cached("appointments")
 def get_Appointments():
     """Buscar lista de agendamentos
 
@@ -26,18 +47,74 @@ def get_Appointments():
         * `service` - Nome do serviço.
         * `employee` - Nome do funcionário.
         * `status` - Status do agendamento. Valores válidos: `scheduled`, `finished` e `canceled`.
+        * `expand` - Relacionamentos que devem ser retornados completos, separados por vírgula. Valores válidos: `pet`, `pet.owner`, `service` e `employee`. Os relacionamentos não expandidos retornam apenas o ID.
+        * `stream` - Com `1` a resposta é enviada em NDJSON (um item por linha) conforme é gerada. O mesmo vale para o header `Accept: application/x-ndjson`.
+        * `from` - Data/hora inicial de `scheduled_at`, inclusiva (ex: `2025-12-18` ou `2025-12-18T10:00`).
+        * `to` - Data/hora final de `scheduled_at`, exclusiva. Com `from` e/ou `to` os agendamentos vêm em ordem de horário (ex: agenda de hoje: `?from=2025-12-18&to=2025-12-19`).
+
+        Com `from`/`to` (ou um filtro `scheduled_at` por mês/dia, ex: `2025-12`), as ocorrências dos agendamentos recorrentes
+        do período também são retornadas, com o ID `<recorrência>:<data original>` e os campos `recurrence_id` e `occurrence_at`.
+        Sem `to`, as ocorrências vão até `RECURRENCE_HORIZON_DAYS` dias depois de `from`.
     """
         
     appointments = Appointments()
     filters = request.args.to_dict()
-    
-    appointments = Appointments()
+    expand = parse_expand(filters.pop("expand", None))
+    start = filters.pop("from", None)
+    end = filters.pop("to", None)
+
+    stream = wants_stream(filters.pop("stream", None))
+
     data = []
 
-    if not filters:
-        data = appointments.list()
+    if start or end:
+        try:
+            if stream:
+                return stream_rows(appointments.iter_all(filters, expand, start, end))
+            data = appointments.between(start, end, filters, expand)
+        except Exception as err:
+            return jsonify({
+                "success": False,
+                "point": "get_appointments",
+                "message": str(err)
+            }), 400
+    elif stream:
+        return stream_rows(appointments.iter_all(filters, expand))
+    elif not filters:
+        data = appointments.list(expand)
     else:
-        data = appointments.search(filters)
+        data = appointments.search(filters, expand)
+
+    return jsonify({
+        "success": True,
+        "data": encode_rows("appointments", data, expand)
+    }), 200
+
+@appointments_bp.route('/availability', methods=['GET'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def get_availability():
+    """Buscar horários livres
+
+        Retorna os horários livres de cada funcionário para um serviço em um dia, dentro do horário
+        de funcionamento e considerando a duração do serviço. Parâmetros:
+        * `service_id` - ID do serviço (obrigatório).
+        * `date` - Dia no formato `AAAA-MM-DD` (obrigatório).
+        * `employee_id` - ID do funcionário. Sem ele, são retornados todos os funcionários.
+    """
+    appointments = Appointments()
+    try:
+        data = appointments.availability(
+            request.args.get("service_id"),
+            request.args.get("date"),
+            request.args.get("employee_id")
+        )
+    except Exception as err:
+        return jsonify({
+            "success": False,
+            "point": "get_availability",
+            "message": str(err)
+        }), 400
 
     return jsonify({
         "success": True,
@@ -49,13 +126,16 @@ def get_Appointments():
 @appointments_bp.response(404, GetAppointmentsByIDResponseNoutFoundSchema, description="Agendamento não encontrado")
 @appointments_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("appointments")
+@cached("appointments")
 def get_appointment_by_id(appointment_id):
     """Buscar agendamento pelo ID
 
         Faz a busca de um agendamento pelo ID e retorna erro se não encontrar.
+        Aceita o parâmetro `expand` (ex: `?expand=pet,pet.owner`) para retornar os relacionamentos completos.
     """
     appointments = Appointments()
-    appointment = appointments.get_by_id(appointment_id)
+    appointment = appointments.get_by_id(appointment_id, parse_expand(request.args.get("expand")))
     if appointment: 
         return jsonify({
             "success": True,
@@ -88,9 +168,7 @@ def get_appointment_by_id(appointment_id):
 def create_appointment():
     """Criar novo agendamento
     """
-    data = request.json
-
-    validation_error = schemaValidate(["pet_id", "service_id", "employee_id", "scheduled_at"], data)
+    data, validation_error = validateBody(create_schema, request.json)
 
     if validation_error:
         return validation_error
@@ -152,22 +230,11 @@ def update_appointment(appointment_id):
 
     O campo `status` só aceita os valores: `scheduled`, `finished`, `canceled`
     """
-    data = request.json
-    validation_error = schemaValidate(["id", "pet_id"], data, False)
+    data, validation_error = validateBody(update_schema, request.json, blocked=["id", "pet_id", "created_at"])
 
     if validation_error:
         return validation_error
     
-    status = data.get("status", None)
-    if status:
-        status_allowed = ["scheduled", "finished", "canceled"]
-        if status not in status_allowed:
-            return jsonify({
-                "success": False,
-                "point": "update_appointment",
-                "message": f"O status informado é inválido. Valores válidos: {", ".join(status_allowed)}"
-        }), 422
-    
     appointments = Appointments()
     try:
         appointments.update(appointment_id, data)
@@ -181,4 +248,264 @@ def update_appointment(appointment_id):
     
     return jsonify({ "success": True }), 200
 
-        
\ No newline at end of file
+
+@appointments_bp.route('/bulk', methods=['POST'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_create_appointments():
+    """Criar agendamentos em lote
+
+    Body: `{"items": [...], "transactional": true}`.
+    Todos os itens são validados e os válidos são gravados de uma única vez.
+    Com `transactional` (padrão) nada é gravado se algum item falhar; com `false` os itens válidos são gravados.
+    Retorna o resultado de cada item em `results`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    appointments = Appointments()
+    results, applied = appointments.bulk_create(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(create_schema, item)
+    )
+
+    return bulk_response(results, applied, "bulk_create_appointments", 201)
+
+@appointments_bp.route('/bulk', methods=['PATCH'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_update_appointments():
+    """Editar agendamentos em lote
+
+    Body: `{"items": [{"id": 1, ...}], "transactional": true}`. Cada item precisa do `id`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    appointments = Appointments()
+    results, applied = appointments.bulk_update(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(bulk_update_schema, item, blocked=["pet_id", "created_at"])
+    )
+
+    return bulk_response(results, applied, "bulk_update_appointments")
+
+@appointments_bp.route('/bulk', methods=['DELETE'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_delete_appointments():
+    """Deletar agendamentos em lote
+
+    Body: `{"ids": [1, 2, 3], "transactional": true}`.
+    """
+    data, validation_error = validateBody(bulk_ids_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    appointments = Appointments()
+    results, applied = appointments.bulk_delete(data["ids"], data["transactional"])
+
+    return bulk_response(results, applied, "bulk_delete_appointments")
+
+
+@appointments_bp.route('/export', methods=['GET'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def export_appointments():
+    """Exportar agendamentos
+
+    Envia todas as linhas da tabela em streaming, em CSV (padrão) ou NDJSON (`?format=ndjson`
+    ou header `Accept: application/x-ndjson`).
+    """
+    appointments = Appointments()
+    return export_response(appointments.export_rows(), appointments.handler.get_header_order(), transfer_format(), "appointments")
+
+@appointments_bp.route('/import', methods=['POST'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def import_appointments():
+    """Importar agendamentos
+
+    Recebe as linhas no corpo da requisição em CSV com cabeçalho (`Content-Type: text/csv`)
+    ou NDJSON (`Content-Type: application/x-ndjson`), lidas em streaming.
+    As linhas são validadas em blocos e cada bloco é gravado com novos IDs em uma única escrita.
+    Linhas inválidas são ignoradas e reportadas em `errors`.
+    """
+    appointments = Appointments()
+    summary = appointments.import_rows(
+        read_import_rows(transfer_format()),
+        load=lambda item: loadItem(import_schema, item)
+    )
+
+    return jsonify({
+        "success": summary["failed"] == 0,
+        **summary
+    }), 200
+
+@appointments_bp.route('/archive', methods=['GET'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def get_archived_appointments():
+    """Buscar agendamentos arquivados
+
+        Consulta somente leitura ao arquivo morto: agendamentos `finished` ou `canceled` antigos,
+        retirados da tabela pelo comando `flask archive-appointments` ou pelo job de arquivamento.
+        Aceita os mesmos filtros da lista de agendamentos, além de:
+        * `from` - Data inicial de `scheduled_at` (ex: `2025-01-01`), inclusiva.
+        * `to` - Data final de `scheduled_at`, exclusiva. Apenas os meses do intervalo são lidos.
+    """
+    appointments = Appointments()
+    filters = request.args.to_dict()
+    expand = parse_expand(filters.pop("expand", None))
+    start = filters.pop("from", None)
+    end = filters.pop("to", None)
+    stream = wants_stream(filters.pop("stream", None))
+
+    rows = appointments.iter_archived(filters, start, end, expand)
+    if stream:
+        return stream_rows(rows)
+
+    return jsonify({
+        "success": True,
+        "data": list(rows)
+    }), 200
+
+@appointments_bp.route('/archive/<int:appointment_id>', methods=['GET'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def get_archived_appointment_by_id(appointment_id):
+    """Buscar agendamento arquivado pelo ID
+    """
+    appointments = Appointments()
+    appointment = appointments.get_archived(appointment_id, parse_expand(request.args.get("expand")))
+    if appointment:
+        return jsonify({
+            "success": True,
+            "data": appointment
+        }), 200
+
+    return jsonify({
+        "success": False,
+        "point": "get_archived_appointment_by_id",
+        "message": "Agendamento não encontrado no arquivo"
+    }), 404
+
+@appointments_bp.route('/recurrences', methods=['GET'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def get_recurrences():
+    """Buscar agendamentos recorrentes
+
+        Retorna as regras de recorrência cadastradas (uma por agendamento recorrente, não as ocorrências).
+        Aceita o parâmetro `expand` (ex: `?expand=pet,service`).
+    """
+    appointments = Appointments()
+    data = appointments.list_recurrences(parse_expand(request.args.get("expand")))
+
+    return jsonify({
+        "success": True,
+        "data": data
+    }), 200
+
+@appointments_bp.route('/recurrences', methods=['POST'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@appointments_bp.doc(
+    requestBody={
+        "content": {
+            "application/json": {
+                "schema": CreateRecurrenceSchema
+            }
+        },
+        "required": True
+    }
+)
+@appointments_bp.response(422, ValidationFailedSchema, description="Falha na validação dos campos")
+@appointments_bp.response(201, GenericSuccessSchema, description="Agendamento recorrente criado com sucesso")
+@jwt_required()
+def create_recurrence():
+    """Criar agendamento recorrente
+
+        Cria uma regra (`daily`, `weekly` ou `monthly`, a cada `interval` períodos) a partir de `starts_at`,
+        limitada opcionalmente por `until` e/ou `count`. As ocorrências não são gravadas: elas aparecem
+        nas consultas por período. As ocorrências dos próximos `RECURRENCE_HORIZON_DAYS` dias são checadas
+        contra a agenda do funcionário.
+    """
+    data, validation_error = validateBody(create_recurrence_schema, request.json)
+
+    if validation_error:
+        return validation_error
+
+    appointments = Appointments()
+    try:
+        appointments.create_recurrence(data)
+    except Exception as err:
+        return jsonify({
+            "success": False,
+            "point": "create_recurrence",
+            "message": str(err)
+        }), 400
+
+    return jsonify({ "success": True }), 201
+
+@appointments_bp.route('/recurrences/<int:recurrence_id>', methods=['DELETE'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@appointments_bp.response(200, GenericSuccessSchema, description="Agendamento recorrente deletado com sucesso")
+@jwt_required()
+def delete_recurrence(recurrence_id):
+    """Deletar agendamento recorrente
+
+        Remove a regra e as alterações das suas ocorrências.
+    """
+    appointments = Appointments()
+    try:
+        appointments.delete_recurrence(recurrence_id)
+    except Exception as err:
+        return jsonify({
+            "success": False,
+            "point": "delete_recurrence",
+            "message": str(err)
+        }), 400
+
+    return jsonify({ "success": True }), 200
+
+@appointments_bp.route('/recurrences/<int:recurrence_id>/exceptions', methods=['POST'])
+@appointments_bp.doc(security=[{"bearerAuth": []}])
+@appointments_bp.doc(
+    requestBody={
+        "content": {
+            "application/json": {
+                "schema": RecurrenceExceptionSchema
+            }
+        },
+        "required": True
+    }
+)
+@appointments_bp.response(422, ValidationFailedSchema, description="Falha na validação dos campos")
+@appointments_bp.response(201, GenericSuccessSchema, description="Ocorrência alterada com sucesso")
+@jwt_required()
+def create_recurrence_exception(recurrence_id):
+    """Alterar uma ocorrência de um agendamento recorrente
+
+        Cancela, conclui (`status`) ou remarca (`scheduled_at`) apenas a ocorrência de `occurrence_at`
+        (data original da ocorrência). As demais ocorrências e a regra não mudam.
+    """
+    data, validation_error = validateBody(recurrence_exception_schema, request.json)
+
+    if validation_error:
+        return validation_error
+
+    appointments = Appointments()
+    try:
+        appointments.add_recurrence_exception(recurrence_id, data)
+    except Exception as err:
+        return jsonify({
+            "success": False,
+            "point": "create_recurrence_exception",
+            "message": str(err)
+        }), 400
+
+    return jsonify({ "success": True }), 201
@@ -1,12 +1,17 @@
+import math
 from flask import jsonify, request
 from flask_smorest import Blueprint
 from ..services.auth import Auth
-from ..utils.validate import schemaValidate, ValidationFailedSchema
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+from ..utils.validate import ValidationFailedSchema, validateBody
+from ..utils.throttle import login_throttle
+from flask_jwt_extended import jwt_required, get_jwt
 from ..schemas.auth import LoginSchema, LoginResponseSchema, LoginResponseFailedSchema, RefreshSchema, RefreshResponseFailedSchema
+from ..schemas.generic import GenericSuccessSchema
 
 auth_bp = Blueprint('auth', __name__)
 
+login_schema = LoginSchema()
+
 @auth_bp.route('/login', methods=['POST'])
 @auth_bp.doc(
     requestBody={
@@ -20,6 +25,7 @@ auth_bp = Blueprint('auth', __name__)
 )
 @auth_bp.response(422, ValidationFailedSchema, description="Falha na validação dos campos")
 @auth_bp.response(400, LoginResponseFailedSchema, description="Falha na autenticação ou erro de validação.")
+@auth_bp.response(429, LoginResponseFailedSchema, description="Muitas tentativas de login.")
 @auth_bp.response(200, LoginResponseSchema, description="Login bem-sucedido.")
 def login():
     """Realizar o login do usuário
@@ -29,12 +35,22 @@ def login():
     * **access_token**: Para acessar rotas privadas.
     * **refresh_token**: Para renovar o acesso.
     """
-    data = request.json
-
-    validation_error = schemaValidate(["email", "password"], data)
+    data, validation_error = validateBody(login_schema, request.json)
 
     if validation_error:
         return validation_error
+
+    ## limite de tentativas por IP e por email, antes de qualquer hash de senha
+    wait = login_throttle.check(request.remote_addr, data["email"])
+    if wait:
+        retry_after = math.ceil(wait)
+        response = jsonify({
+            "success": False,
+            "point": "login",
+            "message": f"Muitas tentativas de login. Tente novamente em {retry_after} segundos."
+        })
+        response.headers["Retry-After"] = str(retry_after)
+        return response, 429
     
     auth = Auth()
     try:
@@ -60,9 +76,24 @@ def refresh():
 
     `Authorization: Bearer <refresh_token>`
 
-    será retornado um novo `access_token` caso o `refresh_token` seja válido.
+    será retornado um novo `access_token` caso o `refresh_token` seja válido, junto com um novo
+    `refresh_token`: o refresh token usado é revogado e não pode ser usado de novo.
     """
-    current_user_id = get_jwt_identity()
-    new_access_token = create_access_token(identity=current_user_id)
+    auth = Auth()
     
-    return jsonify({"access_token": new_access_token}), 200
\ No newline at end of file
+    return jsonify(auth.refresh(get_jwt())), 200
+
+@auth_bp.route("/logout", methods=["POST"])
+@jwt_required(verify_type=False)
+@auth_bp.doc(security=[{"bearerAuth": []}])
+@auth_bp.response(200, GenericSuccessSchema, description="Tokens revogados.")
+def logout():
+    """Encerrar a sessão
+
+    Revoga o token enviado no header Authorization. Com o access token, o refresh token
+    gerado junto com ele também é revogado.
+    """
+    auth = Auth()
+    auth.logout(get_jwt())
+
+    return jsonify({ "success": True }), 200
\ No newline at end of file
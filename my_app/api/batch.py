@@ -0,0 +1,84 @@
+from flask import jsonify, request, current_app
+from flask_smorest import Blueprint
+from flask_jwt_extended import get_jwt
+from ..utils.auth import BATCH_JWT, jwt_required
+from ..utils.validate import validateBody
+from ..schemas.batch import BatchSchema
+
+batch_bp = Blueprint('batch', __name__, description="Várias requisições em uma")
+
+batch_schema = BatchSchema()
+
+@batch_bp.route('', methods=['POST'])
+@batch_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def batch():
+    """Executar várias requisições de uma vez
+
+    Body:
+    ```
+    {
+        "requests": [
+            {"id": "pet", "method": "GET", "path": "/pets/1?expand=owner"},
+            {"id": "agenda", "method": "GET", "path": "/appointments/?pet_id=1&operator=EQUAL"},
+            {"id": "services", "method": "GET", "path": "/services/"}
+        ]
+    }
+    ```
+    As sub-requisições passam pelas mesmas rotas e são executadas em ordem. O token é verificado uma
+    única vez, nesta requisição; as rotas que exigem outro tipo de token (`/auth/refresh`, `/auth/logout`)
+    não podem ser chamadas pelo lote. Uma tabela lida por uma sub-requisição é lida na mesma versão pelas
+    seguintes, a não ser que uma delas escreva na tabela.
+    Retorna `status` e `body` de cada uma em `responses`, na mesma ordem.
+    """
+    data, validation_error = validateBody(batch_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    sub_requests = data["requests"]
+
+    max_requests = current_app.config.get("BATCH_MAX_REQUESTS", 20)
+    if len(sub_requests) > max_requests:
+        return jsonify({
+            "success": False,
+            "point": "batch",
+            "message": f"Envie no máximo {max_requests} requisições por lote"
+        }), 400
+
+    ## o IP do cliente segue para as sub-requisições (ex.: limite de tentativas de login por IP)
+    ## e o JWT verificado por esta requisição substitui o token (ver utils/auth.py)
+    environ = {"REMOTE_ADDR": request.remote_addr, BATCH_JWT: get_jwt()}
+
+    responses = []
+    for index, sub_request in enumerate(sub_requests):
+        sub_request = sub_request if isinstance(sub_request, dict) else {}
+        path = str(sub_request.get("path") or "")
+        method = str(sub_request.get("method") or "GET").upper()
+
+        if not path.startswith("/") or path.split("?")[0].rstrip("/") == "/batch":
+            responses.append({
+                "id": sub_request.get("id", index),
+                "status": 400,
+                "body": {"success": False, "point": "batch", "message": "Caminho inválido"}
+            })
+            continue
+
+        ## o contexto da sub-requisição reaproveita o contexto de app desta requisição (o Flask só cria
+        ## um novo quando não há um ativo), então o `g` é o mesmo: os snapshots fixados em `g._snapshots`
+        ## (ver DataHandler.pinned_snapshot) e o JWT verificado valem para todas as sub-requisições
+        with current_app.test_request_context(
+            path, method=method, headers={"Accept": "application/json"}, json=sub_request.get("body"),
+            environ_base=environ
+        ):
+            response = current_app.make_response(current_app.full_dispatch_request())
+
+        responses.append({
+            "id": sub_request.get("id", index),
+            "status": response.status_code,
+            "body": response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+        })
+
+    return jsonify({
+        "success": True,
+        "responses": responses
+    }), 200
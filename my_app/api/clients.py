@@ -1,17 +1,35 @@
 from flask import  jsonify, request
 from flask_smorest import Blueprint
-from flask_jwt_extended import jwt_required
+from ..utils.auth import jwt_required
+from marshmallow import fields
 from ..services.clients import Clients
-from ..utils.validate import schemaValidate, ValidationFailedSchema
-from ..schemas.clients import GetClientsResponseSchema, GetClientsByIDResponseSchema, GetClientsByIDResponseNoutFoundSchema, CreateClientSchema, CreateClientResponseFailedSchema, DeleteClientResponseFailedSchema, UpdateClientResponseFailedSchema, UpdateClientSchema
-from ..schemas.generic import GenericSuccessSchema
+from ..utils.expand import parse_expand
+from ..utils.bulk import bulk_response
+from ..utils.conditional import conditional
+from ..utils.json_provider import encode_rows
+from ..utils.response_cache import cached
+from ..utils.streaming import wants_stream, stream_rows
+from ..utils.transfer import export_response, read_import_rows, transfer_format
+from ..utils.validate import ValidationFailedSchema, validateBody, loadItem
+from ..schemas.clients import GetClientsResponseSchema, GetClientsByIDResponseSchema, GetClientsByIDResponseNoutFoundSchema, CreateClientSchema, CreateClientResponseFailedSchema, DeleteClientResponseFailedSchema, UpdateClientResponseFailedSchema, UpdateClientSchema, ImportClientSchema
+from ..schemas.generic import GenericSuccessSchema, BulkIdsSchema, BulkItemsSchema, extendSchema
 
 clients_bp = Blueprint('clients', __name__)
 
+## schemas de entrada instanciados uma única vez
+create_schema = CreateClientSchema()
+update_schema = UpdateClientSchema()
+bulk_update_schema = extendSchema(UpdateClientSchema, "BulkUpdateClientSchema", id=fields.Integer(required=True))()
+import_schema = ImportClientSchema()
+bulk_items_schema = BulkItemsSchema()
+bulk_ids_schema = BulkIdsSchema()
+
 @clients_bp.route('/', methods=['GET'])
 @clients_bp.response(200, GetClientsResponseSchema, description="Listar clientes")
 @clients_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("clients")
+@cached("clients")
 def get_clients():
     """Buscar lista de clientes
 
@@ -22,21 +40,26 @@ def get_clients():
         * `name` - Nome do cliente.
         * `phone` - Telefone do cliente.
         * `email` - Email do cliente.
+        * `expand` - Relacionamentos que devem ser retornados completos, separados por vírgula. Valores válidos: `pets` e `pets.owner`. Sem expandir, `pets` retorna apenas os IDs.
+        * `stream` - Com `1` a resposta é enviada em NDJSON (um item por linha) conforme é gerada. O mesmo vale para o header `Accept: application/x-ndjson`.
     """
     clients = Clients()
     filters = request.args.to_dict()
+    expand = parse_expand(filters.pop("expand", None))
+
+    if wants_stream(filters.pop("stream", None)):
+        return stream_rows(clients.iter_all(filters, expand))
     
-    clients = Clients()
     data = []
 
     if not filters:
-        data = clients.list()
+        data = clients.list(expand)
     else:
-        data = clients.search(filters)
+        data = clients.search(filters, expand)
 
     return jsonify({
         "success": True,
-        "data": data
+        "data": encode_rows("clients", data, expand)
     }), 200
 
 @clients_bp.route('/<int:client_id>', methods=['GET'])
@@ -44,13 +67,16 @@ def get_clients():
 @clients_bp.response(404, GetClientsByIDResponseNoutFoundSchema, description="Cliente não encontrado")
 @clients_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("clients")
+@cached("clients")
 def get_client_by_id(client_id):
     """Buscar cliente pelo ID
 
         Faz a busca de um cliente pelo ID e retorna erro se não encontrar.
+        Aceita o parâmetro `expand` (ex: `?expand=pets`) para retornar os pets completos.
     """
     clients = Clients()
-    client = clients.get_by_id(client_id)
+    client = clients.get_by_id(client_id, parse_expand(request.args.get("expand")))
     if client: 
         return jsonify({
             "success": True,
@@ -83,9 +109,7 @@ def get_client_by_id(client_id):
 def create_client():
     """Criar novo cliente
     """
-    data = request.json
-
-    validation_error = schemaValidate(["name", "phone", "email"], data)
+    data, validation_error = validateBody(create_schema, request.json)
 
     if validation_error:
         return validation_error
@@ -147,8 +171,7 @@ def update_client(client_id):
     * id
     * created_at
     """
-    data = request.json
-    validation_error = schemaValidate(["id", "created_at"], data, False)
+    data, validation_error = validateBody(update_schema, request.json, blocked=["id", "created_at"])
 
     if validation_error:
         return validation_error
@@ -166,4 +189,100 @@ def update_client(client_id):
     
     return jsonify({ "success": True }), 200
 
-        
\ No newline at end of file
+
+@clients_bp.route('/bulk', methods=['POST'])
+@clients_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_create_clients():
+    """Criar clientes em lote
+
+    Body: `{"items": [...], "transactional": true}`.
+    Todos os itens são validados e os válidos são gravados de uma única vez.
+    Com `transactional` (padrão) nada é gravado se algum item falhar; com `false` os itens válidos são gravados.
+    Retorna o resultado de cada item em `results`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    clients = Clients()
+    results, applied = clients.bulk_create(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(create_schema, item)
+    )
+
+    return bulk_response(results, applied, "bulk_create_clients", 201)
+
+@clients_bp.route('/bulk', methods=['PATCH'])
+@clients_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_update_clients():
+    """Editar clientes em lote
+
+    Body: `{"items": [{"id": 1, ...}], "transactional": true}`. Cada item precisa do `id`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    clients = Clients()
+    results, applied = clients.bulk_update(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(bulk_update_schema, item, blocked=["created_at"])
+    )
+
+    return bulk_response(results, applied, "bulk_update_clients")
+
+@clients_bp.route('/bulk', methods=['DELETE'])
+@clients_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_delete_clients():
+    """Deletar clientes em lote
+
+    Body: `{"ids": [1, 2, 3], "transactional": true}`.
+    """
+    data, validation_error = validateBody(bulk_ids_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    clients = Clients()
+    results, applied = clients.bulk_delete(data["ids"], data["transactional"])
+
+    return bulk_response(results, applied, "bulk_delete_clients")
+
+
+@clients_bp.route('/export', methods=['GET'])
+@clients_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def export_clients():
+    """Exportar clientes
+
+    Envia todas as linhas da tabela em streaming, em CSV (padrão) ou NDJSON (`?format=ndjson`
+    ou header `Accept: application/x-ndjson`).
+    """
+    clients = Clients()
+    return export_response(clients.export_rows(), clients.handler.get_header_order(), transfer_format(), "clients")
+
+@clients_bp.route('/import', methods=['POST'])
+@clients_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def import_clients():
+    """Importar clientes
+
+    Recebe as linhas no corpo da requisição em CSV com cabeçalho (`Content-Type: text/csv`)
+    ou NDJSON (`Content-Type: application/x-ndjson`), lidas em streaming.
+    As linhas são validadas em blocos e cada bloco é gravado com novos IDs em uma única escrita.
+    Linhas inválidas são ignoradas e reportadas em `errors`.
+    """
+    clients = Clients()
+    summary = clients.import_rows(
+        read_import_rows(transfer_format()),
+        load=lambda item: loadItem(import_schema, item)
+    )
+
+    return jsonify({
+        "success": summary["failed"] == 0,
+        **summary
+    }), 200
@@ -1,16 +1,33 @@
 from flask import  jsonify, request
 from flask_smorest import Blueprint
 from ..services.employees import Employees
-from ..utils.validate import schemaValidate
-from ..schemas.employee import GetEmployeesResponseSchema, GetEmployeesByIDResponseNoutFoundSchema, GetEmployeesByIDResponseSchema
-from flask_jwt_extended import jwt_required
+from ..utils.bulk import bulk_response
+from ..utils.conditional import conditional
+from ..utils.json_provider import encode_rows
+from ..utils.response_cache import cached
+from ..utils.streaming import wants_stream, stream_rows
+from ..utils.transfer import export_response, transfer_format
+from ..utils.validate import validateBody, loadItem
+from ..schemas.employee import GetEmployeesResponseSchema, GetEmployeesByIDResponseNoutFoundSchema, GetEmployeesByIDResponseSchema, CreateEmployeeSchema, UpdateEmployeeSchema
+from ..schemas.generic import BulkIdsSchema, BulkItemsSchema, extendSchema
+from ..utils.auth import jwt_required
+from marshmallow import fields
 
 employees_bp = Blueprint('employees', __name__)
 
+## schemas de entrada instanciados uma única vez
+create_schema = CreateEmployeeSchema()
+update_schema = UpdateEmployeeSchema()
+bulk_update_schema = extendSchema(UpdateEmployeeSchema, "BulkUpdateEmployeeSchema", id=fields.Integer(required=True))()
+bulk_items_schema = BulkItemsSchema()
+bulk_ids_schema = BulkIdsSchema()
+
 @employees_bp.route('/', methods=['GET'])
 @employees_bp.response(200, GetEmployeesResponseSchema, description="Listar funcionários")
 @employees_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("employees")
+@cached("employees")
 def get_employees():
     """Buscar lista de funcionários
 
@@ -24,8 +41,10 @@ def get_employees():
     """
     employees = Employees()
     filters = request.args.to_dict()
+
+    if wants_stream(filters.pop("stream", None)):
+        return stream_rows(employees.iter_all(filters))
     
-    employees = Employees()
     data = []
 
     if not filters:
@@ -35,7 +54,7 @@ def get_employees():
 
     return jsonify({
         "success": True,
-        "data": data
+        "data": encode_rows("employees", data)
     }), 200
 
 @employees_bp.route('/<int:employee_id>', methods=['GET'])
@@ -43,6 +62,8 @@ def get_employees():
 @employees_bp.response(404, GetEmployeesByIDResponseNoutFoundSchema, description="Funcionário não encontrado")
 @employees_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("employees")
+@cached("employees")
 def get_employee_by_id(employee_id):
     """Buscar funcionário pelo ID
 
@@ -66,15 +87,21 @@ def get_employee_by_id(employee_id):
 @employees_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_employee():
-    data = request.json
-
-    validation_error = schemaValidate(["name", "job_title", "email", "password"], data)
+    data, validation_error = validateBody(create_schema, request.json)
 
     if validation_error:
         return validation_error
     
     employees = Employees()
-    employees.create(data)
+    try:
+        employees.create(data)
+    except Exception as err:
+
+        return jsonify({
+            "success": False,
+            "point": "create_employee",
+            "message": str(err)
+        }), 400
 
     return jsonify({ "success": True }), 201
 
@@ -97,8 +124,7 @@ def delete_employee(employee_id):
 @employees_bp.route('/<int:employee_id>', methods=['PATCH'])
 @jwt_required()
 def update_employee(employee_id):
-    data = request.json
-    validation_error = schemaValidate(["id", "created_at"], data, False)
+    data, validation_error = validateBody(update_schema, request.json, blocked=["id", "created_at"])
 
     if validation_error:
         return validation_error
@@ -116,4 +142,79 @@ def update_employee(employee_id):
     
     return jsonify({ "success": True }), 200
 
-        
\ No newline at end of file
+
+@employees_bp.route('/bulk', methods=['POST'])
+@employees_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_create_employees():
+    """Criar funcionários em lote
+
+    Body: `{"items": [...], "transactional": true}`.
+    Todos os itens são validados e os válidos são gravados de uma única vez.
+    Com `transactional` (padrão) nada é gravado se algum item falhar; com `false` os itens válidos são gravados.
+    Retorna o resultado de cada item em `results`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    employees = Employees()
+    results, applied = employees.bulk_create(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(create_schema, item)
+    )
+
+    return bulk_response(results, applied, "bulk_create_employees", 201)
+
+@employees_bp.route('/bulk', methods=['PATCH'])
+@employees_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_update_employees():
+    """Editar funcionários em lote
+
+    Body: `{"items": [{"id": 1, ...}], "transactional": true}`. Cada item precisa do `id`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    employees = Employees()
+    results, applied = employees.bulk_update(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(bulk_update_schema, item, blocked=["created_at"])
+    )
+
+    return bulk_response(results, applied, "bulk_update_employees")
+
+@employees_bp.route('/bulk', methods=['DELETE'])
+@employees_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_delete_employees():
+    """Deletar funcionários em lote
+
+    Body: `{"ids": [1, 2, 3], "transactional": true}`.
+    """
+    data, validation_error = validateBody(bulk_ids_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    employees = Employees()
+    results, applied = employees.bulk_delete(data["ids"], data["transactional"])
+
+    return bulk_response(results, applied, "bulk_delete_employees")
+
+
+@employees_bp.route('/export', methods=['GET'])
+@employees_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def export_employees():
+    """Exportar funcionários
+
+    Envia todas as linhas da tabela em streaming, em CSV (padrão) ou NDJSON (`?format=ndjson`
+    ou header `Accept: application/x-ndjson`).
+    A senha não é exportada.
+    """
+    employees = Employees()
+    return export_response(employees.export_rows(), employees.handler.get_header_order(), transfer_format(), "employees")
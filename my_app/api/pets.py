@@ -1,8 +1,16 @@
 from flask import jsonify, request
 from flask_smorest import Blueprint
-from flask_jwt_extended import jwt_required
+from ..utils.auth import jwt_required
+from marshmallow import fields
 from ..services.pets import Pets
-from ..utils.validate import schemaValidate, ValidationFailedSchema
+from ..utils.expand import parse_expand
+from ..utils.bulk import bulk_response
+from ..utils.conditional import conditional
+from ..utils.json_provider import encode_rows
+from ..utils.response_cache import cached
+from ..utils.streaming import wants_stream, stream_rows
+from ..utils.transfer import export_response, read_import_rows, transfer_format
+from ..utils.validate import ValidationFailedSchema, validateBody, loadItem
 
 # Importando Schemas 
 from ..schemas.pets import (
@@ -13,12 +21,21 @@ from ..schemas.pets import (
     CreatePetResponseFailedSchema,
     DeletePetResponseFailedSchema,
     UpdatePetResponseFailedSchema,
-    UpdatePetSchema
+    UpdatePetSchema,
+    ImportPetSchema
 )
-from ..schemas.generic import GenericSuccessSchema
+from ..schemas.generic import GenericSuccessSchema, BulkIdsSchema, BulkItemsSchema, extendSchema
 
 pets_bp = Blueprint('pets', __name__)
 
+## schemas de entrada instanciados uma única vez
+create_schema = CreatePetSchema()
+update_schema = UpdatePetSchema()
+bulk_update_schema = extendSchema(UpdatePetSchema, "BulkUpdatePetSchema", id=fields.Integer(required=True))()
+import_schema = ImportPetSchema()
+bulk_items_schema = BulkItemsSchema()
+bulk_ids_schema = BulkIdsSchema()
+
 # -----------------------------------------------------------------------------
 # ROTA: LISTAR PETS
 # -----------------------------------------------------------------------------
@@ -26,24 +43,33 @@ pets_bp = Blueprint('pets', __name__)
 @pets_bp.response(200, GetPetsResponseSchema, description="Listar pets")
 @pets_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("pets")
+@cached("pets")
 def get_pets():
     """Buscar lista de pets
 
     Retorna a lista de todos os pets cadastrados na plataforma.
     É possível realizar filtros na hora de realizar a busca (ex: name, specie).
+    Use `expand=owner` para retornar o dono completo em `owner_id` (por padrão apenas o ID).
+    Use `stream=1` ou o header `Accept: application/x-ndjson` para receber um pet por linha (NDJSON).
     """
     pets = Pets()
     filters = request.args.to_dict()
+    expand = parse_expand(filters.pop("expand", None))
+
+    if wants_stream(filters.pop("stream", None)):
+        return stream_rows(pets.iter_all(filters, expand))
+
     data = []
 
     if not filters:
-        data = pets.list()
+        data = pets.list(expand)
     else:
-        data = pets.search(filters)
+        data = pets.search(filters, expand)
 
     return jsonify({
         "success": True,
-        "data": data
+        "data": encode_rows("pets", data, expand)
     }), 200
 
 # -----------------------------------------------------------------------------
@@ -54,13 +80,16 @@ def get_pets():
 @pets_bp.response(404, GetPetsByIDResponseNotFoundSchema, description="Pet não encontrado")
 @pets_bp.doc(security=[{"bearerAuth": []}])
 @jwt_required()
+@conditional("pets")
+@cached("pets")
 def get_pet_by_id(pet_id):
     """Buscar pet pelo ID
     
     Faz a busca de um pet pelo ID e retorna erro se não encontrar.
+    Use `expand=owner` para retornar o dono completo em `owner_id`.
     """
     pets = Pets()
-    pet = pets.get_by_id(pet_id)
+    pet = pets.get_by_id(pet_id, parse_expand(request.args.get("expand")))
 
     if pet:
         return jsonify({
@@ -95,26 +124,10 @@ def get_pet_by_id(pet_id):
 @jwt_required()
 def create_pet():
     """Criar novo pet"""
-    data = request.json
-    
-    # 1. Validação genérica (existência dos campos)
-    validation_error = schemaValidate(["name", "specie", "sex", "owner_id", "age"], data)
+    data, validation_error = validateBody(create_schema, request.json)
     if validation_error:
         return validation_error
 
-    # 2. Validação Específica de Regra de Negócio (Sexo)
-    sex = data.get("sex")
-    if sex and sex.upper() not in ('M', 'F'):
-        return jsonify({
-            "success": False,
-            "point": "create_pet_validation",
-            "message": "O campo 'sex' deve ser 'M' (Macho) ou 'F' (Fêmea)."
-        }), 400
-    
-    # Padronização
-    if sex:
-        data["sex"] = sex.upper()
-
     pets = Pets()
     try:
         pets.create(data)
@@ -173,25 +186,10 @@ def update_pet(pet_id):
     
     Todos os campos podem ser editados, exceto id e created_at.
     """
-    data = request.json
-    
-    # 1. Validação genérica (impedir alteração de id/data)
-    validation_error = schemaValidate(["id", "created_at"], data, False)
+    data, validation_error = validateBody(update_schema, request.json, blocked=["id", "created_at"])
     if validation_error:
         return validation_error
 
-    # 2. Validação Específica (Sexo)
-    if "sex" in data:
-        sex = data.get("sex")
-        if sex and sex.upper() not in ('M', 'F'):
-            return jsonify({
-                "success": False,
-                "point": "update_pet_validation",
-                "message": "O campo 'sex' deve ser 'M' (Macho) ou 'F' (Fêmea)."
-            }), 400
-        if sex:
-            data["sex"] = sex.upper()
-
     pets = Pets()
     try:
         pets.update(pet_id, data)
@@ -202,4 +200,102 @@ def update_pet(pet_id):
             "message": str(err)
         }), 400
 
-    return jsonify({"success": True}), 200
\ No newline at end of file
+    return jsonify({"success": True}), 200
+
+
+@pets_bp.route('/bulk', methods=['POST'])
+@pets_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_create_pets():
+    """Criar pets em lote
+
+    Body: `{"items": [...], "transactional": true}`.
+    Todos os itens são validados e os válidos são gravados de uma única vez.
+    Com `transactional` (padrão) nada é gravado se algum item falhar; com `false` os itens válidos são gravados.
+    Retorna o resultado de cada item em `results`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    pets = Pets()
+    results, applied = pets.bulk_create(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(create_schema, item)
+    )
+
+    return bulk_response(results, applied, "bulk_create_pets", 201)
+
+@pets_bp.route('/bulk', methods=['PATCH'])
+@pets_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_update_pets():
+    """Editar pets em lote
+
+    Body: `{"items": [{"id": 1, ...}], "transactional": true}`. Cada item precisa do `id`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    pets = Pets()
+    results, applied = pets.bulk_update(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(bulk_update_schema, item, blocked=["created_at"])
+    )
+
+    return bulk_response(results, applied, "bulk_update_pets")
+
+@pets_bp.route('/bulk', methods=['DELETE'])
+@pets_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_delete_pets():
+    """Deletar pets em lote
+
+    Body: `{"ids": [1, 2, 3], "transactional": true}`.
+    """
+    data, validation_error = validateBody(bulk_ids_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    pets = Pets()
+    results, applied = pets.bulk_delete(data["ids"], data["transactional"])
+
+    return bulk_response(results, applied, "bulk_delete_pets")
+
+
+@pets_bp.route('/export', methods=['GET'])
+@pets_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def export_pets():
+    """Exportar pets
+
+    Envia todas as linhas da tabela em streaming, em CSV (padrão) ou NDJSON (`?format=ndjson`
+    ou header `Accept: application/x-ndjson`).
+    """
+    pets = Pets()
+    return export_response(pets.export_rows(), pets.handler.get_header_order(), transfer_format(), "pets")
+
+@pets_bp.route('/import', methods=['POST'])
+@pets_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def import_pets():
+    """Importar pets
+
+    Recebe as linhas no corpo da requisição em CSV com cabeçalho (`Content-Type: text/csv`)
+    ou NDJSON (`Content-Type: application/x-ndjson`), lidas em streaming.
+    As linhas são validadas em blocos e cada bloco é gravado com novos IDs em uma única escrita.
+    Linhas inválidas são ignoradas e reportadas em `errors`.
+    """
+    pets = Pets()
+    summary = pets.import_rows(
+        read_import_rows(transfer_format()),
+        load=lambda item: loadItem(import_schema, item)
+    )
+
+    return jsonify({
+        "success": summary["failed"] == 0,
+        **summary
+    }), 200
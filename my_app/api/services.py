@@ -1,16 +1,38 @@
 from flask import jsonify, request
 from flask_smorest import Blueprint
-from flask_jwt_extended import jwt_required
+from ..utils.auth import jwt_required
+from marshmallow import fields
 from ..services.services import Services
-from ..utils.validate import schemaValidate
+from ..utils.bulk import bulk_response
+from ..utils.conditional import conditional
+from ..utils.json_provider import encode_rows
+from ..utils.response_cache import cached
+from ..utils.streaming import wants_stream, stream_rows
+from ..utils.transfer import export_response, read_import_rows, transfer_format
+from ..utils.validate import validateBody, loadItem
+from ..schemas.service import CreateServiceSchema, UpdateServiceSchema, ImportServiceSchema
+from ..schemas.generic import BulkIdsSchema, BulkItemsSchema, extendSchema
 
 services_bp = Blueprint('services', __name__)
 
+## schemas de entrada instanciados uma única vez
+create_schema = CreateServiceSchema()
+update_schema = UpdateServiceSchema()
+bulk_update_schema = extendSchema(UpdateServiceSchema, "BulkUpdateServiceSchema", id=fields.Integer(required=True))()
+import_schema = ImportServiceSchema()
+bulk_items_schema = BulkItemsSchema()
+bulk_ids_schema = BulkIdsSchema()
+
 @services_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional("services")
+@cached("services")
 def get_services():
     services = Services()
     filters = request.args.to_dict()
+
+    if wants_stream(filters.pop("stream", None)):
+        return stream_rows(services.iter_all(filters))
     
     data = []
 
@@ -21,11 +43,13 @@ def get_services():
 
     return jsonify({
         "success": True,
-        "data": data
+        "data": encode_rows("services", data)
     }), 200
 
 @services_bp.route('/<int:service_id>', methods=['GET'])
 @jwt_required()
+@conditional("services")
+@cached("services")
 def get_service_by_id(service_id):
     services = Services()
     service = services.get_by_id(service_id)
@@ -45,9 +69,7 @@ def get_service_by_id(service_id):
 @services_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_service():
-    data = request.json
-
-    validation_error = schemaValidate(["name", "description", "value"], data)
+    data, validation_error = validateBody(create_schema, request.json)
 
     if validation_error:
         return validation_error
@@ -76,8 +98,7 @@ def delete_service(service_id):
 @services_bp.route('/<int:service_id>', methods=['PATCH'])
 @jwt_required()
 def update_service(service_id):
-    data = request.json
-    validation_error = schemaValidate(["id", "created_at"], data, False)
+    data, validation_error = validateBody(update_schema, request.json, blocked=["id", "created_at"])
 
     if validation_error:
         return validation_error
@@ -95,4 +116,100 @@ def update_service(service_id):
     
     return jsonify({ "success": True }), 200
 
-        
\ No newline at end of file
+
+@services_bp.route('/bulk', methods=['POST'])
+@services_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_create_services():
+    """Criar serviços em lote
+
+    Body: `{"items": [...], "transactional": true}`.
+    Todos os itens são validados e os válidos são gravados de uma única vez.
+    Com `transactional` (padrão) nada é gravado se algum item falhar; com `false` os itens válidos são gravados.
+    Retorna o resultado de cada item em `results`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    services = Services()
+    results, applied = services.bulk_create(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(create_schema, item)
+    )
+
+    return bulk_response(results, applied, "bulk_create_services", 201)
+
+@services_bp.route('/bulk', methods=['PATCH'])
+@services_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_update_services():
+    """Editar serviços em lote
+
+    Body: `{"items": [{"id": 1, ...}], "transactional": true}`. Cada item precisa do `id`.
+    """
+    data, validation_error = validateBody(bulk_items_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    services = Services()
+    results, applied = services.bulk_update(
+        data["items"],
+        data["transactional"],
+        load=lambda item: loadItem(bulk_update_schema, item, blocked=["created_at"])
+    )
+
+    return bulk_response(results, applied, "bulk_update_services")
+
+@services_bp.route('/bulk', methods=['DELETE'])
+@services_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def bulk_delete_services():
+    """Deletar serviços em lote
+
+    Body: `{"ids": [1, 2, 3], "transactional": true}`.
+    """
+    data, validation_error = validateBody(bulk_ids_schema, request.json)
+    if validation_error:
+        return validation_error
+
+    services = Services()
+    results, applied = services.bulk_delete(data["ids"], data["transactional"])
+
+    return bulk_response(results, applied, "bulk_delete_services")
+
+
+@services_bp.route('/export', methods=['GET'])
+@services_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def export_services():
+    """Exportar serviços
+
+    Envia todas as linhas da tabela em streaming, em CSV (padrão) ou NDJSON (`?format=ndjson`
+    ou header `Accept: application/x-ndjson`).
+    """
+    services = Services()
+    return export_response(services.export_rows(), services.handler.get_header_order(), transfer_format(), "services")
+
+@services_bp.route('/import', methods=['POST'])
+@services_bp.doc(security=[{"bearerAuth": []}])
+@jwt_required()
+def import_services():
+    """Importar serviços
+
+    Recebe as linhas no corpo da requisição em CSV com cabeçalho (`Content-Type: text/csv`)
+    ou NDJSON (`Content-Type: application/x-ndjson`), lidas em streaming.
+    As linhas são validadas em blocos e cada bloco é gravado com novos IDs em uma única escrita.
+    Linhas inválidas são ignoradas e reportadas em `errors`.
+    """
+    services = Services()
+    summary = services.import_rows(
+        read_import_rows(transfer_format()),
+        load=lambda item: loadItem(import_schema, item)
+    )
+
+    return jsonify({
+        "success": summary["failed"] == 0,
+        **summary
+    }), 200
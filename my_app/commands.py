@@ -0,0 +1,65 @@
+import click
+from flask import current_app
+from .utils.data_handler import DataHandler
+from .utils.partitioned_handler import PartitionedDataHandler, PARTITIONED_TABLES
+from .services.appointments import Appointments
+from .services.credentials import Credentials
+from .services.services import DEFAULT_DURATION
+
+
+@click.command("migrate-credentials")
+def migrate_credentials():
+    """Move a coluna `password` de employees.csv para credentials.csv.
+
+    Para instalações criadas antes da tabela de credenciais. Pode ser executado mais de uma vez:
+    se employees.csv não tiver mais a coluna, nada é alterado.
+    """
+    total = Credentials().migrate()
+    if total is None:
+        click.echo("employees.csv já não tem a coluna password.")
+        return
+
+    click.echo(f"{total} funcionário(s) migrado(s) para credentials.csv.")
+
+
+@click.command("partition-table")
+@click.argument("table", type=click.Choice(sorted(PARTITIONED_TABLES)))
+def partition_table(table):
+    """Divide `<tabela>.csv` em partições mensais (`instance/<tabela>/AAAA-MM.csv`).
+
+    Também refaz o manifest e o mapa de IDs a partir das partições existentes, então pode ser
+    executado de novo depois da migração (por exemplo, após editar as partições manualmente).
+    """
+    handler = PartitionedDataHandler(table)
+    total = handler.rebuild()
+    partitions = handler.partitions()
+    click.echo(f"{total} linha(s) em {len(partitions)} partição(ões): {', '.join(partitions)}")
+
+
+@click.command("archive-appointments")
+@click.option("--days", type=int, default=None, help="Idade mínima (dias) de scheduled_at. Padrão: ARCHIVE_AFTER_DAYS.")
+def archive_appointments(days):
+    """Move os agendamentos `finished` e `canceled` antigos para o arquivo morto
+    (`instance/archive/appointments/AAAA-MM.csv.gz`)."""
+    days = current_app.config["ARCHIVE_AFTER_DAYS"] if days is None else days
+    archived = Appointments().archive(days)
+    click.echo(f"{archived} agendamento(s) arquivado(s).")
+
+
+@click.command("migrate-service-duration")
+def migrate_service_duration():
+    """Acrescenta a coluna `duration` (minutos) a services.csv, com a duração padrão nos serviços existentes.
+
+    Pode ser executado mais de uma vez: se a coluna já existir, nada é alterado.
+    """
+    if DataHandler("services").add_column("duration", DEFAULT_DURATION):
+        click.echo(f"Coluna duration criada com {DEFAULT_DURATION} minutos nos serviços existentes.")
+    else:
+        click.echo("services.csv já tem a coluna duration.")
+
+
+def register_commands(app):
+    app.cli.add_command(migrate_credentials)
+    app.cli.add_command(partition_table)
+    app.cli.add_command(archive_appointments)
+    app.cli.add_command(migrate_service_duration)
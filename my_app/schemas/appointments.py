@@ -2,15 +2,19 @@ from marshmallow import Schema, fields, validate
 from .pets import PetSchema
 from .employee import EmployeeSchema
 from .service import ServiceSchema
+from .generic import RequestSchema
 
 class AppointmentSchema(Schema):
     id = fields.String(required=True)
     status = fields.String(required=True)
     created_at = fields.DateTime(format="%Y-%m-%d %H:%M:%S.%f",  required=True)
     scheduled_at = fields.DateTime(format="iso",  required=True)
-    employee = fields.Nested(EmployeeSchema, required=True)
-    pet = fields.Nested(PetSchema, required=True)
-    service = fields.Nested(ServiceSchema, required=True)
+    pet_id = fields.String(metadata={"description": "Retornado quando `pet` não é expandido"})
+    service_id = fields.String(metadata={"description": "Retornado quando `service` não é expandido"})
+    employee_id = fields.String(metadata={"description": "Retornado quando `employee` não é expandido"})
+    employee = fields.Nested(EmployeeSchema, metadata={"description": "Retornado com `expand=employee`"})
+    pet = fields.Nested(PetSchema, metadata={"description": "Retornado com `expand=pet`"})
+    service = fields.Nested(ServiceSchema, metadata={"description": "Retornado com `expand=service`"})
 
 class GetAppointmentResponseSchema(Schema):
     success = fields.Boolean(
@@ -111,7 +115,7 @@ class GetAppointmentsByIDResponseNoutFoundSchema(Schema):
             }
         )
     
-class CreateAppointmentSchema(Schema):
+class CreateAppointmentSchema(RequestSchema):
     pet_id = fields.Integer(
         required=True,
         metadata={
@@ -205,14 +209,9 @@ class UpdateAppointmentResponseFailedSchema(Schema):
             }
         )
     
-class UpdateAppointmentSchema(Schema):
-    pet_id = fields.Integer(
-        required=False,
-        metadata={
-            "description": "ID do Pet que será atendido.",
-            "example": 1
-        }
-    )
+class UpdateAppointmentSchema(RequestSchema):
+    CREATE_SCHEMA = CreateAppointmentSchema
+
     service_id = fields.Integer(
         required=False,
         metadata={
@@ -237,9 +236,20 @@ class UpdateAppointmentSchema(Schema):
     )
     status = fields.String(
         required=False,
-        validate=validate.OneOf(["scheduled", "finished", "canceled"]),
+        validate=validate.OneOf(["scheduled", "finished", "canceled"], error="O status informado é inválido. Valores válidos: {choices}"),
         metadata={
             "description": "Status do agendamento. Valores permitidos: 'scheduled', 'finished', 'canceled'.",
             "example": "finished"
         }
     )
+
+class ImportAppointmentSchema(CreateAppointmentSchema):
+    status = fields.String(
+        required=False,
+        validate=validate.OneOf(["scheduled", "finished", "canceled"], error="O status informado é inválido. Valores válidos: {choices}"),
+        metadata={"description": "Status do agendamento importado. Padrão: 'scheduled'."}
+    )
+    created_at = fields.String(
+        required=False,
+        metadata={"description": "Data de criação original do agendamento."}
+    )
@@ -1,6 +1,7 @@
 from marshmallow import Schema, fields
+from .generic import RequestSchema
 
-class LoginSchema(Schema):
+class LoginSchema(RequestSchema):
     email = fields.String(
         required=True, 
         metadata={
@@ -50,6 +51,10 @@ class RefreshSchema(Schema):
         required=True,
         metadata={"description": "Token JWT para acesso às rotas protegidas"}
     )
+    refresh_token = fields.String(
+        required=True,
+        metadata={"description": "Novo refresh token (o anterior é revogado)"}
+    )
 
 class RefreshResponseFailedSchema(Schema):
     success = fields.Boolean(
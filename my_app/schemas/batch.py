@@ -0,0 +1,13 @@
+from marshmallow import fields, validate
+from .generic import RequestSchema
+
+class BatchSchema(RequestSchema):
+    requests = fields.List(
+        fields.Raw(),
+        required=True,
+        validate=validate.Length(min=1, error="Envie ao menos uma requisição."),
+        metadata={
+            "description": "Sub-requisições com `id`, `method`, `path` e `body` (opcional).",
+            "example": [{"id": "pet", "method": "GET", "path": "/pets/1?expand=owner"}]
+        }
+    )
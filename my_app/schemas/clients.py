@@ -1,5 +1,5 @@
 from marshmallow import Schema, fields
-from .pets import PetSchema
+from .generic import RequestSchema
 
 class ClientSchema(Schema):
     id = fields.String(required=True)
@@ -7,7 +7,7 @@ class ClientSchema(Schema):
     email = fields.String(required=True)
     phone = fields.String(required=True)
     created_at = fields.DateTime(format="%Y-%m-%d %H:%M:%S.%f", required=True)
-    pets = fields.List(fields.Nested(PetSchema), required=True)
+    pets = fields.List(fields.Raw(), required=True, metadata={"description": "IDs dos pets, ou os pets completos com `expand=pets`"})
 
 class GetClientsResponseSchema(Schema):
     success = fields.Boolean(
@@ -98,7 +98,7 @@ class GetClientsByIDResponseNoutFoundSchema(Schema):
             }
         )
     
-class CreateClientSchema(Schema):
+class CreateClientSchema(RequestSchema):
     name = fields.String(
         required=True,
         metadata={
@@ -185,7 +185,9 @@ class UpdateClientResponseFailedSchema(Schema):
             }
         )
     
-class UpdateClientSchema(Schema):
+class UpdateClientSchema(RequestSchema):
+    CREATE_SCHEMA = CreateClientSchema
+
     name = fields.String(
         required=False,
         metadata={
@@ -208,3 +210,9 @@ class UpdateClientSchema(Schema):
         }
     )
 
+
+class ImportClientSchema(CreateClientSchema):
+    created_at = fields.String(
+        required=False,
+        metadata={"description": "Data de criação original, mantida na importação."}
+    )
@@ -1,4 +1,5 @@
 from marshmallow import Schema, fields
+from .generic import RequestSchema
 
 class EmployeeSchema(Schema):
     id = fields.String(required=True)
@@ -74,4 +75,43 @@ class GetEmployeesByIDResponseNoutFoundSchema(Schema):
             "example": "Funcionário não encontrado"
             }
         )
-  
+
+class CreateEmployeeSchema(RequestSchema):
+    name = fields.String(
+        required=True,
+        metadata={"description": "Nome completo do funcionário.", "example": "Maria Souza"}
+    )
+    job_title = fields.String(
+        required=True,
+        metadata={"description": "Cargo do funcionário.", "example": "Veterinária"}
+    )
+    email = fields.String(
+        required=True,
+        metadata={"description": "Email de acesso do funcionário.", "example": "maria@petshop.com"}
+    )
+    password = fields.String(
+        required=True,
+        load_only=True,
+        metadata={"description": "Senha de acesso."}
+    )
+
+class UpdateEmployeeSchema(RequestSchema):
+    CREATE_SCHEMA = CreateEmployeeSchema
+
+    name = fields.String(
+        required=False,
+        metadata={"description": "Nome completo do funcionário.", "example": "Maria Souza"}
+    )
+    job_title = fields.String(
+        required=False,
+        metadata={"description": "Cargo do funcionário.", "example": "Veterinária"}
+    )
+    email = fields.String(
+        required=False,
+        metadata={"description": "Email de acesso do funcionário.", "example": "maria@petshop.com"}
+    )
+    password = fields.String(
+        required=False,
+        load_only=True,
+        metadata={"description": "Nova senha de acesso."}
+    )
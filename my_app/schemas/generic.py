@@ -1,4 +1,6 @@
-from marshmallow import Schema, fields
+from datetime import datetime
+from typing import Optional
+from marshmallow import EXCLUDE, Schema, ValidationError, fields, post_load, pre_load, validate
 
 class GenericSuccessSchema(Schema):
     success = fields.Boolean(
@@ -6,4 +8,83 @@ class GenericSuccessSchema(Schema):
         metadata={
             "example": True
         }
-    )
\ No newline at end of file
+    )
+
+class RequestSchema(Schema):
+    """Base dos schemas de entrada (corpo das requisições).
+
+    Os schemas são instanciados uma única vez, na importação das rotas, e reaproveitados.
+    Campos desconhecidos são descartados, campos vazios contam como não informados e
+    datas voltam para texto no formato gravado nos CSVs.
+
+    Nas edições (schemas com `CREATE_SCHEMA`), "" e null não são ignorados: limpam os campos
+    opcionais e são recusados nos campos obrigatórios na criação.
+    """
+    DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+    CREATE_SCHEMA: Optional[type] = None
+
+    class Meta:
+        unknown = EXCLUDE
+
+    @pre_load
+    def remove_empty(self, data, **kwargs):
+        if not isinstance(data, dict):
+            return data
+
+        empty = [key for key, value in data.items() if value in ("", None)]
+        if self.CREATE_SCHEMA is not None:
+            required = [
+                key for key in empty
+                if key in self.fields and getattr(self.CREATE_SCHEMA._declared_fields.get(key), "required", False)
+            ]
+            if required:
+                raise ValidationError({key: ["Este campo não pode ficar vazio."] for key in required})
+
+        return {key: value for key, value in data.items() if key not in empty}
+
+    @post_load(pass_original=True)
+    def keep_cleared(self, data, original_data, **kwargs):
+        ## campos opcionais enviados vazios em uma edição: gravados vazios
+        if self.CREATE_SCHEMA is None or not isinstance(original_data, dict):
+            return data
+        cleared = {
+            key: "" for key, value in original_data.items()
+            if value in ("", None) and key in self.fields and not self.fields[key].dump_only
+        }
+        return {**cleared, **data}
+
+    @post_load
+    def format_dates(self, data, **kwargs):
+        return {
+            key: value.strftime(self.DATE_FORMAT) if isinstance(value, datetime) else value
+            for key, value in data.items()
+        }
+
+class BulkItemsSchema(RequestSchema):
+    items = fields.List(
+        fields.Raw(),
+        required=True,
+        validate=validate.Length(min=1, error="Envie ao menos um item."),
+        metadata={"description": "Itens do lote, no mesmo formato da rota individual."}
+    )
+    transactional = fields.Boolean(
+        load_default=True,
+        metadata={"description": "Se verdadeiro (padrão), nada é gravado quando algum item falha."}
+    )
+
+class BulkIdsSchema(RequestSchema):
+    ids = fields.List(
+        fields.Raw(),
+        required=True,
+        validate=validate.Length(min=1, error="Envie ao menos um ID."),
+        metadata={"description": "IDs dos registros.", "example": [1, 2, 3]}
+    )
+    transactional = fields.Boolean(
+        load_default=True,
+        metadata={"description": "Se verdadeiro (padrão), nada é removido quando algum ID falha."}
+    )
+
+def extendSchema(schema: type, name: str, **extra_fields) -> type:
+    """Cria uma subclasse do schema com campos extras (ex.: o `id` de cada item nas rotas em lote)."""
+    return type(name, (schema,), extra_fields)
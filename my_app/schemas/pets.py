@@ -1,4 +1,5 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, pre_load, validate
+from .generic import RequestSchema
 
 # -----------------------------------------------------------------------------
 # SCHEMA PRINCIPAL 
@@ -9,7 +10,7 @@ class PetSchema(Schema):
     specie = fields.String(required=True)
     sex = fields.String(required=True)
     age = fields.Integer(required=True)
-    owner_id = fields.Dict(required=True)
+    owner_id = fields.Raw(required=True, metadata={"description": "ID do dono, ou o objeto do dono com `expand=owner`"})
     created_at = fields.DateTime(format="%Y-%m-%d %H:%M:%S.%f", required=True)
 
 # -----------------------------------------------------------------------------
@@ -79,7 +80,14 @@ class GetPetsByIDResponseNotFoundSchema(Schema):
 # -----------------------------------------------------------------------------
 # SCHEMAS DE CRIAÇÃO (POST)
 # -----------------------------------------------------------------------------
-class CreatePetSchema(Schema):
+class PetRequestSchema(RequestSchema):
+    @pre_load
+    def normalize_sex(self, data, **kwargs):
+        if isinstance(data, dict) and isinstance(data.get("sex"), str):
+            return {**data, "sex": data["sex"].upper()}
+        return data
+
+class CreatePetSchema(PetRequestSchema):
     name = fields.String(
         required=True,
         metadata={"description": "Nome do pet.", "example": "Rex"}
@@ -90,6 +98,7 @@ class CreatePetSchema(Schema):
     )
     sex = fields.String(
         required=True,
+        validate=validate.OneOf(["M", "F"], error="O campo 'sex' deve ser 'M' (Macho) ou 'F' (Fêmea)."),
         metadata={"description": "Sexo do pet (M ou F).", "example": "M"}
     )
     age = fields.Integer(
@@ -141,7 +150,9 @@ class DeletePetResponseFailedSchema(Schema):
 # -----------------------------------------------------------------------------
 # SCHEMAS DE ATUALIZAÇÃO (PATCH)
 # -----------------------------------------------------------------------------
-class UpdatePetSchema(Schema):
+class UpdatePetSchema(PetRequestSchema):
+    CREATE_SCHEMA = CreatePetSchema
+
     name = fields.String(
         required=False,
         metadata={"description": "Nome do pet.", "example": "Rex Silva"}
@@ -152,13 +163,17 @@ class UpdatePetSchema(Schema):
     )
     sex = fields.String(
         required=False,
+        validate=validate.OneOf(["M", "F"], error="O campo 'sex' deve ser 'M' (Macho) ou 'F' (Fêmea)."),
         metadata={"description": "Sexo do pet (M ou F).", "example": "M"}
     )
     age = fields.Integer(
         required=False,
         metadata={"description": "Idade do pet.", "example": 6}
     )
-    # owner_id geralmente não se altera no update simples, mas pode ser adicionado se necessário
+    owner_id = fields.Integer(
+        required=False,
+        metadata={"description": "ID do novo dono (Client) do pet.", "example": 1}
+    )
 
 class UpdatePetResponseFailedSchema(Schema):
     success = fields.Boolean(
@@ -175,4 +190,11 @@ class UpdatePetResponseFailedSchema(Schema):
             "description": "Mensagem de erro",
             "example": "ID não existe"
         }
-    )
\ No newline at end of file
+    )
+
+
+class ImportPetSchema(CreatePetSchema):
+    created_at = fields.String(
+        required=False,
+        metadata={"description": "Data de criação original, mantida na importação."}
+    )
@@ -0,0 +1,58 @@
+from marshmallow import fields, validate
+from .generic import RequestSchema
+
+class CreateRecurrenceSchema(RequestSchema):
+    pet_id = fields.Integer(
+        required=True,
+        metadata={"description": "ID do Pet.", "example": 1}
+    )
+    service_id = fields.Integer(
+        required=True,
+        metadata={"description": "ID do Serviço a ser realizado.", "example": 1}
+    )
+    employee_id = fields.Integer(
+        required=True,
+        metadata={"description": "ID do Funcionário responsável pelo atendimento.", "example": 1}
+    )
+    starts_at = fields.DateTime(
+        required=True,
+        format="iso",
+        metadata={"description": "Data e hora da primeira ocorrência (formato ISO 8601).", "example": "2025-12-18T10:00:00"}
+    )
+    frequency = fields.String(
+        required=True,
+        validate=validate.OneOf(["daily", "weekly", "monthly"], error="A frequência informada é inválida. Valores válidos: {choices}"),
+        metadata={"description": "Frequência: 'daily', 'weekly' ou 'monthly'.", "example": "weekly"}
+    )
+    interval = fields.Integer(
+        required=False,
+        validate=validate.Range(min=1, error="O intervalo deve ser de pelo menos {min}."),
+        metadata={"description": "Repete a cada N períodos da frequência. O padrão é 1.", "example": 2}
+    )
+    until = fields.DateTime(
+        required=False,
+        format="iso",
+        metadata={"description": "Data e hora limite das ocorrências (inclusiva).", "example": "2026-06-30T23:59:59"}
+    )
+    count = fields.Integer(
+        required=False,
+        validate=validate.Range(min=1, error="A quantidade deve ser de pelo menos {min}."),
+        metadata={"description": "Quantidade máxima de ocorrências.", "example": 10}
+    )
+
+class RecurrenceExceptionSchema(RequestSchema):
+    occurrence_at = fields.DateTime(
+        required=True,
+        format="iso",
+        metadata={"description": "Data e hora original da ocorrência alterada.", "example": "2025-12-25T10:00:00"}
+    )
+    status = fields.String(
+        required=False,
+        validate=validate.OneOf(["scheduled", "finished", "canceled"], error="O status informado é inválido. Valores válidos: {choices}"),
+        metadata={"description": "Novo status da ocorrência.", "example": "canceled"}
+    )
+    scheduled_at = fields.DateTime(
+        required=False,
+        format="iso",
+        metadata={"description": "Nova data e hora da ocorrência (remarcação).", "example": "2025-12-26T10:00:00"}
+    )
@@ -1,9 +1,57 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+from .generic import RequestSchema
 
 class ServiceSchema(Schema):
     id = fields.String(required=True)
     name = fields.String(required=True)
     value = fields.Float(required=True)
     description = fields.String(required=True)
+    duration = fields.Integer(required=True)
     created_at = fields.DateTime(format="%Y-%m-%d %H:%M:%S.%f", required=True)
 
+class CreateServiceSchema(RequestSchema):
+    name = fields.String(
+        required=True,
+        metadata={"description": "Nome do serviço.", "example": "Banho e tosa"}
+    )
+    description = fields.String(
+        required=True,
+        metadata={"description": "Descrição do serviço.", "example": "Banho completo com tosa higiênica"}
+    )
+    value = fields.Float(
+        required=True,
+        metadata={"description": "Valor do serviço.", "example": 80.0}
+    )
+    duration = fields.Integer(
+        required=False,
+        validate=validate.Range(min=1, error="A duração deve ser de pelo menos {min} minuto."),
+        metadata={"description": "Duração do serviço em minutos. O padrão é 30.", "example": 60}
+    )
+
+class UpdateServiceSchema(RequestSchema):
+    CREATE_SCHEMA = CreateServiceSchema
+
+    name = fields.String(
+        required=False,
+        metadata={"description": "Nome do serviço.", "example": "Banho e tosa"}
+    )
+    description = fields.String(
+        required=False,
+        metadata={"description": "Descrição do serviço.", "example": "Banho completo com tosa higiênica"}
+    )
+    value = fields.Float(
+        required=False,
+        metadata={"description": "Valor do serviço.", "example": 90.0}
+    )
+    duration = fields.Integer(
+        required=False,
+        validate=validate.Range(min=1, error="A duração deve ser de pelo menos {min} minuto."),
+        metadata={"description": "Duração do serviço em minutos.", "example": 45}
+    )
+
+
+class ImportServiceSchema(CreateServiceSchema):
+    created_at = fields.String(
+        required=False,
+        metadata={"description": "Data de criação original, mantida na importação."}
+    )
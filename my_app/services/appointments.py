@@ -1,42 +1,142 @@
-from ..utils.data_handler import DataHandler
+from ..utils.partitioned_handler import PartitionedDataHandler
 from ..utils.validate import validateScheduledAt
-from datetime import datetime as dt, date
+from datetime import datetime as dt, date, timedelta
 from .pets import Pets
-from .services import Services
+from .services import Services, DEFAULT_DURATION
 from .employees import Employees
-from typing import List, Dict, Any
+from .schedule import Schedule
+from .recurrences import Recurrences
+from typing import List, Dict, Any, Optional
+from ..utils.streaming import chunked
+from ..utils.bulk import run_bulk
+from ..utils.transfer import run_import
+from ..utils.archive import Archive
+from ..utils.intervals import parse_epoch
+from flask import current_app
+
+STATUS_ALLOWED = ["scheduled", "finished", "canceled"]
+
+## status dos agendamentos que podem ir para o arquivo morto
+STATUS_ARCHIVED = ["finished", "canceled"]
 
 class Appointments:
     def __init__(self):
-        self.handler = DataHandler("appointments")
+        self.handler = PartitionedDataHandler("appointments")
     
-    def list(self):
+    def list(self, expand: dict = None):
         data = self.handler.list_all()
-        return self.get_relationship(data)
+        return self.get_relationship(data, expand)
     
     def create(self, data: dict):
+        ## a checagem de horário e a escrita acontecem juntas com o lock (ver write_new)
+        self.handler.submit_create(data, self.write_new)
+
+    def write_new(self, items: List[dict]) -> List[Optional[Exception]]:
+        """Valida e grava agendamentos novos com o lock da tabela, para dois creates não ocuparem o mesmo horário.
+
+        Os itens podem ser creates concorrentes agrupados pelo buffer de escrita (ver DataHandler.submit_create):
+        todos são checados com a mesma agenda, então também não conflitam entre si. Retorna o erro de cada item (ou None).
+        """
+        with self.handler.lock():
+            schedule = Schedule(self.handler)
+            rows, errors = [], []
+            for item in items:
+                try:
+                    rows.append(self.prepare_create(item, schedule))
+                    errors.append(None)
+                except Exception as err:
+                    errors.append(err)
+
+            self.handler.bulk_create(rows)
+        return errors
+
+    def prepare_create(self, data: dict, schedule: Schedule = None):
+        """Valida um novo agendamento e retorna a linha que será gravada.
+
+        `schedule` é compartilhado entre os itens de um lote, para que eles não conflitem entre si.
+        """
         pets = Pets()
         services = Services()
         employees = Employees()
 
-        if not pets.get_by_id(data.get("pet_id")):
+        if not pets.exists(data.get("pet_id")):
             raise Exception("Pet não encontrado")
         
-        if not services.get_by_id(data.get("service_id")):
+        if not services.exists(data.get("service_id")):
             raise Exception("Serviço não encontrado")
         
-        if not employees.get_by_id(data.get("employee_id")):
+        if not employees.exists(data.get("employee_id")):
             raise Exception("Funcionário não encontrado")
 
         if not validateScheduledAt(data.get("scheduled_at")):
             raise Exception("Informe uma data válida")
+
+        (schedule or Schedule(self.handler)).reserve({**data, "status": "scheduled"})
         
-        self.handler.create({** data, "created_at": dt.now() , "status": "scheduled"})
+        return {** data, "created_at": dt.now() , "status": "scheduled"}
+
+    def prepare_import(self, data: dict, schedule: Schedule = None):
+        """Valida um agendamento histórico: aceita datas passadas e mantém `status` e `created_at` informados."""
+        pets = Pets()
+        services = Services()
+        employees = Employees()
+
+        if not pets.exists(data.get("pet_id")):
+            raise Exception("Pet não encontrado")
+        
+        if not services.exists(data.get("service_id")):
+            raise Exception("Serviço não encontrado")
+        
+        if not employees.exists(data.get("employee_id")):
+            raise Exception("Funcionário não encontrado")
+
+        try:
+            dt.strptime(data.get("scheduled_at") or "", '%Y-%m-%dT%H:%M:%S.%f')
+        except ValueError:
+            raise Exception("Informe uma data válida")
+
+        status = data.get("status") or "scheduled"
+        if status not in STATUS_ALLOWED:
+            raise Exception(f"O status informado é inválido. Valores válidos: {', '.join(STATUS_ALLOWED)}")
+
+        (schedule or Schedule(self.handler)).reserve({**data, "status": status})
+
+        return {**data, "status": status, "created_at": data.get("created_at") or dt.now()}
+
+    def import_rows(self, rows, load=None):
+        """Importa linhas em blocos, com uma escrita sob lock por bloco (ver utils/transfer.py)."""
+        current = {}
+
+        def prepare():
+            ## agenda refeita com o lock de cada bloco
+            schedule = current["schedule"] = Schedule(self.handler)
+            return lambda item: self.prepare_import(item, schedule)
+
+        return run_import(
+            self.handler, rows, prepare, load,
+            on_item=lambda line: current["schedule"].set_item(f"linha {line} do arquivo")
+        )
+
+    def export_rows(self):
+        """Linhas cruas da tabela (apenas os IDs dos relacionamentos), lidas em streaming."""
+        return self.handler.iter_rows()
 
     def delete(self, id):
         self.handler.delete(id)
+
+    def exists(self, id) -> bool:
+        return self.handler.exists(id)
     
     def update(self, id, data: dict):
+        with self.handler.lock():
+            self.handler.update(self.prepare_update(id, data))
+
+    def prepare_update(self, id, data: dict, schedule: Schedule = None):
+        """Valida a alteração de um agendamento e retorna a linha parcial que será gravada.
+
+        Se a alteração mexe no horário, serviço, funcionário ou status, o novo horário é checado
+        contra a agenda do funcionário.
+        """
         pets = Pets()
         services = Services()
         employees = Employees()
@@ -45,28 +145,82 @@ class Appointments:
         service_id = data.get("service_id", None)
         employee_id = data.get("employee_id", None)
         scheduled_at = data.get("scheduled_at", None)
+        status = data.get("status", None)
+
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
         
-        if pet_id and not pets.get_by_id(pet_id):
+        if pet_id and not pets.exists(pet_id):
             raise Exception("Pet não encontrado")
         
-        if service_id and not services.get_by_id(service_id):
+        if service_id and not services.exists(service_id):
             raise Exception("Serviço não encontrado")
         
-        if employee_id and not employees.get_by_id(employee_id):
+        if employee_id and not employees.exists(employee_id):
             raise Exception("Funcionário não encontrado")
 
         if scheduled_at and not validateScheduledAt(scheduled_at):
             raise Exception("Informe uma data válida")
+
+        if status and status not in STATUS_ALLOWED:
+            raise Exception(f"O status informado é inválido. Valores válidos: {', '.join(STATUS_ALLOWED)}")
+
+        if any(data.get(key) for key in ("scheduled_at", "service_id", "employee_id", "status")):
+            current = self.handler.get_by_id(id) or {}
+            (schedule or Schedule(self.handler)).reserve({**current, **data}, id)
         
-        self.handler.update({**data, "id": id})
+        return {**data, "id": id}
+
+    def bulk_create(self, items: List[dict], transactional: bool = True, load=None):
+        schedule = Schedule(self.handler)
+        return run_bulk(
+            items, lambda item: self.prepare_create(item, schedule), self.handler.bulk_create, transactional, self.handler.lock(), load,
+            on_item=lambda index: schedule.set_item(f"item {index} do lote")
+        )
 
-    def get_by_id(self, id):
+    def bulk_update(self, items: List[dict], transactional: bool = True, load=None):
+        schedule = Schedule(self.handler)
+        return run_bulk(
+            items, lambda item: self.prepare_update(item.get("id"), item, schedule), self.handler.bulk_update, transactional, self.handler.lock(), load,
+            on_item=lambda index: schedule.set_item(f"item {index} do lote")
+        )
+
+    def bulk_delete(self, ids: List[Any], transactional: bool = True):
+        return run_bulk(ids, self.prepare_delete, lambda rows: self.handler.bulk_delete(row["id"] for row in rows), transactional, self.handler.lock())
+
+    def prepare_delete(self, id):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        return {"id": id}
+
+    def get_by_id(self, id, expand: dict = None):
         appointment = self.handler.get_by_id(id)
         if appointment:
-            return self.get_relationship([appointment])[0]
+            return self.get_relationship([appointment], expand)[0]
         return None
     
-    def search(self, filters: dict):
+    def search(self, filters: dict, expand: dict = None):
+        query = self.build_query(filters)
+        data = self.handler.search(query)
+
+        ## com um prefixo de data (ex: scheduled_at=2025-12) as ocorrências recorrentes do período entram na busca
+        start, end = self.handler.prune_bounds(query)
+        if start is not None and end is not None:
+            occurrences = Recurrences().occurrences(*self.month_window(start, end))
+            data = self.sort_by_time([*data, *self.handler.iter_search(query, occurrences)]) if occurrences else data
+
+        return self.get_relationship(data, expand)
+
+    def month_window(self, start: str, end: str):
+        """Janela (em segundos) dos meses inteiros entre dois prefixos de data (`AAAA-MM...`)."""
+        year, month = int(end[:4]), int(end[5:7])
+        following = f"{year + month // 12:04d}-{month % 12 + 1:02d}-01"
+        return parse_epoch(f"{start[:7]}-01"), parse_epoch(following)
+
+    def sort_by_time(self, rows: List[Dict[str, Any]]):
+        return sorted(rows, key=lambda row: parse_epoch(row.get("scheduled_at")) or 0)
+
+    def build_query(self, filters: dict):
         pets = Pets()
         services = Services()
         employees = Employees()
@@ -91,31 +245,234 @@ class Appointments:
                     del filters[key]
                     
                 
-        data = self.handler.search({
+        return {
             "logic": filters.get("logic", "AND"),
             "criteria": list(filter(lambda item: item.get("key", "") not in filters_to_remove,[{"key": key, "value": value, "operator": filters.get("operator", "CONTAINS")} for key,value in filters.items()]))
-        })
-        return self.get_relationship(data)
+        }
+
+    def between(self, start: str = None, end: str = None, filters: dict = None, expand: dict = None):
+        """Agendamentos com `scheduled_at` a partir de `start` (inclusivo) e antes de `end` (exclusivo),
+        em ordem de horário. As datas são ISO (`2025-12-18` ou `2025-12-18T10:00`) e os limites são opcionais.
+
+        Usa o índice por data das partições (ver utils/partitioned_handler.py), sem percorrer a tabela.
+        """
+        return self.get_relationship(self.range_rows(start, end, filters), expand)
+
+    def range_rows(self, start: str = None, end: str = None, filters: dict = None):
+        bounds = []
+        for value in (start, end):
+            epoch = parse_epoch(value)
+            if value and epoch is None:
+                raise Exception("Informe datas válidas nos parâmetros from e to (ex: 2025-12-18 ou 2025-12-18T10:00)")
+            bounds.append(epoch)
+
+        rows = self.handler.list_range(*bounds)
+
+        ## ocorrências recorrentes geradas apenas para a janela consultada (sem `to`, até o horizonte configurado)
+        start_epoch, end_epoch = bounds
+        if end_epoch is None:
+            end_epoch = start_epoch + current_app.config["RECURRENCE_HORIZON_DAYS"] * 86400
+        occurrences = Recurrences().occurrences(start_epoch if start_epoch is not None else 0, end_epoch)
+        if occurrences:
+            rows = self.sort_by_time([*rows, *occurrences])
+
+        if filters:
+            rows = list(self.handler.iter_search(self.build_query(filters), rows))
+        return rows
+
+    def iter_all(self, filters: dict = None, expand: dict = None, start: str = None, end: str = None):
+        """Versão em streaming de `list`/`search`/`between`: popula os relacionamentos em blocos."""
+        if start or end:
+            rows = self.range_rows(start, end, filters)
+        else:
+            rows = self.handler.iter_search(self.build_query(filters)) if filters else self.handler.iter_rows()
+        return self.iter_related(rows, expand)
+
+    def iter_related(self, rows, expand: dict = None):
+        for chunk in chunked(rows):
+            yield from self.get_relationship(chunk, expand)
     
-    def get_relationship(self, list: List[Dict[str, Any]]):
+    def availability(self, service_id, day: str, employee_id=None) -> List[Dict[str, Any]]:
+        """Horários livres de um serviço em um dia (`AAAA-MM-DD`), por funcionário.
+
+        Usa o horário de funcionamento (`BUSINESS_HOURS`, `BUSINESS_DAYS`) e a grade de `SLOT_STEP_MINUTES`,
+        e lê apenas os agendamentos do dia de cada funcionário nos índices da agenda (ver services/schedule.py).
+        Sem `employee_id`, retorna todos os funcionários.
+        """
+        services = Services()
+        employees = Employees()
+
+        if not services.exists(service_id):
+            raise Exception("Serviço não encontrado")
+
+        if employee_id is not None and not employees.exists(employee_id):
+            raise Exception("Funcionário não encontrado")
+
+        try:
+            parsed_day = dt.strptime(day or "", "%Y-%m-%d")
+        except ValueError:
+            raise Exception("Informe uma data válida no formato AAAA-MM-DD")
+
+        opening, closing = current_app.config["BUSINESS_HOURS"].split("-")
+        start = parse_epoch(f"{day}T{opening.strip()}")
+        end = parse_epoch(f"{day}T{closing.strip()}")
+        if start is None or end is None:
+            raise Exception("BUSINESS_HOURS inválido")
+
+        employee_ids = [str(employee_id)] if employee_id is not None else sorted(employees.handler.get_id_set(), key=int)
+        if parsed_day.weekday() not in current_app.config["BUSINESS_DAYS"]:
+            return [{"employee_id": id, "slots": []} for id in employee_ids]
+
+        schedule = Schedule(self.handler)
+        duration = schedule.durations().get(str(service_id), DEFAULT_DURATION)
+        now = parse_epoch(dt.now().isoformat())
+
+        return [
+            {
+                "employee_id": id,
+                "slots": schedule.free_slots(id, start, end, duration, current_app.config["SLOT_STEP_MINUTES"], now)
+            }
+            for id in employee_ids
+        ]
+
+    def archive(self, days: int) -> int:
+        """Move para o arquivo morto (ver utils/archive.py) os agendamentos `finished` ou `canceled`
+        com `scheduled_at` há mais de `days` dias. Retorna a quantidade de agendamentos arquivados.
+
+        As linhas são gravadas no arquivo morto antes de sair da tabela, com o lock da tabela.
+        """
+        cutoff = (dt.now() - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+        with self.handler.lock():
+            rows = [row for row in self.handler.list_between(end=cutoff) if row.get("status") in STATUS_ARCHIVED]
+            if not rows:
+                return 0
+
+            Archive("appointments", "scheduled_at").append(rows, self.handler.get_header_order())
+            self.handler.bulk_delete(row["id"] for row in rows)
+
+        return len(rows)
+
+    def iter_archived(self, filters: dict = None, start: str = None, end: str = None, expand: dict = None):
+        """Agendamentos do arquivo morto (somente leitura), com os mesmos filtros de `search`."""
+        rows = Archive("appointments", "scheduled_at").iter_rows(start, end)
+        if filters:
+            rows = self.handler.iter_search(self.build_query(filters), rows)
+
+        for chunk in chunked(rows):
+            yield from self.get_relationship(chunk, expand)
+
+    def get_archived(self, id, expand: dict = None):
+        appointment = Archive("appointments", "scheduled_at").get_by_id(id)
+        if appointment:
+            return self.get_relationship([appointment], expand)[0]
+        return None
+
+    def list_recurrences(self, expand: dict = None):
+        return self.get_relationship(Recurrences().list(), expand)
+
+    def create_recurrence(self, data: dict):
+        """Cria uma regra de agendamento recorrente (uma linha, sem gravar as ocorrências).
+
+        As ocorrências dos próximos `RECURRENCE_HORIZON_DAYS` dias são checadas contra a agenda
+        do funcionário, com o lock da tabela de agendamentos.
+        """
         pets = Pets()
         services = Services()
         employees = Employees()
 
+        if not pets.exists(data.get("pet_id")):
+            raise Exception("Pet não encontrado")
+
+        if not services.exists(data.get("service_id")):
+            raise Exception("Serviço não encontrado")
+
+        if not employees.exists(data.get("employee_id")):
+            raise Exception("Funcionário não encontrado")
+
+        if not validateScheduledAt(data.get("starts_at")):
+            raise Exception("Informe uma data válida")
+
+        if data.get("until") and data["until"] < data["starts_at"]:
+            raise Exception("A data limite deve ser posterior à primeira ocorrência")
+
+        recurrences = Recurrences()
+        rule = {"interval": 1, **data}
+        start = parse_epoch(rule["starts_at"])
+        horizon = start + current_app.config["RECURRENCE_HORIZON_DAYS"] * 86400
+
+        with self.handler.lock():
+            schedule = Schedule(self.handler)
+            for occurrence_at in recurrences.dates(rule, start, horizon):
+                schedule.set_item(f"ocorrência de {occurrence_at[:16].replace('T', ' ')} desta regra")
+                schedule.reserve({**rule, "scheduled_at": occurrence_at, "status": "scheduled"})
+
+            recurrences.create({**rule, "created_at": dt.now()})
+
+    def delete_recurrence(self, id):
+        recurrences = Recurrences()
+        if not recurrences.exists(id):
+            raise Exception("ID não existe")
+        recurrences.delete(id)
+
+    def add_recurrence_exception(self, id, data: dict):
+        """Altera uma ocorrência de uma regra recorrente (cancelar, concluir ou remarcar).
+
+        A alteração é gravada como exceção da ocorrência (chaveada pela data original); a regra não muda.
+        Uma remarcação é checada contra a agenda do funcionário.
+        """
+        recurrences = Recurrences()
+        rule = recurrences.get_by_id(id)
+        if not rule:
+            raise Exception("Recorrência não encontrada")
+
+        occurrence_at = data.get("occurrence_at")
+        if not recurrences.is_occurrence(rule, occurrence_at):
+            raise Exception("A data informada não é uma ocorrência desta recorrência")
+
+        if not data.get("status") and not data.get("scheduled_at"):
+            raise Exception("Informe o novo status ou a nova data da ocorrência")
+
+        if data.get("scheduled_at") and not validateScheduledAt(data["scheduled_at"]):
+            raise Exception("Informe uma data válida")
+
+        with self.handler.lock():
+            override = recurrences.overrides().get(str(id), {}).get(occurrence_at)
+            current = recurrences.occurrence(rule, occurrence_at, override)
+            Schedule(self.handler).reserve({**current, **data}, current["id"])
+
+            recurrences.add_exception(id, data)
+
+    def get_relationship(self, list: List[Dict[str, Any]], expand: dict = None):
+        """Substitui `pet_id`, `service_id` e `employee_id` pelos objetos completos
+        apenas para os relacionamentos presentes em `expand` (ex: pet, pet.owner, service, employee).
+        Os relacionamentos não expandidos continuam retornando apenas o ID.
+        """
+        if not expand:
+            return list
+
+        entities = {
+            "pet": Pets(),
+            "service": Services(),
+            "employee": Employees(),
+        }
+
+        ## carrega cada relacionamento expandido uma única vez para todo o lote
+        related = {}
+        for key, entity in entities.items():
+            if key in expand:
+                related[key] = entity.get_many({value.get(f"{key}_id") for value in list})
+
+        if "pet" in related:
+            entities["pet"].get_relationship([*related["pet"].values()], expand["pet"])
+
         for index, value in enumerate(list):
-            pet_id = value.pop("pet_id")
-            service_id = value.pop("service_id")
-            employee_id = value.pop("employee_id")
-
-            pet = pets.get_by_id(pet_id)
-            service = services.get_by_id(service_id)
-            employee = employees.get_by_id(employee_id)
-
-            list[index] = {
-                **value,
-                "pet": pet,
-                "service": service,
-                "employee": employee
-            }
+            new_value = {**value}
+
+            for key in related:
+                related_id = new_value.pop(f"{key}_id", None)
+                new_value[key] = related[key].get(str(related_id))
+
+            list[index] = new_value
 
         return list
@@ -1,32 +1,59 @@
+from flask import current_app
 from .employees import Employees
-from werkzeug.security import check_password_hash, generate_password_hash
-from flask_jwt_extended import create_access_token, create_refresh_token
+from .credentials import Credentials
+from ..utils.passwords import hash_password, needs_rehash, verify_password
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jti
+from ..utils.revocation import revocation_store
 
 class Auth:    
     def login(self, data: dict):
         email = data.get("email")
         password = data.get("password")
         employees = Employees()
+        credentials = Credentials()
 
-        employee = employees.search({
-            "email": email
-        }, include_password=True)
+        ## busca exata pelo índice de emails; o hash da senha fica em credentials.csv
+        ## e é conferido no pool dedicado (utils/passwords.py)
+        employee = employees.get_by_email(email)
+        pwhash = credentials.get_hash(employee.get("id")) if employee else None
 
-        if employee and check_password_hash(employee[0].get("password", None), password):
-            user_data = employee[0]
-            user_id = user_data.get("id")
+        if pwhash and verify_password(pwhash, password):
+            user_id = employee.get("id")
 
-            additional_claims = {
-                "user_id": user_id,
-                "email": email
-            }
-            access_token = create_access_token(
-                identity=user_id,
-                additional_claims=additional_claims
-            )
+            ## hash gerado com parâmetros antigos: grava um novo com os parâmetros atuais
+            if needs_rehash(pwhash):
+                credentials.set_hash(user_id, hash_password(password))
 
-            refresh_token = create_refresh_token(identity=user_id)
-        
-            return {"access_token": access_token, "refresh_token": refresh_token }
+            return self.issue_tokens(user_id, {
+                "user_id": user_id,
+                "email": employee.get("email")
+            })
 
         raise Exception("Credenciais de acesso incorretas")
+
+    def issue_tokens(self, user_id, additional_claims: dict = {}):
+        """Gera o par de tokens. O access token guarda o `jti` do refresh token do mesmo par,
+        para que o logout revogue os dois."""
+        refresh_token = create_refresh_token(identity=user_id, additional_claims=additional_claims)
+        access_token = create_access_token(
+            identity=user_id,
+            additional_claims={**additional_claims, "refresh_jti": get_jti(refresh_token)}
+        )
+
+        return {"access_token": access_token, "refresh_token": refresh_token }
+
+    def refresh(self, jwt_data: dict):
+        """Rotação do refresh token: o token usado é revogado e um novo par é gerado."""
+        revocation_store.revoke(jwt_data["jti"], jwt_data["exp"])
+
+        additional_claims = {key: jwt_data[key] for key in ("user_id", "email") if key in jwt_data}
+        return self.issue_tokens(jwt_data["sub"], additional_claims)
+
+    def logout(self, jwt_data: dict):
+        """Revoga o token usado e, se for um access token, o refresh token do mesmo par."""
+        revocation_store.revoke(jwt_data["jti"], jwt_data["exp"])
+
+        if jwt_data.get("refresh_jti"):
+            ## os dois tokens do par são gerados no mesmo instante (1s de folga para o arredondamento do iat)
+            refresh_exp = jwt_data["iat"] + current_app.config["JWT_REFRESH_TOKEN_EXPIRES"].total_seconds() + 1
+            revocation_store.revoke(jwt_data["refresh_jti"], refresh_exp)
@@ -1,58 +1,158 @@
 from ..utils.data_handler import DataHandler
 from datetime import datetime as dt
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from .pets import Pets
+from ..utils.streaming import chunked
+from ..utils.bulk import run_bulk
+from ..utils.transfer import run_import
 
 class Clients:
     def __init__(self):
         self.handler = DataHandler("clients")
     
-    def list(self):
+    def list(self, expand: dict = None):
         data = self.handler.list_all()
-        return self.get_relationship(data)
+        return self.get_relationship(data, expand)
     
     def create(self, data: dict):
-        email_alreadys_exist = self.search({
-            "email": data.get("email")
-        })
+        ## a checagem do e-mail e a escrita acontecem juntas com o lock (ver write_new)
+        self.handler.submit_create(data, self.write_new)
 
-        if email_alreadys_exist:
+    def write_new(self, items: List[dict]) -> List[Optional[Exception]]:
+        """Valida e grava clientes novos com o lock da tabela; os itens de um lote não repetem e-mails entre si.
+        Retorna o erro de cada item (ou None)."""
+        with self.handler.lock():
+            emails = self.existing_emails()
+            rows, errors = [], []
+            for item in items:
+                try:
+                    rows.append(self.prepare_create(item, emails))
+                    errors.append(None)
+                except Exception as err:
+                    errors.append(err)
+
+            self.handler.bulk_create(rows)
+        return errors
+
+    def prepare_create(self, data: dict, emails: set = None):
+        """Valida um novo cliente e retorna a linha que será gravada.
+
+        `emails` permite reaproveitar o set de e-mails já cadastrados em um lote;
+        o e-mail validado é adicionado a ele, impedindo repetições dentro do próprio lote.
+        """
+        if emails is None:
+            emails = self.existing_emails()
+
+        email = str(data.get("email") or "").strip().lower()
+        if email in emails:
             raise Exception("O e-mail informado já está em uso")
+        emails.add(email)
         
-        self.handler.create({** data, "created_at": dt.now()})
+        return {** data, "created_at": dt.now()}
+
+    def existing_emails(self) -> set:
+        return {str(item.get("email") or "").strip().lower() for item in self.handler.iter_rows()}
+
+    def prepare_import(self, data: dict, emails: set = None):
+        """Mesmas regras da criação, mantendo o `created_at` original quando informado."""
+        return {**self.prepare_create(data, emails), "created_at": data.get("created_at") or dt.now()}
+
+    def import_rows(self, rows, load=None):
+        """Importa linhas em blocos, com uma escrita sob lock por bloco (ver utils/transfer.py)."""
+        def prepare():
+            ## e-mails relidos com o lock de cada bloco
+            emails = self.existing_emails()
+            return lambda item: self.prepare_import(item, emails)
+
+        return run_import(self.handler, rows, prepare, load)
+
+    def export_rows(self):
+        """Linhas cruas da tabela, lidas em streaming."""
+        return self.handler.iter_rows()
 
     def delete(self, id):
         self.handler.delete(id)
+
+    def exists(self, id) -> bool:
+        return self.handler.exists(id)
     
     def update(self, id, data: dict):
         self.handler.update({**data, "id": id})
 
-    def get_by_id(self, id):
+    def prepare_update(self, id, data: dict):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        return {**data, "id": id}
+
+    def bulk_create(self, items: List[dict], transactional: bool = True, load=None):
+        ## uma única leitura dos e-mails cadastrados para validar o lote inteiro
+        with self.handler.lock():
+            emails = self.existing_emails()
+            return run_bulk(items, lambda item: self.prepare_create(item, emails), self.handler.bulk_create, transactional, self.handler.lock(), load)
+
+    def bulk_update(self, items: List[dict], transactional: bool = True, load=None):
+        return run_bulk(items, lambda item: self.prepare_update(item.get("id"), item), self.handler.bulk_update, transactional, self.handler.lock(), load)
+
+    def bulk_delete(self, ids: List[Any], transactional: bool = True):
+        return run_bulk(ids, self.prepare_delete, lambda rows: self.handler.bulk_delete(row["id"] for row in rows), transactional, self.handler.lock())
+
+    def prepare_delete(self, id):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        return {"id": id}
+
+    def get_by_id(self, id, expand: dict = None):
         client = self.handler.get_by_id(id)
         if client:
-            return self.get_relationship([client])[0]
+            return self.get_relationship([client], expand)[0]
         return None
     
-    def search(self, filters: dict):
+    def search(self, filters: dict, expand: dict = None):
+        data = self.handler.search(self.build_query(filters))
+        return self.get_relationship(data, expand)
+
+    def build_query(self, filters: dict):
         filters_to_remove = ["logic", "operator"]
-        data = self.handler.search({
+        return {
             "logic": filters.get("logic", "AND"),
             "criteria": list(filter(lambda item: item.get("key", "") not in filters_to_remove,[{"key": key, "value": value, "operator": filters.get("operator", "CONTAINS")} for key,value in filters.items()]))
-        })
-        return self.get_relationship(data)
+        }
 
-    def get_relationship(self, list: List[Dict[str, Any]]):
+    def iter_all(self, filters: dict = None, expand: dict = None):
+        """Versão em streaming de `list`/`search`: popula os relacionamentos em blocos."""
+        rows = self.handler.iter_search(self.build_query(filters)) if filters else self.handler.iter_rows()
+        for chunk in chunked(rows):
+            yield from self.get_relationship(chunk, expand)
+
+    def get_relationship(self, list: List[Dict[str, Any]], expand: dict = None):
+        """Adiciona os pets de cada cliente.
+
+        Por padrão retorna apenas os IDs dos pets. Com `pets` em `expand` retorna
+        os objetos completos (e `pets.owner` expande o dono de cada pet).
+        """
+        if not list:
+            return list
+
+        expand = expand or {}
         pets = Pets()
 
+        ## uma única leitura de pets.csv para todo o lote, agrupada pelo dono
+        owner_ids = {str(value.get("id")) for value in list}
+        pets_by_owner = {}
+        for pet in pets.handler.list_all():
+            if pet.get("owner_id") in owner_ids:
+                pets_by_owner.setdefault(pet.get("owner_id"), []).append(pet)
+
+        if "pets" in expand:
+            all_pets = [pet for owner_pets in pets_by_owner.values() for pet in owner_pets]
+            pets.get_relationship(all_pets, expand["pets"])
+
         for index, value in enumerate(list):
-            list_pets = pets.search({
-                "owner_id": value.get("id"),
-                "operator": "EQUAL"
-            })
+            list_pets = pets_by_owner.get(str(value.get("id")), [])
 
             list[index] = {
                 **value,
-                "pets": list_pets
+                "pets": list_pets if "pets" in expand else [pet.get("id") for pet in list_pets]
             }
 
-        return list
\ No newline at end of file
+        return list
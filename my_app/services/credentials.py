@@ -0,0 +1,87 @@
+import csv
+import os
+from ..utils.data_handler import DataHandler
+from typing import Dict, Iterable, Optional
+
+class Credentials:
+    """Hashes das senhas dos funcionários, em uma tabela separada (`credentials.csv`).
+
+    O `id` de cada linha é o ID do funcionário. Apenas o login e as escritas de funcionários
+    acessam esta tabela, então as leituras de funcionários nunca carregam os hashes.
+    """
+    def __init__(self):
+        self.handler = DataHandler("credentials")
+
+    def ensure_table(self):
+        """Instalações anteriores à tabela: ela é criada (e os hashes migrados) na primeira vez que é usada,
+        sem precisar rodar `flask migrate-credentials` antes do primeiro login."""
+        if not os.path.exists(self.handler.filename):
+            self.migrate()
+
+    def migrate(self) -> Optional[int]:
+        """Move a coluna `password` de employees.csv para credentials.csv, criando a tabela se preciso.
+
+        Retorna a quantidade de funcionários migrados, ou None se employees.csv já não tinha a coluna.
+        """
+        employees = DataHandler("employees")
+
+        with employees.writing():
+            with self.handler.lock():
+                if not os.path.exists(self.handler.filename):
+                    with open(self.handler.filename, "w", newline="") as f:
+                        csv.writer(f).writerow(["id", "password"])
+
+            with self.handler.writing():
+                headers = employees.get_header_order()
+                if "password" not in headers:
+                    return None
+
+                rows = list(employees.iter_rows())
+                existing = self.handler.get_id_set()
+                self.handler.append_rows(
+                    {"id": row["id"], "password": row["password"]}
+                    for row in rows
+                    if row.get("password") and row["id"] not in existing
+                )
+
+                ## reescreve employees.csv sem a coluna
+                new_headers = [key for key in headers if key != "password"]
+                employees.begin_write()
+                with open(employees.filename, "w", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(new_headers)
+                    writer.writerows([row.get(key, "") for key in new_headers] for row in rows)
+                employees.stage_rows(rows, append=False)
+
+        return len(rows)
+
+    def get_hash(self, employee_id):
+        self.ensure_table()
+        data = self.handler.get_by_id(employee_id)
+        return data.get("password") if data else None
+
+    def set_hash(self, employee_id, pwhash: str):
+        self.set_many({employee_id: pwhash})
+
+    def set_many(self, hashes: Dict[str, str]):
+        """Grava vários hashes ({ID do funcionário: hash}), criando as linhas que ainda não existem."""
+        if not hashes:
+            return
+
+        self.ensure_table()
+        with self.handler.writing():
+            existing = self.handler.get_id_set()
+            changed = [{"id": id, "password": pwhash} for id, pwhash in hashes.items() if str(id) in existing]
+            created = [{"id": id, "password": pwhash} for id, pwhash in hashes.items() if str(id) not in existing]
+
+            if changed:
+                self.handler.bulk_update(changed)
+            if created:
+                self.handler.append_rows(created)
+
+    def delete_many(self, employee_ids: Iterable):
+        self.ensure_table()
+        existing = self.handler.get_id_set()
+        ids = [id for id in employee_ids if str(id) in existing]
+        if ids:
+            self.handler.bulk_delete(ids)
@@ -1,42 +1,155 @@
 from ..utils.data_handler import DataHandler
 from datetime import datetime as dt
-from werkzeug.security import generate_password_hash
+from ..utils.passwords import hash_password
+from typing import Dict, List, Any, Optional
+from ..utils.bulk import run_bulk
+from .credentials import Credentials
 
 class Employees:
     def __init__(self):
         self.handler = DataHandler("employees")
     
     def list(self):
-        data = self.handler.list_all()
-        new_data = []
-        for d in data:
-            d.pop("password")
-            new_data.append(d)
-        return new_data
+        return self.handler.list_all()
     
     def create(self, data: dict):
-        self.handler.create({** data, "password": generate_password_hash(data.get("password")), "created_at": dt.now()})
+        ## o hash é calculado fora do lock; a escrita pode ser agrupada com outros creates (ver DataHandler.submit_create)
+        self.handler.submit_create(self.prepare_create(data), self.write_new)
+
+    def prepare_create(self, data: dict):
+        ## o hash vai para a tabela de credenciais; a coluna não existe em employees.csv
+        return {** data, "password": hash_password(data.get("password")), "created_at": dt.now()}
+
+    def write_new(self, rows: List[dict]) -> List[Optional[Exception]]:
+        """Checa os emails com o lock da tabela e grava os funcionários válidos (ver insert).
+
+        Os itens podem ser creates concorrentes agrupados pelo buffer de escrita (ver DataHandler.submit_create),
+        então também não repetem emails entre si. Retorna o erro de cada item (ou None).
+        """
+        with self.handler.lock():
+            emails = self.existing_emails()
+            valid, errors = [], []
+            for row in rows:
+                try:
+                    valid.append(self.check_email(row, emails))
+                    errors.append(None)
+                except Exception as err:
+                    errors.append(err)
+
+            self.insert(valid)
+        return errors
+
+    def insert(self, rows: List[dict]):
+        """Grava os funcionários e, com os IDs gerados, os hashes das senhas em `credentials.csv`."""
+        with self.handler.lock():
+            self.handler.bulk_create(rows)
+            Credentials().set_many({row["id"]: row["password"] for row in rows})
+
+    def existing_emails(self) -> Dict[str, str]:
+        """{email (minúsculo): ID do funcionário}."""
+        return {str(item.get("email") or "").strip().lower(): item["id"] for item in self.handler.iter_rows()}
+
+    def check_email(self, row: dict, emails: Dict[str, str]) -> dict:
+        """Recusa um email já usado por outro funcionário e reserva o email da linha em `emails`.
+
+        Deve ser chamado com o lock da tabela, para dois writers não gravarem o mesmo email.
+        """
+        email = str(row.get("email") or "").strip().lower()
+        if not email:
+            return row
+
+        ## linhas novas ainda não têm ID: são reservadas com "" (diferente de qualquer ID)
+        id = str(row["id"]) if row.get("id") is not None else ""
+        owner = emails.get(email)
+        if owner is not None and (owner != id or not id):
+            raise Exception("O e-mail informado já está em uso")
+
+        if id:
+            ## o email antigo do funcionário fica livre para os próximos itens do lote
+            for key in [key for key, value in emails.items() if value == id]:
+                del emails[key]
+        emails[email] = id
+        return row
+
+    def export_rows(self):
+        """Linhas da tabela lidas em streaming."""
+        return self.handler.iter_rows()
 
     def delete(self, id):
-        self.handler.delete(id)
+        with self.handler.lock():
+            self.handler.delete(id)
+            Credentials().delete_many([id])
+
+    def delete_many(self, ids: List[Any]):
+        with self.handler.lock():
+            self.handler.bulk_delete(ids)
+            Credentials().delete_many(ids)
+
+    def exists(self, id) -> bool:
+        return self.handler.exists(id)
+
+    def get_many(self, ids):
+        return self.handler.get_many(ids)
     
     def update(self, id, data: dict):
-        self.handler.update({**data, "id": id})
+        ## o hash é calculado fora do lock; o email é checado com o lock, junto com a escrita
+        row = self.prepare_update(id, data)
+        with self.handler.lock():
+            self.write_changes([self.check_email(row, self.existing_emails())])
+
+    def prepare_update(self, id, data: dict):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        ## senha nova: o hash vai para a tabela de credenciais (ver write_changes)
+        if data.get("password"):
+            return {**data, "id": id, "password": hash_password(data["password"])}
+        return {**data, "id": id}
+
+    def write_changes(self, rows: List[dict]):
+        """Grava as alterações dos funcionários e, das que trazem senha, os novos hashes em `credentials.csv`."""
+        with self.handler.lock():
+            changes = [{key: value for key, value in row.items() if key != "password"} for row in rows]
+            ## só a senha mudou: employees.csv não precisa ser reescrito
+            self.handler.bulk_update([change for change in changes if len(change) > 1])
+            Credentials().set_many({row["id"]: row["password"] for row in rows if row.get("password")})
+
+    def bulk_create(self, items: List[dict], transactional: bool = True, load=None):
+        with self.handler.lock():
+            emails = self.existing_emails()
+            return run_bulk(items, lambda item: self.check_email(self.prepare_create(item), emails), self.insert, transactional, self.handler.lock(), load)
+
+    def bulk_update(self, items: List[dict], transactional: bool = True, load=None):
+        with self.handler.lock():
+            emails = self.existing_emails()
+            return run_bulk(items, lambda item: self.check_email(self.prepare_update(item.get("id"), item), emails), self.write_changes, transactional, self.handler.lock(), load)
+
+    def bulk_delete(self, ids: List[Any], transactional: bool = True):
+        return run_bulk(ids, self.prepare_delete, lambda rows: self.delete_many([row["id"] for row in rows]), transactional, self.handler.lock())
+
+    def prepare_delete(self, id):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        return {"id": id}
 
     def get_by_id(self, id):
-        data = self.handler.get_by_id(id)
-        data.pop("password")
-        return data
+        return self.handler.get_by_id(id)
     
-    def search(self, filters: dict, include_password: bool = False):
+    def get_by_email(self, email: str):
+        """Funcionário com exatamente este email (sem diferenciar maiúsculas), pelo índice da coluna.
+        Os emails são únicos (ver check_email)."""
+        data = self.handler.find_by("email", email)
+        return data[0] if data else None
+
+    def search(self, filters: dict):
+        return self.handler.search(self.build_query(filters))
+
+    def build_query(self, filters: dict):
         filters_to_remove = ["logic", "operator"]
-        data = self.handler.search({
+        return {
             "logic": filters.get("logic", "AND"),
             "criteria": list(filter(lambda item: item.get("key", "") not in filters_to_remove,[{"key": key, "value": value, "operator": filters.get("operator", "CONTAINS")} for key,value in filters.items()]))
-        })
-        new_data = []
-        if not include_password:
-            for d in data:
-                d.pop("password")
-            new_data.append(d)
-        return new_data if not include_password else data
+        }
+
+    def iter_all(self, filters: dict = None):
+        """Versão em streaming de `list`/`search`: gera os funcionários um a um."""
+        return self.handler.iter_search(self.build_query(filters)) if filters else self.handler.iter_rows()
@@ -1,6 +1,9 @@
 from ..utils.data_handler import DataHandler
 from datetime import datetime as dt
 from typing import List, Dict, Any
+from ..utils.streaming import chunked
+from ..utils.bulk import run_bulk
+from ..utils.transfer import run_import
 
 class Pets:
     def __init__(self):
@@ -9,33 +12,91 @@ class Pets:
         # para buscar o dono sem chamar o serviço 'Clients' (evita Loop Infinito)
         self.client_handler = DataHandler("clients")
 
-    def list(self):
-        """Lista todos os pets e popula os dados do dono."""
+    def list(self, expand: dict = None):
+        """Lista todos os pets, populando os dados do dono se `owner` for expandido."""
         data = self.handler.list_all()
-        return self.get_relationship(data)
+        return self.get_relationship(data, expand)
 
     def create(self, data: dict):
-        self.handler.create({**data, "created_at": dt.now()})
+        self.handler.create(self.prepare_create(data))
+
+    def prepare_create(self, data: dict):
+        """Valida um novo pet e retorna a linha que será gravada."""
+        return {**data, **self.normalize_sex(data), "created_at": dt.now()}
+
+    def prepare_import(self, data: dict):
+        """Mesmas regras da criação, mantendo o `created_at` original quando informado."""
+        return {**self.prepare_create(data), "created_at": data.get("created_at") or dt.now()}
+
+    def import_rows(self, rows, load=None):
+        """Importa linhas em blocos, com uma escrita sob lock por bloco (ver utils/transfer.py)."""
+        return run_import(self.handler, rows, lambda: self.prepare_import, load)
+
+    def export_rows(self):
+        """Linhas cruas da tabela, lidas em streaming."""
+        return self.handler.iter_rows()
+
+    def normalize_sex(self, data: dict):
+        if not data.get("sex"):
+            return {}
+
+        sex = str(data.get("sex") or "").upper()
+        if sex not in ('M', 'F'):
+            raise Exception("O campo 'sex' deve ser 'M' (Macho) ou 'F' (Fêmea).")
+        return {"sex": sex}
 
     def delete(self, id):
         self.handler.delete(id)
 
+    def exists(self, id) -> bool:
+        return self.handler.exists(id)
+
+    def get_many(self, ids) -> Dict[str, Dict[str, Any]]:
+        """Busca vários pets com uma única leitura, sem popular o dono."""
+        return self.handler.get_many(ids)
+
     def update(self, id, data: dict):
-        self.handler.update({**data, "id": id})
+        self.handler.update(self.prepare_update(id, data))
+
+    def prepare_update(self, id, data: dict):
+        """Valida a alteração de um pet e retorna a linha parcial que será gravada."""
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+
+        return {**data, **self.normalize_sex(data), "id": id}
 
-    def get_by_id(self, id):
-        """Busca pet pelo ID e popula os dados do dono."""
+    def bulk_create(self, items: List[dict], transactional: bool = True, load=None):
+        return run_bulk(items, self.prepare_create, self.handler.bulk_create, transactional, self.handler.lock(), load)
+
+    def bulk_update(self, items: List[dict], transactional: bool = True, load=None):
+        return run_bulk(items, lambda item: self.prepare_update(item.get("id"), item), self.handler.bulk_update, transactional, self.handler.lock(), load)
+
+    def bulk_delete(self, ids: List[Any], transactional: bool = True):
+        return run_bulk(ids, self.prepare_delete, lambda rows: self.handler.bulk_delete(row["id"] for row in rows), transactional, self.handler.lock())
+
+    def prepare_delete(self, id):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        return {"id": id}
+
+    def get_by_id(self, id, expand: dict = None):
+        """Busca pet pelo ID, populando os dados do dono se `owner` for expandido."""
         pet = self.handler.get_by_id(id)
         if pet:
             # Envelopa em lista para usar a função get_relationship e retorna o item único
-            return self.get_relationship([pet])[0]
+            return self.get_relationship([pet], expand)[0]
         return None
 
-    def search(self, filters: dict):
-        """Busca com filtros e popula os dados do dono."""
+    def search(self, filters: dict, expand: dict = None):
+        """Busca com filtros, populando os dados do dono se `owner` for expandido."""
+        data = self.handler.search(self.build_query(filters))
+        return self.get_relationship(data, expand)
+
+    def build_query(self, filters: dict):
+        """Monta os critérios do DataHandler a partir dos filtros da requisição."""
         filters_to_remove = ["logic", "operator"]
-        
-        data = self.handler.search({
+
+        return {
             "logic": filters.get("logic", "AND"),
             "criteria": [
                 {
@@ -46,22 +107,32 @@ class Pets:
                 for key, value in filters.items() 
                 if key not in filters_to_remove
             ]
-        })
-        return self.get_relationship(data)
+        }
+
+    def iter_all(self, filters: dict = None, expand: dict = None):
+        """Versão em streaming de list/search: popula o dono em blocos de pets."""
+        rows = self.handler.iter_search(self.build_query(filters)) if filters else self.handler.iter_rows()
+        for chunk in chunked(rows):
+            yield from self.get_relationship(chunk, expand)
 
-    def get_relationship(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def get_relationship(self, data: List[Dict[str, Any]], expand: dict = None) -> List[Dict[str, Any]]:
         """
-        Substitui o ID do dono (owner_id) pelo objeto completo do Cliente.
+        Substitui o ID do dono (owner_id) pelo objeto completo do Cliente
+        quando `owner` está em `expand`. Caso contrário, mantém apenas o ID.
         """
+        if not expand or "owner" not in expand:
+            return data
+
+        # Busca todos os donos do lote de uma vez (uma única leitura de clients.csv),
+        # cada dono é carregado apenas uma vez mesmo que tenha vários pets
+        owners = self.client_handler.get_many({pet.get("owner_id") for pet in data})
+
         for pet in data:
             owner_id = pet.get("owner_id")
             
             if owner_id:
-                # Busca o cliente cru (raw) diretamente do banco
-                owner = self.client_handler.get_by_id(owner_id)
-                
                 # Substitui o valor do campo 'owner_id' pelo objeto do cliente
                 # Exemplo: "owner_id": 1  --->  "owner_id": { "id": 1, "name": "Fulano"... }
-                pet["owner_id"] = owner
+                pet["owner_id"] = owners.get(str(owner_id))
         
-        return data
\ No newline at end of file
+        return data
@@ -0,0 +1,138 @@
+import calendar
+from datetime import datetime as dt, timedelta
+from typing import Any, Dict, List, Optional
+from ..utils.data_handler import DataHandler
+from ..utils.intervals import EPOCH, parse_epoch
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+FREQUENCIES = ["daily", "weekly", "monthly"]
+
+class Recurrences:
+    """Agendamentos recorrentes: uma linha por regra em `recurrences.csv`, em vez de uma linha por ocorrência.
+
+    As ocorrências são geradas apenas dentro da janela consultada (`occurrences`). Alterações em uma
+    ocorrência (cancelamento, remarcação, conclusão) ficam em `recurrence_exceptions.csv`, chaveadas pela
+    data original da ocorrência. Cada ocorrência tem o ID `<ID da regra>:<data original>`.
+    """
+    def __init__(self):
+        self.handler = DataHandler("recurrences")
+        self.exceptions = DataHandler("recurrence_exceptions")
+
+    def list(self):
+        return self.handler.list_all()
+
+    def get_by_id(self, id):
+        return self.handler.get_by_id(id)
+
+    def exists(self, id) -> bool:
+        return self.handler.exists(id)
+
+    def create(self, data: dict):
+        self.handler.create(data)
+
+    def delete(self, id):
+        """Remove a regra e as exceções das suas ocorrências."""
+        with self.handler.lock():
+            self.handler.delete(id)
+            exceptions = self.exceptions.find_by("recurrence_id", id)
+            if exceptions:
+                self.exceptions.bulk_delete(item["id"] for item in exceptions)
+
+    def add_exception(self, id, data: dict):
+        self.exceptions.create({**data, "recurrence_id": id, "created_at": dt.now()})
+
+    def is_occurrence(self, rule: dict, occurrence_at: str) -> bool:
+        start = parse_epoch(occurrence_at)
+        if start is None:
+            return False
+        return any(date == occurrence_at for date in self.dates(rule, start, start + 1))
+
+    def dates(self, rule: dict, start: float, end: float) -> List[str]:
+        """Datas (no formato gravado) das ocorrências da regra com `start <= data < end`."""
+        first = dt.strptime(rule["starts_at"], DATE_FORMAT)
+        interval = int(rule.get("interval") or 1)
+        count = int(rule["count"]) if rule.get("count") else None
+        until = parse_epoch(rule.get("until"))
+        if until is not None:
+            end = min(end, until + 1)
+
+        window_start = EPOCH + timedelta(seconds=start)
+        dates = []
+
+        if rule["frequency"] == "monthly":
+            ## primeira ocorrência possível na janela, contando em meses
+            months = max(0, (window_start.year - first.year) * 12 + window_start.month - first.month - 1)
+            index = months // interval
+            while True:
+                total = first.month - 1 + index * interval
+                year, month = first.year + total // 12, total % 12 + 1
+                day = min(first.day, calendar.monthrange(year, month)[1])
+                occurrence = first.replace(year=year, month=month, day=day)
+                epoch = parse_epoch(occurrence.isoformat())
+                if epoch >= end or (count is not None and index >= count):
+                    break
+                if epoch >= start:
+                    dates.append(occurrence.strftime(DATE_FORMAT))
+                index += 1
+            return dates
+
+        step = timedelta(days=interval * (7 if rule["frequency"] == "weekly" else 1))
+        ## pula direto para a primeira ocorrência da janela
+        index = max(0, -(-(window_start - first) // step)) if window_start > first else 0
+        while count is None or index < count:
+            occurrence = first + step * index
+            epoch = parse_epoch(occurrence.isoformat())
+            if epoch >= end:
+                break
+            dates.append(occurrence.strftime(DATE_FORMAT))
+            index += 1
+        return dates
+
+    def occurrences(self, start: float, end: float, employee_id=None) -> List[Dict[str, Any]]:
+        """Ocorrências de todas as regras (ou das regras do funcionário) com `start <= scheduled_at < end`,
+        já com as exceções aplicadas: ocorrências remarcadas aparecem no novo horário."""
+        rules = self.handler.list_all() if employee_id is None else self.handler.find_by("employee_id", employee_id)
+        if not rules:
+            return []
+
+        overrides = self.overrides()
+        found = []
+        for rule in rules:
+            rule_overrides = overrides.get(rule["id"], {})
+
+            for occurrence_at in self.dates(rule, start, end):
+                override = rule_overrides.get(occurrence_at)
+                if override and override.get("scheduled_at"):
+                    continue
+                found.append(self.occurrence(rule, occurrence_at, override))
+
+            ## remarcadas para dentro da janela
+            for occurrence_at, override in rule_overrides.items():
+                moved = parse_epoch(override.get("scheduled_at"))
+                if moved is not None and start <= moved < end:
+                    found.append(self.occurrence(rule, occurrence_at, override))
+
+        return found
+
+    def occurrence(self, rule: dict, occurrence_at: str, override: Optional[dict] = None) -> Dict[str, Any]:
+        override = override or {}
+        return {
+            "id": f"{rule['id']}:{occurrence_at}",
+            "recurrence_id": rule["id"],
+            "occurrence_at": occurrence_at,
+            "pet_id": rule.get("pet_id"),
+            "service_id": rule.get("service_id"),
+            "employee_id": rule.get("employee_id"),
+            "status": override.get("status") or "scheduled",
+            "scheduled_at": override.get("scheduled_at") or occurrence_at,
+            "created_at": rule.get("created_at"),
+        }
+
+    def overrides(self) -> Dict[str, Dict[str, dict]]:
+        """{ID da regra: {data original: exceção}}; exceções seguintes da mesma ocorrência somam-se às anteriores."""
+        overrides = {}
+        for item in sorted(self.exceptions.list_all(), key=lambda item: int(item["id"])):
+            current = overrides.setdefault(item["recurrence_id"], {}).setdefault(item["occurrence_at"], {})
+            current.update({key: value for key, value in item.items() if value})
+        return overrides
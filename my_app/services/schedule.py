@@ -0,0 +1,174 @@
+import threading
+from typing import Dict, List, Optional
+from ..utils.intervals import IntervalIndex, parse_epoch, format_epoch
+from .services import Services, DEFAULT_DURATION
+from .recurrences import Recurrences
+
+class Schedule:
+    """Agenda dos funcionários, para checar conflitos de horário sem percorrer a tabela de agendamentos.
+
+    Para cada partição mensal de agendamentos (ver utils/partitioned_handler.py) é montado um
+    IntervalIndex por funcionário com os agendamentos `scheduled` ([início, início + duração do serviço)).
+    Os índices são reaproveitados enquanto a partição e a tabela de serviços não mudam: uma escrita
+    refaz apenas o índice do mês alterado.
+
+    Uma instância acompanha uma operação (um create, um update ou um lote): os horários aceitos
+    ficam reservados para os próximos itens do mesmo lote, que ainda não foram gravados.
+
+    As ocorrências de agendamentos recorrentes (ver services/recurrences.py) não estão nas partições:
+    elas são geradas só para a janela checada, com o ID `<regra>:<data original>`.
+    """
+    ## {arquivo da partição: ((versão da partição, versão de serviços), {employee_id: IntervalIndex})}
+    _indexes: Dict[str, tuple] = {}
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.services = Services()
+        self.recurrences = Recurrences()
+        self._durations = None
+        self.pending: Dict[str, IntervalIndex] = {}
+        self.released = set()
+        ## {chave da reserva: descrição do item do lote que a fez} (ver set_item)
+        self.labels: Dict[str, Optional[str]] = {}
+        self.item: Optional[str] = None
+
+    def set_item(self, label: Optional[str]):
+        """Descrição do item da operação que faz as próximas reservas (ex.: "item 2 do lote"),
+        usada na mensagem de conflito de outro item com ele."""
+        self.item = label
+
+    def durations(self) -> Dict[str, int]:
+        if self._durations is None:
+            self._durations = self.services.durations()
+        return self._durations
+
+    def interval(self, data: dict) -> Optional[tuple]:
+        """(início, fim) do agendamento em segundos, ou None se a data for inválida."""
+        start = parse_epoch(data.get("scheduled_at"))
+        if start is None:
+            return None
+        minutes = self.durations().get(str(data.get("service_id")), DEFAULT_DURATION)
+        return start, start + minutes * 60
+
+    def partition_index(self, key: str) -> Dict[str, IntervalIndex]:
+        partition = self.handler.partition(key)
+        snapshot = partition.snapshot()
+        token = (snapshot.version, self.services.handler.version())
+
+        cached = Schedule._indexes.get(partition.filename)
+        if cached and cached[0] == token:
+            return cached[1]
+
+        intervals = {}
+        for row in snapshot.rows:
+            if row.get("status") != "scheduled":
+                continue
+            interval = self.interval(row)
+            if interval:
+                intervals.setdefault(row.get("employee_id"), []).append((*interval, row["id"]))
+
+        indexes = {employee_id: IntervalIndex(items) for employee_id, items in intervals.items()}
+        with Schedule._indexes_lock:
+            Schedule._indexes[partition.filename] = (token, indexes)
+        return indexes
+
+    def recurrence_index(self, employee_id, start: float, end: float) -> IntervalIndex:
+        """Índice das ocorrências recorrentes `scheduled` do funcionário que começam em [start, end)."""
+        intervals = []
+        for occurrence in self.recurrences.occurrences(start, end, employee_id):
+            if occurrence["status"] != "scheduled":
+                continue
+            interval = self.interval(occurrence)
+            if interval:
+                intervals.append((*interval, occurrence["id"]))
+        return IntervalIndex(intervals)
+
+    def indexes(self, employee_id, start: float, end: float):
+        """Índices gravados do funcionário nas partições que podem ter agendamentos sobrepondo [start, end),
+        mais o índice das ocorrências recorrentes da mesma janela."""
+        ## um agendamento do mês anterior pode terminar dentro do intervalo
+        longest = max(self.durations().values(), default=DEFAULT_DURATION) * 60
+        for key in self.handler.partitions(format_epoch(start - longest), format_epoch(end)):
+            index = self.partition_index(key).get(str(employee_id))
+            if index:
+                yield index
+
+        index = self.recurrence_index(employee_id, start - longest, end)
+        if index:
+            yield index
+
+    def conflict(self, data: dict, id: Optional[str] = None) -> Optional[str]:
+        """ID do agendamento que ocupa o horário de `data` para o mesmo funcionário, ou None."""
+        interval = self.interval(data)
+        if interval is None:
+            return None
+
+        own = {str(id)} if id is not None else set()
+        for index in self.indexes(data.get("employee_id"), *interval):
+            found = index.overlap(*interval, self.released | own)
+            if found:
+                return found
+
+        pending = self.pending.get(str(data.get("employee_id")))
+        return pending.overlap(*interval, own) if pending else None
+
+    def reserve(self, data: dict, id: Optional[str] = None):
+        """Levanta Exception se o funcionário já estiver ocupado no horário de `data` e, se não estiver,
+        reserva o horário para os próximos itens da operação. `id` é o agendamento sendo alterado."""
+        interval = self.interval(data)
+        if interval is None or (data.get("status") or "scheduled") != "scheduled":
+            return
+
+        conflict = self.conflict(data, id)
+        if conflict:
+            ## reservas desta operação: o ID de um agendamento alterado tem o horário antigo liberado,
+            ## então só é encontrado aqui se vier das reservas
+            if conflict in self.labels:
+                label = self.labels[conflict]
+                suffix = f" ({label})" if label else " (outro agendamento criado ao mesmo tempo)"
+            elif ":" in conflict:
+                suffix = f" (agendamento recorrente {conflict.split(':')[0]})"
+            else:
+                suffix = f" (agendamento {conflict})"
+            raise Exception(f"O funcionário já tem um agendamento neste horário{suffix}")
+
+        if id is not None:
+            ## o horário antigo deste agendamento fica livre para os próximos itens da operação
+            self.released.add(str(id))
+        key = str(id) if id is not None else f"novo-{len(self.labels)}"
+        self.labels[key] = self.item
+        self.pending.setdefault(str(data.get("employee_id")), IntervalIndex()).add(*interval, key)
+
+    def busy(self, employee_id, start: float, end: float) -> List[tuple]:
+        """Intervalos ocupados do funcionário que sobrepõem [start, end), já unidos e em ordem."""
+        intervals = sorted(
+            (max(busy_start, start), min(busy_end, end))
+            for index in self.indexes(employee_id, start, end)
+            for busy_start, busy_end, _ in index.between(start, end)
+        )
+
+        merged = []
+        for busy_start, busy_end in intervals:
+            if merged and busy_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], busy_end)
+            else:
+                merged.append([busy_start, busy_end])
+        return merged
+
+    def free_slots(self, employee_id, start: float, end: float, duration: int, step: int, not_before: float = None) -> List[dict]:
+        """Horários livres em [start, end) para um serviço de `duration` minutos, a cada `step` minutos
+        contados a partir de `start`. Horários antes de `not_before` são ignorados."""
+        slots = []
+        cursor = start
+        for busy_start, busy_end in [*self.busy(employee_id, start, end), [end, end]]:
+            while cursor + duration * 60 <= busy_start:
+                if not_before is None or cursor >= not_before:
+                    slots.append({"start": format_epoch(cursor), "end": format_epoch(cursor + duration * 60)})
+                cursor += step * 60
+
+            ## próximo horário da grade depois do intervalo ocupado
+            if busy_end > cursor:
+                cursor += -(-(busy_end - cursor) // (step * 60)) * step * 60
+
+        return slots
@@ -1,5 +1,11 @@
 from ..utils.data_handler import DataHandler
 from datetime import datetime as dt
+from typing import List, Any, Dict
+from ..utils.bulk import run_bulk
+from ..utils.transfer import run_import
+
+## duração (minutos) usada para os serviços cadastrados antes da coluna `duration`
+DEFAULT_DURATION = 30
 
 class Services:
     def __init__(self):
@@ -10,20 +16,79 @@ class Services:
         return data
     
     def create(self, data: dict):
-        self.handler.create({** data, "created_at": dt.now()})
+        self.handler.create(self.prepare_create(data))
+
+    def prepare_create(self, data: dict):
+        return {** data, "duration": data.get("duration") or DEFAULT_DURATION, "created_at": dt.now()}
+
+    def prepare_import(self, data: dict):
+        """Mesmas regras da criação, mantendo o `created_at` original quando informado."""
+        return {**self.prepare_create(data), "created_at": data.get("created_at") or dt.now()}
+
+    def import_rows(self, rows, load=None):
+        """Importa linhas em blocos, com uma escrita sob lock por bloco (ver utils/transfer.py)."""
+        return run_import(self.handler, rows, lambda: self.prepare_import, load)
+
+    def export_rows(self):
+        """Linhas cruas da tabela, lidas em streaming."""
+        return self.handler.iter_rows()
 
     def delete(self, id):
         self.handler.delete(id)
+
+    def exists(self, id) -> bool:
+        return self.handler.exists(id)
+
+    def get_many(self, ids):
+        return self.handler.get_many(ids)
     
     def update(self, id, data: dict):
         self.handler.update({**data, "id": id})
 
+    def prepare_update(self, id, data: dict):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        return {**data, "id": id}
+
+    def bulk_create(self, items: List[dict], transactional: bool = True, load=None):
+        return run_bulk(items, self.prepare_create, self.handler.bulk_create, transactional, self.handler.lock(), load)
+
+    def bulk_update(self, items: List[dict], transactional: bool = True, load=None):
+        return run_bulk(items, lambda item: self.prepare_update(item.get("id"), item), self.handler.bulk_update, transactional, self.handler.lock(), load)
+
+    def bulk_delete(self, ids: List[Any], transactional: bool = True):
+        return run_bulk(ids, self.prepare_delete, lambda rows: self.handler.bulk_delete(row["id"] for row in rows), transactional, self.handler.lock())
+
+    def prepare_delete(self, id):
+        if not self.handler.exists(id):
+            raise Exception("ID não existe")
+        return {"id": id}
+
     def get_by_id(self, id):
         return self.handler.get_by_id(id)
+
+    def durations(self) -> Dict[str, int]:
+        """Duração em minutos de cada serviço: {id: minutos}."""
+        durations = {}
+        for service in self.handler.snapshot().rows:
+            try:
+                durations[service["id"]] = int(float(service.get("duration") or DEFAULT_DURATION))
+            except ValueError:
+                durations[service["id"]] = DEFAULT_DURATION
+        return durations
     
     def search(self, filters: dict):
+        return self.handler.search(self.build_query(filters))
+
+    def build_query(self, filters: dict):
         filters_to_remove = ["logic", "operator"]
-        return self.handler.search({
+        return {
             "logic": filters.get("logic", "AND"),
             "criteria": list(filter(lambda item: item.get("key", "") not in filters_to_remove,[{"key": key, "value": value, "operator": filters.get("operator", "CONTAINS")} for key,value in filters.items()]))
-        })
\ No newline at end of file
+        }
+
+    def iter_all(self, filters: dict = None):
+        """Versão em streaming de `list`/`search`: gera os serviços um a um."""
+        if filters:
+            return self.handler.iter_search(self.build_query(filters))
+        return self.handler.iter_rows()
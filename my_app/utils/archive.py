@@ -0,0 +1,167 @@
+import csv
+import gzip
+import io
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from flask import current_app
+from .table_lock import table_lock
+
+## datas no formato ISO começam com AAAA-MM, que é o nome do arquivo do mês
+MONTH = re.compile(r"^\d{4}-\d{2}")
+
+
+class Archive:
+    """Arquivo morto de uma tabela: `instance/archive/<tabela>/AAAA-MM.csv.gz`, um arquivo por mês de `column`.
+
+    Os arquivos só recebem appends: cada gravação adiciona um novo membro gzip ao final do arquivo
+    (o cabeçalho vai apenas no primeiro), e a leitura descompacta todos em sequência.
+    O `ids.csv` da pasta mapeia cada ID para o mês em que foi arquivado.
+    """
+    ## mapa de IDs de cada arquivo morto: {caminho: ((mtime, tamanho), {id: mês})}
+    _indexes: Dict[str, tuple] = {}
+
+    def __init__(self, table: str, column: str):
+        self.table = table
+        self.column = column
+        self.directory = os.path.join(current_app.instance_path, "archive", table)
+        self.ids_path = os.path.join(self.directory, "ids.csv")
+
+    def lock(self):
+        return table_lock(os.path.join(self.directory, "archive"))
+
+    def month(self, value) -> str:
+        value = "" if value is None else str(value)
+        return value[:7] if MONTH.match(value) else "undated"
+
+    def path(self, month: str) -> str:
+        return os.path.join(self.directory, f"{month}.csv.gz")
+
+    def append(self, rows: List[dict], columns: List[str]):
+        """Grava as linhas nos arquivos dos seus meses (com fsync) e depois no mapa de IDs."""
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.month(row.get(self.column)), []).append(row)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock():
+            for month, month_rows in groups.items():
+                path = self.path(month)
+                is_new = not os.path.exists(path)
+
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if is_new:
+                    writer.writerow(columns)
+                writer.writerows([row.get(key, "") for key in columns] for row in month_rows)
+
+                with open(path, "ab") as f:
+                    f.write(gzip.compress(buffer.getvalue().encode("utf-8")))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            is_new = not os.path.exists(self.ids_path)
+            with open(self.ids_path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if is_new:
+                    writer.writerow(["id", "month"])
+                writer.writerows((row["id"], month) for month, month_rows in groups.items() for row in month_rows)
+
+    def months(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """Meses arquivados (em ordem) que podem ter linhas com `start <= column < end`."""
+        if not os.path.isdir(self.directory):
+            return []
+
+        months = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".csv.gz"):
+                continue
+            month = name[:-len(".csv.gz")]
+            if month == "undated":
+                if start is None and end is None:
+                    months.append(month)
+                continue
+            if start is not None and month < start[:7]:
+                continue
+            if end is not None and month > end[:7]:
+                continue
+            months.append(month)
+
+        return months
+
+    def iter_rows(self, start: Optional[str] = None, end: Optional[str] = None):
+        """Percorre as linhas arquivadas com `start <= column < end` (limites opcionais), mês a mês."""
+        for month in self.months(start, end):
+            for row in self.iter_month(month):
+                value = row.get(self.column, "")
+                if (start is None or value >= start) and (end is None or value < end):
+                    yield row
+
+    def iter_month(self, month: str):
+        with gzip.open(self.path(month), "rt", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            headers = [key.strip() for key in next(reader, [])]
+            for line in reader:
+                yield dict(zip(headers, line))
+
+    def index(self) -> Dict[str, str]:
+        """Mapa {id: mês}, relido apenas quando o `ids.csv` muda."""
+        try:
+            stat = os.stat(self.ids_path)
+        except FileNotFoundError:
+            return {}
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = Archive._indexes.get(self.ids_path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        index = {}
+        with open(self.ids_path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for line in reader:
+                if len(line) == 2:
+                    index[line[0]] = line[1]
+
+        Archive._indexes[self.ids_path] = (key, index)
+        return index
+
+    def get_by_id(self, id) -> Optional[dict]:
+        month = self.index().get(str(id))
+        if month is None or not os.path.exists(self.path(month)):
+            return None
+
+        found = None
+        for row in self.iter_month(month):
+            ## um ID arquivado duas vezes (escrita interrompida) vale pela última cópia
+            if row.get("id") == str(id):
+                found = row
+        return found
+
+
+def start_archive_job(app, job: Callable[[], int]):
+    """Executa `job` a cada `ARCHIVE_INTERVAL` segundos em uma thread daemon (0 desativa).
+
+    Com vários workers cada um roda o seu job; o lock da tabela impede que dois arquivem ao mesmo tempo.
+    """
+    interval = app.config.get("ARCHIVE_INTERVAL", 0)
+    if not interval:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    archived = job()
+                    if archived:
+                        app.logger.info("Arquivamento: %s linha(s) movida(s) para o arquivo morto", archived)
+                except Exception:
+                    app.logger.exception("Falha no job de arquivamento")
+
+    thread = threading.Thread(target=run, name="archive-job", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,29 @@
+from functools import wraps
+from flask import current_app, request
+from flask_jwt_extended import get_jwt, jwt_required as verify_jwt
+
+## chave do environ em que o /batch passa para as sub-requisições o JWT já verificado na requisição externa
+## (não pode ser enviada pelo cliente: headers HTTP só chegam ao environ como HTTP_*)
+BATCH_JWT = "petshop.batch_jwt"
+
+
+def jwt_required(**options):
+    """`jwt_required` do flask_jwt_extended, verificado uma única vez por chamada ao /batch.
+
+    Nas sub-requisições do /batch o token não é reenviado: a requisição externa já decodificou o JWT
+    e checou a revogação, e passa o JWT em `BATCH_JWT`. As sub-requisições rodam no contexto da
+    requisição externa e veem o mesmo JWT em `get_jwt()`. Com opções (ex: `refresh=True`) a
+    verificação é sempre feita, então essas rotas não funcionam pelo /batch.
+    """
+    def decorator(fn):
+        verified = verify_jwt(**options)(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            batch_jwt = request.environ.get(BATCH_JWT)
+            if batch_jwt is not None and not options and get_jwt() is batch_jwt:
+                return current_app.ensure_sync(fn)(*args, **kwargs)
+            return verified(*args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,69 @@
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import jsonify
+
+def run_bulk(
+    items: List[Any],
+    prepare: Callable[[Any], dict],
+    write: Callable[[List[dict]], None],
+    transactional: bool = True,
+    lock=None,
+    load: Optional[Callable[[Any], dict]] = None,
+    on_item: Optional[Callable[[int], None]] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Valida todos os itens com `prepare` e aplica os válidos com uma única chamada a `write`.
+
+    `load` (opcional) roda antes de `prepare`: valida e converte o item, levantando Exception se for inválido.
+    `on_item` (opcional) recebe o índice de cada item antes da validação (ex.: para citá-lo em mensagens de conflito).
+
+    - transactional=True: se algum item falhar nada é aplicado.
+    - transactional=False: os itens válidos são aplicados e os inválidos reportados.
+
+    Retorna o resultado de cada item ({"index", "success", "id" ou "message"}) e se a escrita foi feita.
+    """
+    with lock or nullcontext():
+        results = []
+        prepared = []
+
+        for index, item in enumerate(items):
+            if on_item:
+                on_item(index)
+            try:
+                prepared.append((index, prepare(load(item) if load else item)))
+                results.append({"index": index, "success": True})
+            except Exception as err:
+                results.append({"index": index, "success": False, "message": str(err)})
+
+        failed = any(not result["success"] for result in results)
+        if (transactional and failed) or not prepared:
+            return results, False
+
+        write([row for _, row in prepared])
+
+    for index, row in prepared:
+        if row.get("id") is not None:
+            results[index]["id"] = str(row["id"])
+
+    return results, True
+
+def bulk_response(results: List[Dict[str, Any]], applied: bool, point: str, success_status: int = 200):
+    """Resposta padrão das rotas em lote.
+
+    Todos os itens aplicados: `success_status`. Lote aplicado em parte: 207. Nada aplicado: 400.
+    """
+    failed = any(not result["success"] for result in results)
+
+    if not applied:
+        return jsonify({
+            "success": False,
+            "point": point,
+            "message": "Nenhum item foi aplicado",
+            "applied": False,
+            "results": results
+        }), 400
+
+    return jsonify({
+        "success": not failed,
+        "applied": True,
+        "results": results
+    }), 207 if failed else success_status
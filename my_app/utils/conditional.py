@@ -0,0 +1,40 @@
+import hashlib
+from functools import wraps
+from flask import request, make_response
+from .data_handler import DataHandler, TABLE_DEPENDENCIES
+
+def table_etag(table: str) -> str:
+    """ETag da requisição atual, derivada das versões da tabela e das tabelas das quais ela depende.
+
+    Leva em conta a URL completa (filtros, expand) e o header Accept (JSON ou NDJSON),
+    já que a mesma versão dos dados gera representações diferentes.
+    """
+    tables = [table, *TABLE_DEPENDENCIES.get(table, [])]
+    versions = ",".join(f"{name}:{DataHandler(name).version()}" for name in tables)
+    variant = f"{request.full_path}|{request.headers.get('Accept', '')}"
+
+    return hashlib.sha1(f"{versions}|{variant}".encode()).hexdigest()
+
+def conditional(table: str):
+    """Responde `304 Not Modified` quando o `If-None-Match` bate com a versão atual das tabelas,
+    antes de qualquer leitura, população de relacionamentos ou serialização.
+    Respostas 200 recebem o header `ETag`.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            etag = table_etag(table)
+
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.vary.add("Accept")
+            return response
+
+        return wrapper
+    return decorator
@@ -1,40 +1,272 @@
 import csv
-from flask import current_app
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context
 import os
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Callable, Iterable, NamedTuple, Optional
+from .table_lock import table_lock
+from .write_buffer import write_buffer
+from .journal import journal
+
+## tabelas cujos dados aparecem nas respostas de cada tabela (relacionamentos populados)
+## uma escrita em qualquer uma delas invalida o que foi gerado a partir da tabela
+TABLE_DEPENDENCIES = {
+    "appointments": ["pets", "clients", "services", "employees", "recurrences", "recurrence_exceptions"],
+    "pets": ["clients"],
+    "clients": ["pets"],
+    "services": [],
+    "employees": [],
+    "recurrences": [],
+    "recurrence_exceptions": [],
+}
+
+class Snapshot(NamedTuple):
+    """Conteúdo imutável de uma tabela em uma versão."""
+    version: int
+    rows: tuple
+
+def as_text(value) -> str:
+    ## mesmo valor que o csv grava e devolve na leitura
+    return "" if value is None else str(value)
 
 class DataHandler:
+    ## último snapshot de cada arquivo: {filename: Snapshot}
+    ## as leituras usam o snapshot sem lock; as escritas publicam um novo snapshot ao terminar
+    _snapshots: Dict[str, Snapshot] = {}
+    _snapshots_lock = threading.Lock()
+
+    ## linhas da escrita em andamento em cada arquivo (só a thread com o lock da tabela acessa)
+    _staged: Dict[str, Optional[list]] = {}
+
+    ## cache dos IDs de cada arquivo: {filename: (versão da tabela, set de IDs)}
+    ## compartilhado entre as instâncias para que as checagens de existência não releiam o CSV
+    _id_sets: Dict[str, tuple] = {}
+
+    ## índices exatos por coluna: {(filename, coluna): (versão da tabela, {valor em minúsculas: [linhas]})}
+    _indexes: Dict[tuple, tuple] = {}
+
+    ## funções chamadas com o nome da tabela sempre que ela é escrita (usadas pelos caches)
+    _write_listeners: List[Callable[[str], None]] = []
+
+    ## funções chamadas com (tabela, IDs das linhas alteradas, nova versão) ao final de cada escrita
+    ## os IDs são None quando não se sabe quais linhas mudaram (ex: escrita interrompida)
+    _rows_listeners: List[Callable[[str, Optional[set], int], None]] = []
+
     def __init__(self, csv_filename: str):
+        self.table = csv_filename
         self.filename = os.path.join(current_app.instance_path, f"{csv_filename}.csv")
+
+    @classmethod
+    def on_write(cls, listener: Callable[[str], None]):
+        cls._write_listeners.append(listener)
+        return listener
+
+    @classmethod
+    def on_rows_write(cls, listener: Callable[[str, Optional[set], int], None]):
+        cls._rows_listeners.append(listener)
+        return listener
+
+    def lock(self):
+        """Lock de escrita da tabela (entre threads e entre processos)."""
+        return table_lock(self.filename)
+
+    @contextmanager
+    def writing(self):
+        """Escrita na tabela, com o lock da tabela.
+
+        Os métodos que gravam o arquivo marcam a versão como "em escrita" no journal (leitores que
+        passarem por ela não guardam o que leram) e registram as linhas resultantes. Ao final da
+        escrita mais externa, o novo snapshot é publicado de uma vez (copy-on-write) e os caches
+        são avisados. Pode ser aninhado. Retorna o conteúdo da tabela antes da escrita.
+        """
+        with self.lock():
+            outermost = self.filename not in DataHandler._staged
+            if outermost:
+                base = self.snapshot()
+                DataHandler._staged[self.filename] = list(base.rows)
+            else:
+                staged = DataHandler._staged[self.filename]
+                base = Snapshot(self.version(), tuple(staged) if staged is not None else tuple(self.iter_rows()))
+
+            try:
+                yield base
+            except BaseException:
+                ## escrita interrompida no meio: o snapshot será relido do arquivo
+                if journal(self.filename).in_write():
+                    DataHandler._staged[self.filename] = None
+                raise
+            finally:
+                if outermost:
+                    rows = DataHandler._staged.pop(self.filename)
+                    if journal(self.filename).in_write():
+                        journal(self.filename).end_write()
+                        self.notify_write(rows)
+
+    def begin_write(self):
+        journal(self.filename).begin_write()
+
+    def notify_write(self, rows: Optional[list] = None):
+        version = self.version()
+        with DataHandler._snapshots_lock:
+            previous = DataHandler._snapshots.get(self.filename)
+            if rows is None:
+                DataHandler._snapshots.pop(self.filename, None)
+            else:
+                DataHandler._snapshots[self.filename] = Snapshot(version, tuple(rows))
+
+        ## a requisição atual passa a ler a versão que ela mesma escreveu
+        if has_app_context():
+            g.get("_snapshots", {}).pop(self.filename, None)
+
+        self.invalidate_id_set()
+        self.invalidate_indexes()
+        for listener in DataHandler._write_listeners:
+            listener(self.table)
+
+        if DataHandler._rows_listeners:
+            ## o snapshot anterior só serve de base se for o da versão imediatamente antes desta escrita
+            base = previous is not None and rows is not None and previous.version + 2 == version
+            ids = changed_ids(previous.rows, rows) if base else None
+            for listener in DataHandler._rows_listeners:
+                listener(self.table, ids, version)
+
+    def stage_rows(self, rows: Iterable[dict], append: bool):
+        """Registra o resultado da escrita em andamento, para publicar o snapshot sem reler o arquivo."""
+        staged = DataHandler._staged.get(self.filename)
+        headers = self.get_header_order()
+        rows = [{key: as_text(item.get(key)) for key in headers} for item in rows]
+
+        if not append:
+            DataHandler._staged[self.filename] = rows
+        elif staged is not None:
+            staged.extend(rows)
+
+    def snapshot(self) -> Snapshot:
+        """Último snapshot da tabela, relido do csv apenas quando a versão muda.
+
+        A leitura do csv é feita sem lock: se uma escrita acontecer durante a leitura
+        (versão diferente antes/depois, ou ímpar), o resultado não é guardado e a leitura é refeita.
+        Durante uma escrita, os leitores continuam com o snapshot da versão anterior a ela (o conteúdo
+        publicado); só a thread que está escrevendo relê o arquivo, para ver o que ela mesma já gravou.
+        """
+        current = DataHandler._snapshots.get(self.filename)
+        version = self.version()
+        if current is not None and current.version == version:
+            return current
+        if current is not None and version % 2 and current.version == version - 1 and not self.lock().is_owned():
+            return current
+
+        for _ in range(3):
+            before = self.version()
+            rows = tuple(self.iter_rows())
+            after = self.version()
+            if before == after and before % 2 == 0:
+                snapshot = Snapshot(before, rows)
+                with DataHandler._snapshots_lock:
+                    current = DataHandler._snapshots.get(self.filename)
+                    if current is None or current.version < before:
+                        DataHandler._snapshots[self.filename] = snapshot
+                return snapshot
+
+        return Snapshot(after, rows)
+
+    def pinned_snapshot(self) -> Snapshot:
+        """Snapshot fixado na requisição: todas as leituras da tabela feitas na mesma requisição
+        (e nas sub-requisições de `/batch`) veem a mesma versão, mesmo com escritas concorrentes.
+        """
+        if not has_app_context():
+            return self.snapshot()
+
+        pinned = g.setdefault("_snapshots", {})
+        snapshot = pinned.get(self.filename)
+        if snapshot is None:
+            snapshot = pinned[self.filename] = self.snapshot()
+        return snapshot
     
     def list_all(self):
+        """Lista todos os itens da tabela, a partir do snapshot fixado na requisição.
+
+        Cada chamada recebe cópias dos dicionários.
+        """
+        return [dict(item) for item in self.pinned_snapshot().rows]
+
+    def iter_rows(self):
+        """Percorre o csv linha a linha, gerando um dicionário por linha sem carregar o arquivo inteiro."""
         with open(self.filename, "r", newline="") as f:
-            data = list(csv.reader(f))
-
-            ## nova lista que vai receber os dicionários
-            new_list = []
-
-            ## percorre as linhas do csv
-            for index, line in enumerate(data):
-                ## se a linha não for a primeira que apenas contém as colunas do csv
-                if index != 0:
-                    ## cria um dicionário base que vai receber os valores da linha em chave:valor
-                    new_dict = dict()
-                    ## para cada elemento da linha, irá adicionar um "chave:valor" no novo dicionário, com base na coluna da lista
-                    for l_index, l in enumerate(line): 
-                        key = data[0][l_index]
-                        new_dict[key.strip()] = l
-                    new_list.append(new_dict)
-            
-            return new_list
-        
+            reader = csv.reader(f)
+            ## a primeira linha apenas contém as colunas do csv
+            headers = [key.strip() for key in next(reader, [])]
+
+            for line in reader:
+                ## cria um dicionário com os valores da linha em chave:valor, com base na coluna
+                yield dict(zip(headers, line))
+
     def create(self, data: dict):
-        data["id"] = self.get_last_id() + 1
+        self.submit_create(data, self.write_created)
+
+    def submit_create(self, data: dict, write: Callable[[List[dict]], List[Optional[Exception]]]):
+        """Grava um item novo com `write`, que recebe uma lista de itens, valida o que depende do conteúdo
+        da tabela e grava os válidos com o lock da tabela, retornando o erro de cada item (ou None).
+
+        Com WRITE_BUFFER_WINDOW_MS, creates concorrentes são entregues juntos a uma única chamada de `write`
+        (ver utils/write_buffer.py): a validação e a escrita do lote inteiro acontecem com o mesmo lock.
+        Quem já está com o lock da tabela grava direto, já que o lote precisa do lock para ser gravado.
+        """
+        window = current_app.config.get("WRITE_BUFFER_WINDOW_MS", 0)
+        if window and not self.lock().is_owned():
+            write_buffer(self.filename).submit(data, window / 1000, write)
+            return
+
+        error = write([data])[0]
+        if error is not None:
+            raise error
+
+    def write_created(self, items: List[dict]) -> List[Optional[Exception]]:
+        self.bulk_create(items)
+        return [None] * len(items)
+
+    def bulk_create(self, items: List[dict], fsync: Optional[bool] = None):
+        """Cria vários itens com uma única leitura do último ID e uma única escrita."""
+        if not items:
+            return
+
+        with self.writing() as base:
+            last_id = self.get_last_id(base.rows)
+            for index, data in enumerate(items, start=1):
+                data["id"] = last_id + index
+            self.append_rows(items, fsync)
+
+    def append_rows(self, items: Iterable[dict], fsync: Optional[bool] = None):
+        """Acrescenta linhas ao final do csv. Sem `fsync` informado, segue `WRITE_FSYNC`."""
+        items = list(items)
         headers = self.get_header_order()
+        if fsync is None:
+            fsync = current_app.config.get("WRITE_FSYNC", False)
 
-        with open(self.filename, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([data.get(key) for key in headers])
+        with self.writing():
+            self.begin_write()
+            with open(self.filename, "a", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerows([data.get(key) for key in headers] for data in items)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.stage_rows(items, append=True)
+
+    def write_rows(self, items: Iterable[dict]):
+        """Reescreve a tabela em um arquivo temporário e o troca pelo atual de uma vez (`os.replace`):
+        quem está lendo o arquivo antigo continua lendo-o inteiro, sem ver uma escrita pela metade."""
+        items = list(items)
+        new_data = self.json_to_csv_array(items)
+        tmp = f"{self.filename}.tmp"
+
+        with self.writing():
+            self.begin_write()
+            with open(tmp, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerows(new_data)
+            os.replace(tmp, self.filename)
+            self.stage_rows(items, append=False)
     
     def get_by_id(self, id):
         data = self.list_all()
@@ -42,6 +274,90 @@ class DataHandler:
         value = list(filter(lambda item: item["id"] == str(id), data))
         return value[0] if len(value) > 0 else None
     
+    def get_many(self, ids) -> Dict[str, Dict[str, Any]]:
+        """Busca vários IDs com uma única leitura do arquivo. Retorna {id: item}."""
+        wanted = {str(id) for id in ids if id is not None and str(id) != ""}
+        if not wanted:
+            return {}
+
+        return {item["id"]: item for item in self.list_all() if item.get("id") in wanted}
+
+    def exists(self, id) -> bool:
+        """Verifica se o ID existe sem carregar as linhas completas da tabela."""
+        if id is None or str(id) == "":
+            return False
+        return str(id) in self.get_id_set()
+
+    def get_id_set(self) -> set:
+        snapshot = self.snapshot()
+        cached = DataHandler._id_sets.get(self.filename)
+        if cached and cached[0] == snapshot.version:
+            return cached[1]
+
+        ids = {item.get("id") for item in snapshot.rows}
+        DataHandler._id_sets[self.filename] = (snapshot.version, ids)
+        return ids
+
+    def invalidate_id_set(self):
+        DataHandler._id_sets.pop(self.filename, None)
+
+    def find_by(self, column: str, value) -> List[Dict[str, Any]]:
+        """Busca exata por uma coluna, sem diferenciar maiúsculas/minúsculas.
+
+        Usa um índice da coluna montado a partir do snapshot e reaproveitado enquanto a tabela
+        não muda, então a busca não percorre a tabela.
+        """
+        if value is None:
+            return []
+        rows = self.get_index(column).get(str(value).strip().lower(), [])
+        return [dict(item) for item in rows]
+
+    def get_index(self, column: str) -> Dict[str, List[Dict[str, Any]]]:
+        key = (self.filename, column)
+        snapshot = self.snapshot()
+        cached = DataHandler._indexes.get(key)
+        if cached and cached[0] == snapshot.version:
+            return cached[1]
+
+        index = {}
+        for item in snapshot.rows:
+            index.setdefault(str(item.get(column) or "").strip().lower(), []).append(item)
+
+        DataHandler._indexes[key] = (snapshot.version, index)
+        return index
+
+    def invalidate_indexes(self):
+        for key in list(DataHandler._indexes):
+            if key[0] == self.filename:
+                DataHandler._indexes.pop(key, None)
+
+    def version(self) -> int:
+        """Versão atual da tabela, lida do journal compartilhado entre os workers (ver utils/journal.py).
+
+        Cresce a cada escrita feita pelo DataHandler em qualquer processo; é ímpar durante uma escrita.
+        """
+        return journal(self.filename).read()
+
+    def read_version(self) -> Optional[int]:
+        """Versão da tabela para chavear o que a requisição atual gerar a partir dela (caches de resposta e de JSON).
+
+        Deve ser lida antes das linhas. Retorna None quando o resultado não pode ser guardado: escrita em
+        andamento, ou a requisição está fixada em um snapshot antigo da tabela ou de uma das suas partições
+        (ver `pinned_snapshot`), já que as linhas lidas seriam guardadas com a versão atual.
+        """
+        version = self.version()
+        if version % 2:
+            return None
+
+        if has_app_context():
+            partitions = os.path.splitext(self.filename)[0] + os.sep
+            for filename, snapshot in g.get("_snapshots", {}).items():
+                if filename == self.filename or filename.startswith(partitions):
+                    if snapshot.version != journal(filename).read():
+                        return None
+
+        return version
+
     def check_criterion(self, item_value, operator, criterion_value):
         op = operator.upper()
 
@@ -88,16 +404,18 @@ class DataHandler:
                 ]
             }"""
         
-        data = self.list_all()
-        
+        return list(self.iter_search(filters, self.list_all()))
+
+    def iter_search(self, filters: dict, rows=None):
+        """Mesmo que `search`, mas gera os itens encontrados um a um (lendo o csv linha a linha
+        quando `rows` não é informado)."""
         logic = filters.get("logic", "AND").upper()
         criteria = filters.get("criteria", [])
 
         if not criteria:
-            return []
+            return
 
-        filtered_results = []
-        for item in data:
+        for item in (self.iter_rows() if rows is None else rows):
             
             check_results = (
                 self.check_criterion(
@@ -109,32 +427,54 @@ class DataHandler:
             
             if logic == "AND":
                 if all(check_results):
-                    filtered_results.append(item)
+                    yield item
             
             elif logic == "OR":
                 if any(check_results):
-                    filtered_results.append(item)
-
-        return filtered_results
+                    yield item
 
     def delete(self, id):
-        exist = self.get_by_id(id)
-        if not exist:
-            raise Exception("ID não existe")
-        
-        data = self.list_all()
+        with self.writing() as base:
+            if not any(item["id"] == str(id) for item in base.rows):
+                raise Exception("ID não existe")
+
+            self.write_rows(item for item in base.rows if item["id"] != str(id))
+
+    def bulk_delete(self, ids: Iterable):
+        """Remove vários IDs com uma única reescrita do arquivo."""
+        ids = {str(id) for id in ids}
+        if not ids:
+            return
+
+        with self.writing() as base:
+            self.write_rows(item for item in base.rows if item["id"] not in ids)
+
+    def add_column(self, column: str, default: Any = "") -> bool:
+        """Acrescenta uma coluna ao final do csv, com `default` nas linhas existentes.
 
-        data_filtered = filter(lambda item: item["id"] != str(id), data)
-        new_data = self.json_to_csv_array(data_filtered)
+        Retorna False (sem alterar nada) se a coluna já existir.
+        """
+        with self.writing() as base:
+            headers = self.get_header_order()
+            if column in headers:
+                return False
 
-        with open(self.filename, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerows(new_data)
+            rows = [{**item, column: default} for item in base.rows]
+            tmp = f"{self.filename}.tmp"
+
+            self.begin_write()
+            with open(tmp, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([*headers, column])
+                writer.writerows([row.get(key, "") for key in [*headers, column]] for row in rows)
+            os.replace(tmp, self.filename)
+            self.stage_rows(rows, append=False)
+
+        return True
 
     def get_header_order(self):
         with open(self.filename, "r", newline="") as f:
-            data = list(csv.reader(f))
-            return list(map(lambda item: item.strip(), data[0]))
+            return [item.strip() for item in next(csv.reader(f), [])]
 
     def json_to_csv_array(self, data: List[Dict[str, Any]]) -> List[List[Any]]:
         headers = self.get_header_order()
@@ -146,27 +486,35 @@ class DataHandler:
         return csv_data
         
     def update(self, data: dict):
-        exist = self.get_by_id(data.get("id"))
-        if not exist:
-            raise Exception("ID não existe")
-        
-        all_data = self.list_all()
-        new_data = []
+        with self.writing() as base:
+            if not any(item["id"] == str(data.get("id")) for item in base.rows):
+                raise Exception("ID não existe")
+            
+            new_data = []
 
-        for item in all_data:
-            if item.get("id") == str(data.get("id")):
-                new_item = {**item, **data}
-                new_data.append(new_item)
-            else:
-                new_data.append(item)
+            for item in base.rows:
+                if item.get("id") == str(data.get("id")):
+                    new_item = {**item, **data}
+                    new_data.append(new_item)
+                else:
+                    new_data.append(item)
 
-        new_data = self.json_to_csv_array(new_data)
-        with open(self.filename, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerows(new_data)
+            self.write_rows(new_data)
 
-    def get_last_id(self):
-        all_data = self.list_all()
+    def bulk_update(self, items: List[dict]):
+        """Aplica várias alterações (cada uma com seu `id`) com uma única reescrita do arquivo."""
+        changes = {str(data.get("id")): data for data in items}
+        if not changes:
+            return
+
+        with self.writing() as base:
+            self.write_rows(
+                {**item, **changes[item["id"]]} if item["id"] in changes else item
+                for item in base.rows
+            )
+
+    def get_last_id(self, rows=None):
+        all_data = self.list_all() if rows is None else rows
 
         if not all_data:
             return 0
@@ -174,4 +522,17 @@ class DataHandler:
         last_id = max([int(item.get("id", 0)) for item in all_data])
         return last_id
 
-    
\ No newline at end of file
+
+def changed_ids(before: Iterable[dict], after: Iterable[dict]) -> set:
+    """IDs das linhas incluídas, alteradas ou removidas entre dois conteúdos da tabela."""
+    old = {row.get("id"): row for row in before}
+    ids = set()
+    for row in after:
+        if old.pop(row.get("id"), None) != row:
+            ids.add(row.get("id"))
+    return ids | set(old)
+
+def read_versions(table: str) -> Optional[tuple]:
+    """Versões (`read_version`) da tabela e das tabelas das quais ela depende, ou None se alguma não puder ser usada."""
+    versions = tuple(DataHandler(name).read_version() for name in [table, *TABLE_DEPENDENCIES.get(table, [])])
+    return None if None in versions else versions
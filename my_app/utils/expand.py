@@ -0,0 +1,22 @@
+from typing import Dict, Optional
+
+def parse_expand(value: Optional[str]) -> Dict[str, dict]:
+    """Converte o parâmetro `expand` em uma árvore de relacionamentos.
+
+    Exemplo: "pet,pet.owner,service" ---> {"pet": {"owner": {}}, "service": {}}
+
+    Expandir um caminho aninhado (pet.owner) também expande os níveis acima dele (pet).
+    """
+    tree = {}
+    if not value:
+        return tree
+
+    for path in value.split(","):
+        node = tree
+        for part in path.split("."):
+            part = part.strip()
+            if not part:
+                break
+            node = node.setdefault(part, {})
+
+    return tree
@@ -0,0 +1,139 @@
+from bisect import bisect_left
+from datetime import datetime as dt, timedelta
+from typing import Collection, Iterator, List, Optional, Tuple
+
+EPOCH = dt(1970, 1, 1)
+
+def parse_epoch(value) -> Optional[float]:
+    """Converte uma data ISO (como gravada no csv) em segundos desde 1970, ou None se for inválida.
+
+    As datas são tratadas como horário local sem fuso, então a conversão não depende do fuso do servidor.
+    """
+    if not value:
+        return None
+    try:
+        parsed = dt.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return (parsed.replace(tzinfo=None) - EPOCH).total_seconds()
+
+def format_epoch(seconds: float) -> str:
+    """Inverso de `parse_epoch`, no formato gravado pelos schemas."""
+    return (EPOCH + timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+class IntervalIndex:
+    """Intervalos [início, fim) ordenados pelo início, para checar sobreposição em O((k + 1) log n),
+    sendo k a quantidade de intervalos encontrados (em `overlap`, também os ignorados).
+
+    Os posteriores a um início saem da busca binária. Para os anteriores, guarda uma árvore de
+    segmentos com o maior fim de cada trecho da lista: só os trechos cujo maior fim passa do início
+    procurado são percorridos, então intervalos longos não obrigam a varrer todos os anteriores.
+    """
+    def __init__(self, intervals: List[Tuple[float, float, str]] = ()):
+        intervals = sorted(intervals)
+        self.starts = [start for start, _, _ in intervals]
+        self.ends = [end for _, end, _ in intervals]
+        self.ids = [id for _, _, id in intervals]
+        self.build()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def build(self):
+        """Refaz a árvore de máximos: as folhas são os fins, cada nó guarda o maior fim dos seus filhos."""
+        size = 1
+        while size < len(self.ends):
+            size *= 2
+        tree = [float("-inf")] * (2 * size)
+        tree[size:size + len(self.ends)] = self.ends
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self.size = size
+        self.max_ends = tree
+
+    def add(self, start: float, end: float, id: str):
+        """Insere um intervalo (O(n), usado apenas para os itens ainda não gravados de um lote)."""
+        position = bisect_left(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, id)
+        self.build()
+
+    def ending_after(self, start: float, limit: int) -> Iterator[int]:
+        """Posições antes de `limit` cujo fim passa de `start`, da mais próxima de `limit` para trás."""
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, low, high = stack.pop()
+            if low >= limit or self.max_ends[node] <= start:
+                continue
+            if high - low == 1:
+                yield low
+                continue
+            middle = (low + high) // 2
+            ## a metade da direita sai primeiro da pilha
+            stack.append((2 * node, low, middle))
+            stack.append((2 * node + 1, middle, high))
+
+    def overlap(self, start: float, end: float, ignore: Collection[str] = ()) -> Optional[str]:
+        """ID de um intervalo que sobrepõe [start, end), ignorando os IDs em `ignore`, ou None."""
+        position = bisect_left(self.starts, start)
+
+        ## posteriores: começam a partir de `start`; sobrepõem se começam antes de `end`
+        index = position
+        while index < len(self.starts) and self.starts[index] < end:
+            if self.ids[index] not in ignore:
+                return self.ids[index]
+            index += 1
+
+        ## anteriores: sobrepõem se terminam depois de `start`
+        for index in self.ending_after(start, position):
+            if self.ids[index] not in ignore:
+                return self.ids[index]
+
+        return None
+
+    def between(self, start: float, end: float) -> List[Tuple[float, float, str]]:
+        """Intervalos que sobrepõem [start, end), em ordem de início."""
+        position = bisect_left(self.starts, start)
+        found = [(self.starts[index], self.ends[index], self.ids[index]) for index in self.ending_after(start, position)]
+        found.reverse()
+
+        index = position
+        while index < len(self.starts) and self.starts[index] < end:
+            found.append((self.starts[index], self.ends[index], self.ids[index]))
+            index += 1
+        return found
+
+
+class TimeIndex:
+    """Linhas ordenadas pela data de `column` (em segundos), com um bucket por dia.
+
+    Como as linhas ficam em ordem de horário, cada dia é um trecho contínuo da lista: `days` guarda
+    o início e o fim desse trecho, então a agenda de um dia sai direto do dicionário, e um intervalo
+    qualquer sai com duas buscas binárias. Linhas sem data válida ficam de fora.
+    """
+    def __init__(self, rows, column: str):
+        entries = sorted(
+            ((epoch, position, row) for position, row in enumerate(rows) if (epoch := parse_epoch(row.get(column))) is not None),
+            key=lambda entry: entry[:2]
+        )
+        self.epochs = [epoch for epoch, _, _ in entries]
+        self.rows = [row for _, _, row in entries]
+
+        self.days = {}
+        for position, row in enumerate(self.rows):
+            day = str(row.get(column))[:10]
+            start, _ = self.days.get(day, (position, position))
+            self.days[day] = (start, position + 1)
+
+    def between(self, start: Optional[float] = None, end: Optional[float] = None) -> list:
+        """Linhas com `start <= data < end` (limites opcionais), em ordem de horário."""
+        low = bisect_left(self.epochs, start) if start is not None else 0
+        high = bisect_left(self.epochs, end) if end is not None else len(self.epochs)
+        return self.rows[low:high]
+
+    def day(self, day: str) -> list:
+        """Linhas de um dia (`AAAA-MM-DD`), em ordem de horário."""
+        start, end = self.days.get(day, (0, 0))
+        return self.rows[start:end]
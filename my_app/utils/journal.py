@@ -0,0 +1,76 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict
+from .table_lock import table_lock
+
+_COUNTER = struct.Struct("<Q")
+
+
+class Journal:
+    """Contador de versão de uma tabela, em um arquivo mapeado na memória (`<tabela>.version`).
+
+    Todos os workers mapeiam o mesmo arquivo: uma escrita em qualquer processo incrementa o contador
+    (sob o lock da tabela) e os outros enxergam a nova versão na próxima leitura, que é apenas
+    uma leitura de 8 bytes da memória, sem stat nem leitura do csv.
+
+    O contador começa no horário de criação do arquivo (em ms), então recriar o arquivo não volta
+    a versões já usadas em ETags e caches.
+
+    Funciona como um seqlock: o contador fica ímpar enquanto uma escrita está em andamento e volta
+    a ser par quando ela termina. Um leitor que vê a mesma versão par antes e depois de ler o csv
+    sabe que leu um conteúdo completo.
+    """
+    def __init__(self, path: str, lock_filename: str):
+        self.path = path
+        self.lock_filename = lock_filename
+
+        with table_lock(lock_filename):
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < _COUNTER.size:
+                    os.write(fd, _COUNTER.pack(time.time_ns() // 1_000_000 * 2))
+                self._map = mmap.mmap(fd, _COUNTER.size)
+            finally:
+                os.close(fd)
+
+            ## com o lock nenhuma escrita está em andamento: um contador ímpar sobrou de uma escrita interrompida
+            if self.read() % 2 == 1:
+                _COUNTER.pack_into(self._map, 0, self.read() + 1)
+
+    def read(self) -> int:
+        return _COUNTER.unpack_from(self._map, 0)[0]
+
+    def in_write(self) -> bool:
+        return self.read() % 2 == 1
+
+    def begin_write(self):
+        """Marca o início de uma escrita (contador ímpar). Deve ser chamado com o lock da tabela."""
+        with table_lock(self.lock_filename):
+            version = self.read()
+            if version % 2 == 0:
+                _COUNTER.pack_into(self._map, 0, version + 1)
+
+    def end_write(self) -> int:
+        """Marca o fim da escrita (contador par) e retorna a nova versão."""
+        with table_lock(self.lock_filename):
+            version = self.read()
+            if version % 2 == 1:
+                version += 1
+                _COUNTER.pack_into(self._map, 0, version)
+            return version
+
+
+_journals: Dict[str, Journal] = {}
+_journals_guard = threading.Lock()
+
+
+def journal(filename: str) -> Journal:
+    """Journal da tabela gravada em `filename` (o contador fica em `<tabela>.version`, ao lado do csv)."""
+    with _journals_guard:
+        entry = _journals.get(filename)
+        if entry is None:
+            entry = _journals[filename] = Journal(f"{os.path.splitext(filename)[0]}.version", filename)
+        return entry
@@ -0,0 +1,219 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from .data_handler import DataHandler, TABLE_DEPENDENCIES, read_versions
+
+## o orjson é opcional: se estiver instalado é usado, senão usamos o json da biblioteca padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FragmentList(list):
+    """Lista de itens já codificados em JSON (strings), inseridos como estão na resposta."""
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if isinstance(obj, FragmentList):
+            return "[" + ",".join(obj) + "]"
+
+        if isinstance(obj, dict) and any(isinstance(value, FragmentList) for value in obj.values()):
+            items = sorted(obj.items()) if self.sort_keys else obj.items()
+            return "{" + ",".join(f"{self.encode(str(key))}:{self.dumps(value, **kwargs)}" for key, value in items) + "}"
+
+        return self.encode(obj, **kwargs)
+
+    def encode(self, obj: Any, **kwargs: Any) -> str:
+        ## com indentação (modo debug) mantemos a saída formatada do json padrão
+        if orjson is None or "indent" in kwargs:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+## campos em que as linhas expandidas aparecem e as tabelas de onde elas vêm
+RELATED_TABLES = {
+    "pet": "pets",
+    "pets": "pets",
+    "owner_id": "clients",
+    "service": "services",
+    "employee": "employees",
+}
+
+
+def row_key(row: Dict[str, Any]) -> tuple:
+    """Valores da linha com cada linha expandida trocada pelo seu ID.
+
+    Muda quando a própria linha muda ou quando ela passa a apontar para outras linhas
+    (ex: um pet novo na lista de pets do cliente); o conteúdo das linhas expandidas é
+    acompanhado pela invalidação por ID (ver `FragmentCache`).
+    """
+    return tuple(
+        value.get("id") if isinstance(value, dict)
+        else tuple(item.get("id") if isinstance(item, dict) else item for item in value) if isinstance(value, list)
+        else value
+        for value in row.values()
+    )
+
+
+def related_rows(row: Dict[str, Any], found: set = None) -> set:
+    """(tabela, ID) de todas as linhas expandidas dentro da linha, em qualquer nível."""
+    found = set() if found is None else found
+    for key, value in row.items():
+        table = RELATED_TABLES.get(key)
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, dict):
+                if table:
+                    found.add((table, str(item.get("id"))))
+                related_rows(item, found)
+    return found
+
+
+class FragmentCache:
+    """Cache das linhas já codificadas em JSON, uma entrada por (tabela, ID, expand).
+
+    A entrada só é usada se `row_key` da linha não mudou, o que cobre escritas na própria tabela
+    feitas por qualquer processo. Escritas deste processo em uma tabela removem apenas as entradas
+    das linhas escritas e as entradas em que elas aparecem expandidas.
+
+    Para escritas de outros processos nas tabelas expandidas, guardamos a versão de cada tabela já
+    acompanhada: se a versão lida pela requisição for outra sem que a escrita tenha passado por aqui,
+    as entradas que expandem linhas da tabela são removidas.
+    """
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        ## {(tabela, ID, expand): (row_key, linhas expandidas, json)}
+        self._entries: OrderedDict = OrderedDict()
+        ## {(tabela, ID): chaves das entradas da linha e das entradas que a expandem}
+        self._rows: Dict[tuple, set] = {}
+        ## {tabela: chaves das entradas que expandem linhas da tabela}
+        self._expanding: Dict[str, set] = {}
+        ## {tabela: última versão acompanhada}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: tuple):
+        _, related, _ = self._entries.pop(key)
+        for row in {key[:2], *related}:
+            keys = self._rows.get(row)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._rows[row]
+        for table in {name for name, _ in related}:
+            keys = self._expanding.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._expanding[table]
+
+    def _drop_table(self, table: str):
+        for key in list(self._expanding.get(table, ())):
+            self._drop(key)
+
+    def invalidate(self, table: str, ids: Optional[set], version: int):
+        """Escrita deste processo em `table` (ver `DataHandler.on_rows_write`)."""
+        with self._lock:
+            ## as entradas da própria tabela continuam protegidas pelo `row_key`
+            if ids is None:
+                self._drop_table(table)
+            else:
+                for id in ids:
+                    for key in list(self._rows.get((table, str(id)), ())):
+                        self._drop(key)
+
+            ## só continuamos acompanhando a tabela se nenhuma escrita de outro processo aconteceu no meio
+            if self._versions.get(table) is not None and self._versions[table] + 2 == version:
+                self._versions[table] = version
+
+    def sync(self, versions: Dict[str, int]):
+        """Remove o que foi gerado a partir de tabelas escritas por outros processos."""
+        with self._lock:
+            for table, version in versions.items():
+                seen = self._versions.get(table)
+                if seen != version:
+                    if seen is not None:
+                        self._drop_table(table)
+                    self._versions[table] = version
+
+    def encode_rows(self, table: str, rows: List[Dict[str, Any]], variant: str = "") -> FragmentList:
+        """Codifica as linhas, reaproveitando as que já foram codificadas e continuam iguais.
+
+        As versões são lidas depois das linhas: `read_versions` devolve None se a requisição
+        leu alguma tabela em uma versão que já foi substituída, e nesse caso nada é guardado.
+        """
+        versions = read_versions(table) if self.max_size else None
+        if versions is None:
+            return FragmentList(current_json().encode(row) for row in rows)
+
+        versions = dict(zip([table, *TABLE_DEPENDENCIES.get(table, [])], versions))
+        self.sync(versions)
+
+        provider = current_json()
+        fragments = FragmentList()
+
+        for row in rows:
+            if row.get("id") is None:
+                fragments.append(provider.encode(row))
+                continue
+
+            key = (table, str(row.get("id")), variant)
+            current = row_key(row)
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None and cached[0] == current:
+                    self._entries.move_to_end(key)
+            if cached is not None and cached[0] == current:
+                fragments.append(cached[2])
+                continue
+
+            raw = provider.encode(row)
+            fragments.append(raw)
+            related = related_rows(row)
+
+            with self._lock:
+                ## uma escrita terminada depois da leitura das versões já pode ter passado pela invalidação
+                if any(self._versions.get(name) != versions.get(name) for name, _ in related):
+                    continue
+
+                if key in self._entries:
+                    self._drop(key)
+                self._entries[key] = (current, related, raw)
+                for item in {key[:2], *related}:
+                    self._rows.setdefault(item, set()).add(key)
+                for name in {name for name, _ in related}:
+                    self._expanding.setdefault(name, set()).add(key)
+                while len(self._entries) > self.max_size:
+                    self._drop(next(iter(self._entries)))
+
+        return fragments
+
+
+def current_json() -> FastJSONProvider:
+    return current_app.json
+
+
+def expand_variant(expand: dict) -> str:
+    """Chave estável para o parâmetro `expand` (a mesma linha muda conforme o que foi expandido)."""
+    return json.dumps(expand or {}, sort_keys=True)
+
+
+fragment_cache = FragmentCache()
+DataHandler.on_rows_write(fragment_cache.invalidate)
+
+
+def encode_rows(table: str, rows: List[Dict[str, Any]], expand: dict = None) -> FragmentList:
+    return fragment_cache.encode_rows(table, rows, expand_variant(expand))
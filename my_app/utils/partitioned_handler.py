@@ -0,0 +1,537 @@
+import csv
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+from flask import current_app
+from .data_handler import DataHandler, Snapshot, as_text
+from .journal import journal
+from .intervals import TimeIndex, format_epoch
+
+## tabelas particionadas e a coluna de data usada para particionar
+PARTITIONED_TABLES = {
+    "appointments": "scheduled_at",
+}
+
+## datas no formato ISO começam com AAAA-MM, que é a chave da partição
+MONTH = re.compile(r"^\d{4}-\d{2}")
+
+## partição das linhas sem data válida (nunca entra em buscas por intervalo)
+UNDATED = "undated"
+
+## o ids.csv é reescrito quando tem mais que o dobro de linhas que IDs (mais esta folga)
+IDS_LOG_SLACK = 1000
+
+class PartitionedDataHandler(DataHandler):
+    """Tabela dividida em arquivos mensais pela coluna `partition_column` (`instance/<tabela>/AAAA-MM.csv`).
+
+    Na mesma pasta ficam:
+    - `manifest.json`: colunas, último ID e os limites (menor e maior data) e a quantidade de linhas
+      de cada partição. As buscas por data leem apenas as partições cujo intervalo pode ter resultados.
+    - `ids.csv`: mapa ID -> partição, em forma de log (vale a última linha de cada ID; partição vazia
+      indica remoção). `get_by_id`, `exists` e as escritas vão direto à partição do ID.
+
+    Cada partição é um DataHandler comum, com seu próprio snapshot e journal. `filename` continua sendo
+    o caminho `<tabela>.csv`: é a identidade da tabela para o lock, o journal de versão (ETags e caches)
+    e o buffer de escrita, a mesma de `DataHandler("<tabela>")`.
+    """
+    ## manifest e mapa de IDs carregados de cada tabela: {filename: (versão da tabela, estado)}
+    _states: Dict[str, tuple] = {}
+    _states_lock = threading.Lock()
+
+    ## índice por data de cada partição: {arquivo da partição: (versão da partição, TimeIndex)}
+    _time_indexes: Dict[str, tuple] = {}
+
+    def __init__(self, csv_filename: str, partition_column: Optional[str] = None):
+        super().__init__(csv_filename)
+        self.partition_column = partition_column or PARTITIONED_TABLES[csv_filename]
+        self.directory = os.path.join(current_app.instance_path, csv_filename)
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        self.ids_path = os.path.join(self.directory, "ids.csv")
+
+    def partition_key(self, value) -> str:
+        value = as_text(value)
+        return value[:7] if MONTH.match(value) else UNDATED
+
+    def partition(self, key: str) -> DataHandler:
+        handler = DataHandler(f"{self.table}/{key}")
+        ## as escritas nas partições avisam os caches com o nome da tabela
+        handler.table = self.table
+        return handler
+
+    ## estado (manifest e mapa de IDs)
+
+    def state(self) -> dict:
+        """Manifest e mapa de IDs da versão atual, relidos apenas quando a versão da tabela muda.
+
+        Dentro de uma escrita, a thread que a está fazendo vê o estado da própria escrita.
+        """
+        if self.filename in DataHandler._staged and self.lock().is_owned():
+            return DataHandler._staged[self.filename]
+
+        cached = PartitionedDataHandler._states.get(self.filename)
+        if cached is not None and cached[0] == self.version():
+            return cached[1]
+
+        if not os.path.exists(self.manifest_path):
+            self.rebuild()
+
+        for _ in range(3):
+            before = self.version()
+            state = self.load_state()
+            after = self.version()
+            if before == after and before % 2 == 0:
+                with PartitionedDataHandler._states_lock:
+                    current = PartitionedDataHandler._states.get(self.filename)
+                    if current is None or current[0] < before:
+                        PartitionedDataHandler._states[self.filename] = (before, state)
+                break
+
+        return state
+
+    def load_state(self) -> dict:
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+
+        ids = {}
+        log_lines = 0
+        with open(self.ids_path, newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for line in reader:
+                ## linha incompleta de um append em andamento
+                if len(line) != 2:
+                    continue
+                log_lines += 1
+                if line[1]:
+                    ids[line[0]] = line[1]
+                else:
+                    ids.pop(line[0], None)
+
+        return {"manifest": manifest, "ids": ids, "log_lines": log_lines}
+
+    def save_state(self, staged: dict):
+        manifest_tmp = f"{self.manifest_path}.tmp"
+        with open(manifest_tmp, "w") as f:
+            json.dump(staged["manifest"], f, indent=2, sort_keys=True)
+        os.replace(manifest_tmp, self.manifest_path)
+
+        log_lines = staged["log_lines"] + len(staged["log"])
+        if log_lines > 2 * len(staged["ids"]) + IDS_LOG_SLACK:
+            ## compacta o log: uma linha por ID existente
+            ids_tmp = f"{self.ids_path}.tmp"
+            with open(ids_tmp, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["id", "partition"])
+                writer.writerows(staged["ids"].items())
+            os.replace(ids_tmp, self.ids_path)
+            log_lines = len(staged["ids"])
+        elif staged["log"]:
+            with open(self.ids_path, "a", newline="") as f:
+                csv.writer(f).writerows(staged["log"])
+
+        staged["log_lines"] = log_lines
+        staged["log"] = []
+
+    @contextmanager
+    def writing(self):
+        """Escrita na tabela, com o lock da tabela, sobre uma cópia do manifest e do mapa de IDs.
+
+        A cópia é gravada e publicada ao final da escrita mais externa, junto com a nova versão.
+        Se a escrita falhar no meio, a cópia já reflete as partições gravadas até ali e também é salva.
+        """
+        with self.lock():
+            outermost = self.filename not in DataHandler._staged
+            if outermost:
+                current = self.state()
+                DataHandler._staged[self.filename] = {
+                    "manifest": json.loads(json.dumps(current["manifest"])),
+                    "ids": dict(current["ids"]),
+                    "log": [],
+                    "log_lines": current["log_lines"],
+                }
+            staged = DataHandler._staged[self.filename]
+
+            try:
+                yield staged
+            finally:
+                if outermost:
+                    DataHandler._staged.pop(self.filename)
+                    if journal(self.filename).in_write():
+                        try:
+                            self.save_state(staged)
+                        finally:
+                            journal(self.filename).end_write()
+                            self.notify_write(staged)
+
+    def notify_write(self, state: Optional[dict] = None):
+        version = self.version()
+        with PartitionedDataHandler._states_lock:
+            if state is None:
+                PartitionedDataHandler._states.pop(self.filename, None)
+            else:
+                PartitionedDataHandler._states[self.filename] = (version, {
+                    "manifest": state["manifest"],
+                    "ids": state["ids"],
+                    "log_lines": state["log_lines"],
+                })
+
+        super().notify_write()
+
+    def rebuild(self) -> int:
+        """Cria as partições a partir de `<tabela>.csv` (se o arquivo ainda existir) e refaz o manifest
+        e o mapa de IDs lendo as partições. Pode ser executado mais de uma vez. Retorna a quantidade de linhas.
+        """
+        with self.lock():
+            self.begin_write()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+
+                if os.path.exists(self.filename):
+                    legacy = DataHandler(self.table)
+                    columns = legacy.get_header_order()
+                    groups = {}
+                    for row in legacy.iter_rows():
+                        groups.setdefault(self.partition_key(row.get(self.partition_column)), []).append(row)
+
+                    for key, rows in groups.items():
+                        handler = self.partition(key)
+                        if not os.path.exists(handler.filename):
+                            self.create_partition_file(handler, columns)
+                        with handler.writing() as base:
+                            handler.write_rows([*base.rows, *rows])
+                    os.remove(self.filename)
+
+                columns = None
+                partitions = {}
+                ids = {}
+                last_id = 0
+                for name in sorted(os.listdir(self.directory)):
+                    if not name.endswith(".csv") or name == "ids.csv":
+                        continue
+                    key = name[:-len(".csv")]
+                    handler = self.partition(key)
+                    rows = list(handler.iter_rows())
+                    columns = columns or handler.get_header_order()
+                    partitions[key] = self.bounds(rows)
+                    for row in rows:
+                        ids[row["id"]] = key
+                        last_id = max(last_id, int(row["id"]))
+
+                if columns is None:
+                    raise Exception(f"Nenhum dado encontrado para a tabela {self.table}")
+
+                staged = {
+                    "manifest": {
+                        "columns": columns,
+                        "partition_column": self.partition_column,
+                        "last_id": last_id,
+                        "partitions": partitions,
+                    },
+                    "ids": ids,
+                    "log": [],
+                    "log_lines": 0,
+                }
+                ## força a reescrita completa do ids.csv
+                with open(self.ids_path, "w", newline="") as f:
+                    csv.writer(f).writerow(["id", "partition"])
+                staged["log"] = list(ids.items())
+                self.save_state(staged)
+            finally:
+                journal(self.filename).end_write()
+                self.notify_write()
+
+        return len(ids)
+
+    ## partições
+
+    def bounds(self, rows: Iterable[dict]) -> Dict[str, Any]:
+        values = [row.get(self.partition_column) for row in rows]
+        dated = [value for value in values if value]
+        return {
+            "min": min(dated) if dated else None,
+            "max": max(dated) if dated else None,
+            "rows": len(values),
+        }
+
+    def partitions(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """Partições (em ordem) que podem ter linhas com `start <= partition_column < end`.
+
+        Os limites são opcionais e comparados como texto, no mesmo formato ISO gravado no csv.
+        """
+        keys = []
+        for key, bounds in sorted(self.state()["manifest"]["partitions"].items()):
+            if not bounds["rows"]:
+                continue
+
+            if key == UNDATED:
+                if start is None and end is None:
+                    keys.append(key)
+                continue
+
+            if start is not None and bounds["max"] < start:
+                continue
+            if end is not None and bounds["min"] >= end:
+                continue
+            keys.append(key)
+
+        return keys
+
+    def prune_bounds(self, filters: dict):
+        """Intervalo de `partition_column` implicado pelos critérios de uma busca.
+
+        Apenas critérios `EQUAL` ou `CONTAINS` com um prefixo de data (ex.: `2025-12` ou `2025-12-18`),
+        combinados com `AND`, restringem as partições lidas. Retorna (início, fim), com None quando livre.
+        """
+        start = end = None
+        if filters.get("logic", "AND").upper() != "AND":
+            return start, end
+
+        for criterion in filters.get("criteria", []):
+            value = as_text(criterion.get("value")).upper()
+            if criterion.get("key") != self.partition_column or not MONTH.match(value):
+                continue
+            if str(criterion.get("operator", "")).upper() not in ("EQUAL", "CONTAINS"):
+                continue
+
+            start = value if start is None else max(start, value)
+            upper = value + "\uffff"
+            end = upper if end is None else min(end, upper)
+
+        return start, end
+
+    def create_partition_file(self, handler: DataHandler, columns: List[str]):
+        with open(handler.filename, "w", newline="") as f:
+            csv.writer(f).writerow(columns)
+
+    def ensure_partition(self, staged: dict, key: str) -> DataHandler:
+        handler = self.partition(key)
+        partitions = staged["manifest"]["partitions"]
+        if key not in partitions or not os.path.exists(handler.filename):
+            self.create_partition_file(handler, staged["manifest"]["columns"])
+            partitions[key] = {"min": None, "max": None, "rows": 0}
+        return handler
+
+    ## leituras
+
+    def get_header_order(self):
+        return list(self.state()["manifest"]["columns"])
+
+    def get_last_id(self, rows=None):
+        return self.state()["manifest"]["last_id"]
+
+    def snapshot(self) -> Snapshot:
+        """Conteúdo de todas as partições (usado pelos métodos herdados que percorrem a tabela inteira)."""
+        rows = tuple(row for key in self.partitions() for row in self.partition(key).snapshot().rows)
+        return Snapshot(self.version(), rows)
+
+    def list_all(self):
+        return [row for key in self.partitions() for row in self.partition(key).list_all()]
+
+    def list_between(self, start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+        """Linhas com `start <= partition_column < end`, lendo apenas as partições do intervalo."""
+        column = self.partition_column
+        return [
+            row
+            for key in self.partitions(start, end)
+            for row in self.partition(key).list_all()
+            if (start is None or row.get(column, "") >= start) and (end is None or row.get(column, "") < end)
+        ]
+
+    def time_index(self, key: str) -> TimeIndex:
+        """Índice por data da partição, refeito apenas quando a partição muda."""
+        partition = self.partition(key)
+        snapshot = partition.snapshot()
+
+        cached = PartitionedDataHandler._time_indexes.get(partition.filename)
+        if cached and cached[0] == snapshot.version:
+            return cached[1]
+
+        index = TimeIndex(snapshot.rows, self.partition_column)
+        PartitionedDataHandler._time_indexes[partition.filename] = (snapshot.version, index)
+        return index
+
+    def list_range(self, start: Optional[float] = None, end: Optional[float] = None) -> List[dict]:
+        """Linhas com `start <= partition_column < end` (em segundos, ver utils/intervals.py), em ordem de horário.
+
+        Lê apenas as partições do intervalo; em cada uma, um intervalo de dias inteiros sai dos buckets
+        diários do índice e qualquer outro intervalo sai de uma busca binária.
+        """
+        keys = self.partitions(
+            format_epoch(start) if start is not None else None,
+            format_epoch(end) if end is not None else None
+        )
+        whole_days = start is not None and end is not None and start % 86400 == 0 and end % 86400 == 0
+
+        rows = []
+        for key in keys:
+            index = self.time_index(key)
+            if whole_days:
+                for day in range(int(start // 86400), int(end // 86400)):
+                    rows.extend(index.day(format_epoch(day * 86400)[:10]))
+            else:
+                rows.extend(index.between(start, end))
+
+        return [dict(row) for row in rows]
+
+    def iter_rows(self, start: Optional[str] = None, end: Optional[str] = None):
+        """Percorre as partições (apenas as do intervalo, se informado) linha a linha."""
+        for key in self.partitions(start, end):
+            yield from self.partition(key).iter_rows()
+
+    def get_by_id(self, id):
+        key = self.state()["ids"].get(str(id))
+        if key is None:
+            return None
+
+        rows = self.partition(key).find_by("id", id)
+        return rows[0] if rows else None
+
+    def get_many(self, ids) -> Dict[str, Dict[str, Any]]:
+        ids_map = self.state()["ids"]
+
+        wanted = {}
+        for id in ids:
+            key = ids_map.get(str(id))
+            if key is not None:
+                wanted.setdefault(key, []).append(id)
+
+        found = {}
+        for key, partition_ids in wanted.items():
+            found.update(self.partition(key).get_many(partition_ids))
+        return found
+
+    def exists(self, id) -> bool:
+        if id is None or str(id) == "":
+            return False
+        return str(id) in self.state()["ids"]
+
+    def get_id_set(self):
+        return self.state()["ids"].keys()
+
+    def search(self, filters: dict):
+        start, end = self.prune_bounds(filters)
+        rows = [row for key in self.partitions(start, end) for row in self.partition(key).list_all()]
+        return list(self.iter_search(filters, rows))
+
+    def iter_search(self, filters: dict, rows=None):
+        if rows is None:
+            rows = self.iter_rows(*self.prune_bounds(filters))
+        return super().iter_search(filters, rows)
+
+    ## escritas
+
+    def write_new(self, staged: dict, items: List[dict], fsync: Optional[bool] = None):
+        """Grava linhas (já com ID) nas partições de cada uma e atualiza o manifest e o mapa de IDs."""
+        groups = {}
+        for data in items:
+            groups.setdefault(self.partition_key(data.get(self.partition_column)), []).append(data)
+
+        for key, rows in groups.items():
+            handler = self.ensure_partition(staged, key)
+            handler.append_rows(rows, fsync)
+
+            bounds = staged["manifest"]["partitions"][key]
+            dated = [as_text(data.get(self.partition_column)) for data in rows]
+            dated = [value for value in dated + [bounds["min"], bounds["max"]] if value]
+            bounds["min"] = min(dated) if dated else None
+            bounds["max"] = max(dated) if dated else None
+            bounds["rows"] += len(rows)
+
+            for data in rows:
+                staged["ids"][str(data["id"])] = key
+                staged["log"].append((str(data["id"]), key))
+
+    def replace_partition(self, staged: dict, key: str, rows: List[dict]):
+        self.partition(key).write_rows(rows)
+        staged["manifest"]["partitions"][key] = self.bounds(rows)
+
+    def bulk_create(self, items: List[dict], fsync: Optional[bool] = None):
+        if not items:
+            return
+
+        with self.writing() as staged:
+            self.begin_write()
+            for data in items:
+                staged["manifest"]["last_id"] += 1
+                data["id"] = staged["manifest"]["last_id"]
+            self.write_new(staged, items, fsync)
+
+    def update(self, data: dict):
+        with self.writing() as staged:
+            if str(data.get("id")) not in staged["ids"]:
+                raise Exception("ID não existe")
+
+            self.write_changes(staged, {str(data.get("id")): data})
+
+    def bulk_update(self, items: List[dict]):
+        changes = {str(data.get("id")): data for data in items}
+        if not changes:
+            return
+
+        with self.writing() as staged:
+            self.write_changes(staged, changes)
+
+    def write_changes(self, staged: dict, changes: Dict[str, dict]):
+        """Aplica as alterações partição por partição; linhas cuja data muda de mês vão para a nova partição."""
+        groups = {}
+        for id in changes:
+            key = staged["ids"].get(id)
+            if key is not None:
+                groups.setdefault(key, []).append(id)
+        if not groups:
+            return
+
+        self.begin_write()
+        moved = []
+        for key, ids in groups.items():
+            handler = self.partition(key)
+            with handler.writing() as base:
+                kept = []
+                for item in base.rows:
+                    if item["id"] in ids:
+                        item = {**item, **changes[item["id"]]}
+                        if self.partition_key(item.get(self.partition_column)) != key:
+                            moved.append(item)
+                            continue
+                    kept.append(item)
+                self.replace_partition(staged, key, kept)
+
+        if moved:
+            self.write_new(staged, moved)
+
+    def delete(self, id):
+        with self.writing() as staged:
+            if str(id) not in staged["ids"]:
+                raise Exception("ID não existe")
+
+            self.write_removals(staged, {str(id)})
+
+    def bulk_delete(self, ids: Iterable):
+        ids = {str(id) for id in ids}
+        if not ids:
+            return
+
+        with self.writing() as staged:
+            self.write_removals(staged, ids)
+
+    def write_removals(self, staged: dict, ids: set):
+        groups = {}
+        for id in ids:
+            key = staged["ids"].get(id)
+            if key is not None:
+                groups.setdefault(key, set()).add(id)
+        if not groups:
+            return
+
+        self.begin_write()
+        for key, partition_ids in groups.items():
+            handler = self.partition(key)
+            with handler.writing() as base:
+                self.replace_partition(staged, key, [item for item in base.rows if item["id"] not in partition_ids])
+
+            for id in partition_ids:
+                staged["ids"].pop(id, None)
+                staged["log"].append((id, ""))
@@ -0,0 +1,71 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+## pool dedicado ao hash de senhas: limita quantos hashes (scrypt) rodam ao mesmo tempo,
+## assim uma rajada de logins não ocupa a CPU de todas as threads do worker
+_executor = None
+_executor_lock = threading.Lock()
+
+## quantidade de hashes aguardando ou em execução no pool
+_pending = 0
+_pending_lock = threading.Lock()
+
+## prefixo dos hashes gerados com cada método configurado (ex.: "scrypt:32768:8:1")
+_prefixes: Dict[str, str] = {}
+
+
+def workers() -> int:
+    return current_app.config.get("PASSWORD_HASH_WORKERS") or min(4, os.cpu_count() or 1)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers(), thread_name_prefix="password-hash")
+        return _executor
+
+
+def _run(fn, *args):
+    global _pending
+    with _pending_lock:
+        _pending += 1
+    try:
+        return get_executor().submit(fn, *args).result()
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+def pending() -> int:
+    """Hashes aguardando ou em execução no pool."""
+    return _pending
+
+
+def hash_method() -> str:
+    return current_app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+
+
+def hash_password(password: str) -> str:
+    """Gera o hash da senha com o método configurado em PASSWORD_HASH_METHOD, no pool de hash."""
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(pwhash: str, password: str) -> bool:
+    """Confere a senha no pool de hash."""
+    if not pwhash or password is None:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash: str) -> bool:
+    """Se o hash foi gerado com parâmetros diferentes dos configurados atualmente."""
+    method = hash_method()
+    prefix = _prefixes.get(method)
+    if prefix is None:
+        prefix = _prefixes[method] = hash_password("").split("$", 1)[0]
+    return pwhash.split("$", 1)[0] != prefix
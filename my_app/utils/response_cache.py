@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Optional
+from urllib.parse import urlencode
+from flask import Response, current_app, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from .data_handler import DataHandler, TABLE_DEPENDENCIES, read_versions
+
+
+class ResponseCache:
+    """Cache LRU de respostas GET de um blueprint.
+
+    Cada entrada é marcada com as tabelas das quais depende. Uma escrita em uma dessas tabelas
+    remove apenas as entradas marcadas com ela. As entradas também guardam as versões das
+    tabelas, assim escritas feitas por outros processos invalidam a entrada na próxima leitura.
+    """
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["versions"] != versions:
+                if entry is not None:
+                    self._remove(key)
+                    self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, versions, tags, response: Response):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = {
+                "versions": versions,
+                "tags": tags,
+                "body": response.get_data(),
+                "status": response.status_code,
+                "mimetype": response.mimetype,
+            }
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, table: str):
+        with self._lock:
+            for key in list(self._tags.get(table, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry["tags"]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+## um cache por blueprint, criado na primeira requisição com o tamanho configurado
+response_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(blueprint: str) -> Optional[ResponseCache]:
+    """Tamanho em `RESPONSE_CACHE_SIZES[blueprint]`, ou `RESPONSE_CACHE_SIZE` por padrão. 0 desativa."""
+    with _caches_lock:
+        cache = response_caches.get(blueprint)
+        if cache is None:
+            sizes = current_app.config.get("RESPONSE_CACHE_SIZES", {})
+            size = sizes.get(blueprint, current_app.config.get("RESPONSE_CACHE_SIZE", 256))
+            cache = response_caches[blueprint] = ResponseCache(size)
+
+    return cache if cache.max_size > 0 else None
+
+
+@DataHandler.on_write
+def invalidate_response_caches(table: str):
+    for cache in list(response_caches.values()):
+        cache.invalidate(table)
+
+
+def response_cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in response_caches.items()}
+
+
+def cached(table: str):
+    """Guarda a resposta 200 da rota, chaveada por caminho, query string normalizada,
+    header Accept e identidade do JWT. Deve vir depois do `@jwt_required()`.
+    Respostas em streaming (NDJSON) não são guardadas.
+    """
+    tags = (table, *TABLE_DEPENDENCIES.get(table, []))
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache(request.blueprint)
+            ## versões lidas antes de gerar a resposta (None: escrita em andamento ou snapshot antigo fixado)
+            versions = read_versions(table)
+            if cache is None or versions is None:
+                return fn(*args, **kwargs)
+
+            query = urlencode(sorted(request.args.items(multi=True)))
+            key = (request.path, query, request.headers.get("Accept", ""), get_jwt_identity())
+
+            entry = cache.get(key, versions)
+            if entry is not None:
+                return Response(entry["body"], status=entry["status"], mimetype=entry["mimetype"])
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.set(key, versions, tags, response)
+            return response
+
+        return wrapper
+    return decorator
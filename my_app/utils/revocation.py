@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+import time
+from typing import Dict
+from .table_lock import table_lock
+
+
+class RevocationStore:
+    """Tokens revogados (jti -> expiração do token), consultados a cada requisição protegida.
+
+    A consulta é um acesso a dicionário em memória. A lista é persistida em um arquivo JSON
+    em instance/, assim sobrevive a reinícios e é compartilhada entre os workers: cada processo
+    relê o arquivo quando ele muda, checando o mtime no máximo a cada `reload_interval` segundos.
+    Entradas saem da lista quando o token expira, já que a partir daí ele seria recusado de qualquer forma.
+    """
+    def __init__(self, reload_interval: float = 1.0):
+        self.path = None
+        self.reload_interval = reload_interval
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def init_app(self, app):
+        self.path = os.path.join(app.instance_path, "revoked_tokens.json")
+        self.reload_interval = app.config.get("REVOCATION_RELOAD_INTERVAL", self.reload_interval)
+        with self._lock:
+            self._revoked = {}
+            self._mtime = None
+            self._checked_at = 0.0
+
+    def is_revoked(self, jti: str) -> bool:
+        self.maybe_reload()
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    def revoke(self, jti: str, exp: float):
+        """Revoga o token até a sua expiração, gravando a lista no arquivo."""
+        with table_lock(self.path):
+            ## mescla com o que outros processos já gravaram antes de regravar o arquivo
+            revoked = {**self._read(), jti: exp}
+            now = time.time()
+            revoked = {key: value for key, value in revoked.items() if value > now}
+            self._write(revoked)
+
+            with self._lock:
+                self._revoked = revoked
+                self._mtime = self._get_mtime()
+                self._checked_at = now
+
+    def maybe_reload(self):
+        now = time.time()
+        if now - self._checked_at < self.reload_interval:
+            return
+
+        with self._lock:
+            self._checked_at = now
+            mtime = self._get_mtime()
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+            self._revoked = {key: value for key, value in self._read().items() if value > now}
+
+    def _get_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, revoked: dict):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(revoked, f)
+        os.replace(tmp, self.path)
+
+    def stats(self) -> dict:
+        return {"revoked": len(self._revoked)}
+
+
+revocation_store = RevocationStore()
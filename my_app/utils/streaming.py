@@ -0,0 +1,34 @@
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+## quantidade de linhas populadas por vez ao gerar respostas em streaming
+CHUNK_SIZE = 500
+
+def chunked(rows: Iterable[Dict[str, Any]], size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa um iterador de linhas em listas de até `size` itens."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def wants_stream(stream: Optional[str] = None) -> bool:
+    """Indica se a resposta deve ser em NDJSON: `?stream=1` ou header `Accept: application/x-ndjson`."""
+    if stream is not None:
+        return stream.lower() in ("1", "true")
+
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def stream_rows(rows: Iterable[Dict[str, Any]]) -> Response:
+    """Resposta em chunks com um objeto JSON por linha, gerada conforme as linhas são lidas."""
+    provider = current_app.json
+
+    def generate():
+        for row in rows:
+            yield provider.encode(row) + "\n"
+
+    return Response(stream_with_context(generate()), status=200, mimetype=NDJSON_MIMETYPE)
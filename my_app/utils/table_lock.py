@@ -0,0 +1,58 @@
+import os
+import threading
+from typing import Dict
+
+## o fcntl só existe em sistemas Unix; sem ele o lock vale apenas entre threads do mesmo processo
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class TableLock:
+    """Lock de escrita de uma tabela.
+
+    Vale entre as threads do processo (RLock, pode ser adquirido de novo pela mesma thread)
+    e entre processos, com um `flock` no arquivo `<tabela>.csv.lock`.
+    """
+    def __init__(self, filename: str):
+        self.path = f"{filename}.lock"
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+        self._owner = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        self._owner = threading.get_ident()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def is_owned(self) -> bool:
+        """Se a thread atual está com o lock."""
+        return self._owner == threading.get_ident()
+
+
+_locks: Dict[str, TableLock] = {}
+_locks_guard = threading.Lock()
+
+
+def table_lock(filename: str) -> TableLock:
+    with _locks_guard:
+        lock = _locks.get(filename)
+        if lock is None:
+            lock = _locks[filename] = TableLock(filename)
+        return lock
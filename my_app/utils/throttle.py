@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from flask import current_app
+from . import passwords
+from .table_lock import table_lock
+
+
+def parse_limit(value) -> Optional[Tuple[int, float]]:
+    """"20/60" -> (20 tentativas, recarga completa em 60 segundos). "0" ou vazio desativa."""
+    if not value or str(value).strip() == "0":
+        return None
+    capacity, _, period = str(value).partition("/")
+    return int(capacity), float(period or 60)
+
+
+def refill(state, capacity: int, period: float, now: float) -> float:
+    """Tokens disponíveis no balde agora (o balde enche `capacity` tokens a cada `period` segundos)."""
+    if state is None:
+        return float(capacity)
+    tokens, updated_at = state[:2]
+    return min(float(capacity), tokens + (now - updated_at) * capacity / period)
+
+
+def is_full(state, now: float) -> bool:
+    """Se o balde já encheu de novo, com o limite gravado nele (cada chave pode ter um limite diferente)."""
+    if len(state) < 4:
+        return True
+    _, _, capacity, period = state
+    return refill(state, capacity, period, now) >= capacity
+
+
+class MemoryBucketStore:
+    """Baldes guardados na memória do processo."""
+    def __init__(self):
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, period: float, cost: int) -> float:
+        """Consome `cost` tokens. Retorna 0 se a tentativa foi aceita, ou os segundos até haver tokens."""
+        now = time.time()
+        with self._lock:
+            tokens = refill(self._buckets.get(key), capacity, period, now)
+            if tokens < cost:
+                return (cost - tokens) * period / capacity
+            self._buckets[key] = [tokens - cost, now, capacity, period]
+
+            ## baldes cheios não precisam ser guardados
+            if len(self._buckets) > 10000:
+                self._buckets = {
+                    name: state for name, state in self._buckets.items() if not is_full(state, now)
+                }
+            return 0
+
+
+class FileBucketStore:
+    """Baldes guardados em um arquivo JSON em instance/, compartilhados entre os workers.
+
+    Cada tentativa lê e regrava o arquivo sob o lock de arquivo (o mesmo usado pelas tabelas).
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def take(self, key: str, capacity: int, period: float, cost: int) -> float:
+        now = time.time()
+        with table_lock(self.path):
+            buckets = self._read()
+            tokens = refill(buckets.get(key), capacity, period, now)
+            if tokens < cost:
+                return (cost - tokens) * period / capacity
+
+            buckets[key] = [tokens - cost, now, capacity, period]
+            buckets = {
+                name: state for name, state in buckets.items() if not is_full(state, now)
+            }
+            self._write(buckets)
+            return 0
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, buckets: dict):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(buckets, f)
+        os.replace(tmp, self.path)
+
+
+class LoginThrottle:
+    """Limite de tentativas de login por IP e por email (token bucket), checado antes do hash da senha.
+
+    O custo de cada tentativa cresce com a fila do pool de hash: com o pool saturado,
+    cada tentativa consome mais tokens e os limites ficam mais apertados.
+    """
+    def __init__(self):
+        self._store = None
+        self._store_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"allowed": 0, "rejected_ip": 0, "rejected_email": 0}
+
+    def get_store(self):
+        with self._store_lock:
+            if self._store is None:
+                if current_app.config.get("LOGIN_THROTTLE_STORE") == "file":
+                    self._store = FileBucketStore(os.path.join(current_app.instance_path, "login_throttle.json"))
+                else:
+                    self._store = MemoryBucketStore()
+            return self._store
+
+    def cost(self) -> int:
+        return 1 + passwords.pending() // passwords.workers()
+
+    def check(self, ip: str, email: str) -> float:
+        """Retorna 0 se a tentativa pode seguir, ou os segundos de espera (Retry-After)."""
+        store = self.get_store()
+        cost = self.cost()
+
+        for name, key in (("ip", ip), ("email", (email or "").strip().lower())):
+            limit = parse_limit(current_app.config.get(f"LOGIN_THROTTLE_{name.upper()}"))
+            if limit is None:
+                continue
+            capacity, period = limit
+            wait = store.take(f"{name}:{key}", capacity, period, min(cost, capacity))
+            if wait:
+                self.count(f"rejected_{name}")
+                return wait
+
+        self.count("allowed")
+        return 0
+
+    def count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {**self.stats, "cost": self.cost(), "hash_pending": passwords.pending()}
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from flask import Response, current_app, request, stream_with_context
+from .streaming import NDJSON_MIMETYPE, chunked
+
+CSV_MIMETYPE = "text/csv"
+
+## quantidade máxima de erros devolvidos no resumo da importação
+MAX_REPORTED_ERRORS = 100
+
+def transfer_format(default: str = "csv") -> str:
+    """Formato pedido em `?format=csv|ndjson`, ou deduzido do Content-Type/Accept."""
+    fmt = (request.args.get("format") or "").lower()
+    if fmt in ("csv", "ndjson"):
+        return fmt
+
+    mimetype = request.mimetype if request.method == "POST" else request.accept_mimetypes.best_match([CSV_MIMETYPE, NDJSON_MIMETYPE])
+    if mimetype == NDJSON_MIMETYPE:
+        return "ndjson"
+    if mimetype == CSV_MIMETYPE:
+        return "csv"
+    return default
+
+def export_response(rows: Iterable[Dict[str, Any]], headers: List[str], fmt: str, filename: str) -> Response:
+    """Exporta as linhas em streaming, sem carregar a tabela na memória."""
+    provider = current_app.json
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow([row.get(key, "") for key in headers])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    def generate_ndjson():
+        for row in rows:
+            yield provider.encode({key: row.get(key, "") for key in headers}) + "\n"
+
+    if fmt == "ndjson":
+        response = Response(stream_with_context(generate_ndjson()), mimetype=NDJSON_MIMETYPE)
+    else:
+        response = Response(stream_with_context(generate_csv()), mimetype=CSV_MIMETYPE)
+
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}.{fmt}"
+    return response
+
+def read_import_rows(fmt: str) -> Iterator[Any]:
+    """Lê o corpo da requisição linha a linha (CSV com cabeçalho ou NDJSON)."""
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+
+    if fmt == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+        return
+
+    reader = csv.reader(stream)
+    headers = [key.strip() for key in next(reader, [])]
+    for line in reader:
+        if line:
+            yield {key: value for key, value in zip(headers, line) if value != ""}
+
+def run_import(
+    handler,
+    rows: Iterable[Any],
+    prepare: Callable[[], Callable[[dict], dict]],
+    load: Optional[Callable[[Any], dict]] = None,
+    chunk_size: int = 1000,
+    on_item: Optional[Callable[[int], None]] = None
+) -> Dict[str, Any]:
+    """Lê e valida as linhas em blocos e grava cada bloco válido em uma escrita, com o lock apenas durante o bloco.
+
+    A leitura do corpo e o `load` (schema) acontecem sem o lock, para um cliente lento não travar a tabela.
+    `prepare` é chamado com o lock de cada bloco e retorna a função que prepara cada linha, para que as
+    checagens que dependem da tabela (e-mails, agenda) vejam o que os blocos anteriores e os outros writers gravaram.
+    `on_item` (opcional) recebe o número da linha antes do `prepare` de cada linha.
+
+    A importação é best-effort: linhas inválidas são ignoradas e reportadas (até MAX_REPORTED_ERRORS).
+    """
+    summary = {"imported": 0, "failed": 0, "errors": []}
+
+    line = 0
+    for chunk in chunked(rows, chunk_size):
+        loaded, errors = [], []
+        for item in chunk:
+            line += 1
+            try:
+                if not isinstance(item, dict):
+                    raise Exception("Linha inválida")
+                loaded.append((line, load(item) if load else item))
+            except Exception as err:
+                errors.append({"line": line, "message": str(err)})
+
+        if loaded:
+            with handler.lock():
+                prepare_item = prepare()
+                prepared = []
+                for item_line, item in loaded:
+                    if on_item:
+                        on_item(item_line)
+                    try:
+                        prepared.append(prepare_item(item))
+                    except Exception as err:
+                        errors.append({"line": item_line, "message": str(err)})
+
+                handler.bulk_create(prepared)
+            summary["imported"] += len(prepared)
+
+        ## erros do bloco na ordem das linhas
+        summary["failed"] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        summary["errors"].extend(sorted(errors, key=lambda error: error["line"])[:max(room, 0)])
+
+    return summary
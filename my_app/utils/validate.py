@@ -1,38 +1,74 @@
 from typing import List, AnyStr
 from flask import jsonify
 from datetime import datetime as dt, date
-from marshmallow import Schema, fields
+from marshmallow import Schema, ValidationError, fields
 
-def schemaValidate(list_fields: List[AnyStr], data: dict, missing = True):
+## mensagens padrão do marshmallow traduzidas nas respostas de validação
+MESSAGES = {
+    "Missing data for required field.": "Campo obrigatório.",
+    "Not a valid integer.": "Informe um número inteiro.",
+    "Not a valid number.": "Informe um número.",
+    "Not a valid string.": "Informe um texto.",
+    "Not a valid boolean.": "Informe true ou false.",
+    "Not a valid list.": "Informe uma lista.",
+    "Not a valid datetime.": "Informe uma data válida.",
+}
+
+def validationErrors(data, errors: dict, blocked: List[AnyStr] = []) -> dict:
+    """Monta o corpo do erro de validação (mesmo formato do ValidationFailedSchema)."""
+    if not isinstance(data, dict):
+        return {"success": False, "error": "Envie um objeto JSON no corpo da requisição."}
+
+    blocked_fields = [field for field in blocked if field in data]
+    if blocked_fields:
+        return {"success": False, "error": "Alguns campos informados estão bloqueados.", "blocked": blocked_fields}
+
+    missing = [field for field, messages in errors.items() if "Missing data for required field." in messages]
+    invalid = {
+        field: [MESSAGES.get(message, message) for message in messages]
+        for field, messages in errors.items()
+        if field not in missing
+    }
+
+    body = {"success": False, "error": "Campos obrigatórios estão faltando ou estão vazios." if missing else "Alguns campos informados são inválidos."}
     if missing:
-        missing_fields = []
-        for field in list_fields:
-            if field not in data or not data[field]:
-                missing_fields.append(field)
-                
-        if missing_fields:
-            return jsonify({
-                "success": False,
-                "error": "Campos obrigatórios estão faltando ou estão vazios.",
-                "missing": missing_fields
-            }), 422 
+        body["missing"] = missing
+    if invalid:
+        body["invalid"] = invalid
+    return body
+
+def loadBody(schema: Schema, data, blocked: List[AnyStr] = []) -> dict:
+    """Valida e converte `data` com um schema já instanciado.
+
+    Levanta ValidationError com o corpo do erro em `messages` (ver validationErrors).
+    """
+    if not isinstance(data, dict) or any(field in data for field in blocked):
+        raise ValidationError(validationErrors(data, {}, blocked))
 
-        return None
-    else:
-        blocked_fields = []
-        for field in list_fields:
-            if field in data:
-                blocked_fields.append(field)
-                
-        if blocked_fields:
-            return jsonify({
-                "success": False,
-                "error": "Alguns campos informados estão bloqueados.",
-                "blocked": blocked_fields
-            }), 422 
+    try:
+        return schema.load(data)
+    except ValidationError as err:
+        raise ValidationError(validationErrors(data, err.messages, blocked))
 
-        return None
-    
+def validateBody(schema: Schema, data, blocked: List[AnyStr] = []):
+    """Validação do corpo nas rotas: retorna (dados, None) ou (None, resposta 422)."""
+    try:
+        return loadBody(schema, data, blocked), None
+    except ValidationError as err:
+        return None, (jsonify(err.messages), 422)
+
+def loadItem(schema: Schema, data, blocked: List[AnyStr] = []) -> dict:
+    """Validação de um item de lote/importação: levanta Exception com a mensagem do erro."""
+    try:
+        return loadBody(schema, data, blocked)
+    except ValidationError as err:
+        body = err.messages
+        details = body.get("missing") or body.get("blocked")
+        if details:
+            raise Exception(f"{body['error'].rstrip('.')}: {', '.join(details)}")
+        if body.get("invalid"):
+            raise Exception("; ".join(f"{field}: {' '.join(messages)}" for field, messages in body["invalid"].items()))
+        raise Exception(body["error"])
 
 def validateScheduledAt(date_string: str, date_format='%Y-%m-%dT%H:%M:%S.%f'):
         if not date_string:
@@ -79,3 +115,12 @@ class ValidationFailedSchema(Schema):
             "example": ["id", "created_at"]
             }
         )
+    invalid = fields.Dict(
+        keys=fields.String(),
+        values=fields.List(fields.String()),
+        required=False,
+        metadata={
+            "description": "Campos com valores inválidos e as mensagens de cada um",
+            "example": {"sex": ["O campo 'sex' deve ser 'M' (Macho) ou 'F' (Fêmea)."]}
+            }
+        )
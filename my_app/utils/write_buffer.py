@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+class WriteBuffer:
+    """Agrupa os creates concorrentes de uma tabela em uma única escrita (group commit).
+
+    O primeiro create de uma janela espera `window` segundos, junta todos os creates que chegaram
+    nesse intervalo e entrega todos a uma única chamada de `write` (ver DataHandler.submit_create),
+    que valida o lote e grava os itens válidos com um único lock, uma única leitura do último ID
+    e um único append (com fsync, se `WRITE_FSYNC` estiver ligado). Cada chamada só retorna depois
+    que a sua linha está gravada (ou levanta o erro do seu item ou da escrita).
+    """
+    def __init__(self):
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flushing = False
+
+    def submit(self, data: dict, window: float, write: Callable[[List[dict]], List[Optional[Exception]]]):
+        entry = {"data": data, "write": write, "done": threading.Event(), "error": None}
+
+        with self._lock:
+            self._pending.append(entry)
+            leader = not self._flushing
+            self._flushing = True
+
+        if leader:
+            time.sleep(window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._flushing = False
+            self.flush(batch)
+
+        entry["done"].wait()
+        if entry["error"] is not None:
+            raise entry["error"]
+
+    def flush(self, batch):
+        ## os itens são gravados pela função de quem os enviou (ex.: o serviço de agendamentos valida a agenda)
+        groups = {}
+        for entry in batch:
+            write = entry["write"]
+            groups.setdefault(getattr(write, "__func__", write), []).append(entry)
+
+        for entries in groups.values():
+            try:
+                errors = entries[0]["write"]([entry["data"] for entry in entries])
+                for entry, error in zip(entries, errors):
+                    entry["error"] = error
+            except Exception as err:
+                for entry in entries:
+                    entry["error"] = err
+            finally:
+                for entry in entries:
+                    entry["done"].set()
+
+
+_buffers: Dict[str, WriteBuffer] = {}
+_buffers_guard = threading.Lock()
+
+
+def write_buffer(filename: str) -> WriteBuffer:
+    with _buffers_guard:
+        buffer = _buffers.get(filename)
+        if buffer is None:
+            buffer = _buffers[filename] = WriteBuffer()
+        return buffer
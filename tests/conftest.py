@@ -0,0 +1,46 @@
+import os
+import shutil
+import pytest
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-with-at-least-32-bytes")
+
+from my_app import create_app
+from my_app.services.auth import Auth
+from my_app.utils.revocation import revocation_store
+
+
+@pytest.fixture
+def server(tmp_path):
+    """App com uma cópia da pasta instance, para os testes não alterarem os dados do repositório."""
+    app = create_app()
+    instance = tmp_path / "instance"
+    shutil.copytree(app.instance_path, instance, ignore=shutil.ignore_patterns("*.lock", "*.version", "archive", "*.json.tmp"))
+    app.instance_path = str(instance)
+    ## o arquivo de tokens revogados é definido na criação do app
+    revocation_store.init_app(app)
+    return app
+
+
+@pytest.fixture
+def app(server):
+    """App com o contexto ativo, para testar os services diretamente."""
+    with server.app_context():
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    """Cliente HTTP. Não usar junto com `app`: com um contexto ativo, as requisições
+    compartilhariam o mesmo `g` (e os snapshots fixados nele)."""
+    return server.test_client()
+
+
+@pytest.fixture
+def tokens(server) -> dict:
+    with server.app_context():
+        return Auth().issue_tokens("1", {"user_id": "1"})
+
+
+@pytest.fixture
+def auth(tokens) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
@@ -0,0 +1,36 @@
+from my_app.utils.archive import Archive
+
+COLUMNS = ["id", "status", "scheduled_at"]
+
+
+def test_get_by_id_reads_the_month_of_the_id(app):
+    archive = Archive("appointments", "scheduled_at")
+    archive.append([
+        {"id": "1", "status": "finished", "scheduled_at": "2024-01-10T10:00:00.000000"},
+        {"id": "2", "status": "canceled", "scheduled_at": "2024-02-10T10:00:00.000000"},
+    ], COLUMNS)
+    archive.append([{"id": "3", "status": "finished", "scheduled_at": "2024-02-20T10:00:00.000000"}], COLUMNS)
+
+    assert archive.get_by_id(2) == {"id": "2", "status": "canceled", "scheduled_at": "2024-02-10T10:00:00.000000"}
+    assert archive.get_by_id("3")["scheduled_at"] == "2024-02-20T10:00:00.000000"
+    assert archive.get_by_id(4) is None
+
+
+def test_get_by_id_without_archive(app):
+    assert Archive("appointments", "scheduled_at").get_by_id(1) is None
+
+
+def test_id_archived_twice_uses_the_last_copy(app):
+    archive = Archive("appointments", "scheduled_at")
+    archive.append([{"id": "1", "status": "scheduled", "scheduled_at": "2024-01-10T10:00:00.000000"}], COLUMNS)
+    archive.append([{"id": "1", "status": "finished", "scheduled_at": "2024-01-10T10:00:00.000000"}], COLUMNS)
+
+    assert archive.get_by_id(1)["status"] == "finished"
+
+
+def test_rows_without_date_go_to_the_undated_file(app):
+    archive = Archive("appointments", "scheduled_at")
+    archive.append([{"id": "5", "status": "canceled", "scheduled_at": ""}], COLUMNS)
+
+    assert archive.months() == ["undated"]
+    assert archive.get_by_id(5)["status"] == "canceled"
@@ -0,0 +1,55 @@
+import pytest
+from my_app.utils import revocation
+
+SERVICE = {"name": "Banho", "description": "Banho e tosa", "value": 50}
+
+
+def batch(client, auth, *requests):
+    return client.post("/batch", json={"requests": list(requests)}, headers=auth)
+
+
+def test_sub_requests_run_in_order(client, auth):
+    response = batch(
+        client, auth,
+        {"id": "create", "method": "POST", "path": "/services/", "body": SERVICE},
+        {"id": "list", "method": "GET", "path": "/services/"},
+        {"id": "missing", "method": "GET", "path": "/services/99"},
+    )
+
+    assert response.status_code == 200
+    results = {item["id"]: item for item in response.json["responses"]}
+    assert results["create"]["status"] == 201
+    assert [service["name"] for service in results["list"]["body"]["data"]] == ["Banho"]
+    assert results["missing"]["status"] == 404
+
+
+def test_the_token_is_verified_once_for_the_whole_batch(client, auth, monkeypatch):
+    checks = []
+    is_revoked = revocation.revocation_store.is_revoked
+    monkeypatch.setattr(revocation.revocation_store, "is_revoked", lambda jti: checks.append(jti) or is_revoked(jti))
+
+    response = batch(client, auth, *[{"method": "GET", "path": "/pets/"} for _ in range(5)])
+
+    assert [item["status"] for item in response.json["responses"]] == [200] * 5
+    assert len(checks) == 1
+
+
+def test_batch_requires_a_token(client):
+    response = batch(client, {}, {"method": "GET", "path": "/pets/"})
+    assert response.status_code == 401
+
+
+def test_routes_with_other_token_types_are_rejected(client, auth):
+    response = batch(client, auth, {"method": "POST", "path": "/auth/refresh"})
+    assert response.json["responses"][0]["status"] == 401
+
+
+@pytest.mark.parametrize("path", ["/batch", "/batch/", "pets"])
+def test_invalid_paths(client, auth, path):
+    response = batch(client, auth, {"method": "POST", "path": path})
+    assert response.json["responses"][0]["status"] == 400
+
+
+def test_batch_size_is_limited(client, auth):
+    response = batch(client, auth, *[{"method": "GET", "path": "/pets/"} for _ in range(21)])
+    assert response.status_code == 400
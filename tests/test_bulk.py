@@ -0,0 +1,58 @@
+def service(name: str, value=50) -> dict:
+    return {"name": name, "description": "Serviço", "value": value}
+
+
+def names(client, auth) -> list:
+    return [item["name"] for item in client.get("/services/", headers=auth).json["data"]]
+
+
+def test_bulk_create_writes_every_item(client, auth):
+    response = client.post("/services/bulk", json={"items": [service("Banho"), service("Tosa")]}, headers=auth)
+
+    assert response.status_code == 201
+    assert response.json["applied"] is True
+    assert [result["id"] for result in response.json["results"]] == ["1", "2"]
+    assert names(client, auth) == ["Banho", "Tosa"]
+
+
+def test_transactional_batch_with_an_invalid_item_writes_nothing(client, auth):
+    response = client.post("/services/bulk", json={"items": [service("Banho"), service("Tosa", "caro")]}, headers=auth)
+
+    assert response.status_code == 400
+    assert response.json["applied"] is False
+    assert [result["success"] for result in response.json["results"]] == [True, False]
+    assert names(client, auth) == []
+
+
+def test_non_transactional_batch_writes_the_valid_items(client, auth):
+    items = [service("Banho"), service("Tosa", "caro")]
+    response = client.post("/services/bulk", json={"items": items, "transactional": False}, headers=auth)
+
+    assert response.status_code == 207
+    assert response.json["success"] is False
+    assert response.json["results"][1]["index"] == 1
+    assert response.json["results"][1]["message"]
+    assert names(client, auth) == ["Banho"]
+
+
+def test_bulk_update_and_delete_report_missing_ids(client, auth):
+    client.post("/services/bulk", json={"items": [service("Banho"), service("Tosa")]}, headers=auth)
+
+    items = [{"id": 1, "name": "Banho e tosa"}, {"id": 99, "name": "Nada"}]
+    response = client.patch("/services/bulk", json={"items": items, "transactional": False}, headers=auth)
+    assert response.status_code == 207
+    assert names(client, auth) == ["Banho e tosa", "Tosa"]
+
+    response = client.delete("/services/bulk", json={"ids": [2, 99]}, headers=auth)
+    assert response.status_code == 400
+    assert names(client, auth) == ["Banho e tosa", "Tosa"]
+
+    response = client.delete("/services/bulk", json={"ids": [2]}, headers=auth)
+    assert response.status_code == 200
+    assert names(client, auth) == ["Banho e tosa"]
+
+
+def test_empty_batch_fails_validation(client, auth):
+    response = client.post("/services/bulk", json={"items": []}, headers=auth)
+    assert response.status_code == 422
+    assert "items" in response.json["invalid"]
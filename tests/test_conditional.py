@@ -0,0 +1,37 @@
+SERVICE = {"name": "Banho", "description": "Banho e tosa", "value": 50}
+
+
+def test_matching_etag_answers_304_without_body(client, auth):
+    response = client.get("/services/", headers=auth)
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+
+    response = client.get("/services/", headers={**auth, "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_a_write_changes_the_etag(client, auth):
+    etag = client.get("/services/", headers=auth).headers["ETag"]
+
+    assert client.post("/services/", json=SERVICE, headers=auth).status_code == 201
+
+    response = client.get("/services/", headers={**auth, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [service["name"] for service in response.json["data"]] == ["Banho"]
+
+
+def test_etag_depends_on_the_query_and_the_accept_header(client, auth):
+    etags = {
+        client.get("/services/", headers=auth).headers["ETag"],
+        client.get("/services/?name=Banho", headers=auth).headers["ETag"],
+        client.get("/services/", headers={**auth, "Accept": "application/x-ndjson"}).headers["ETag"],
+    }
+    assert len(etags) == 3
+
+
+def test_errors_have_no_etag(client, auth):
+    response = client.get("/services/999", headers=auth)
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
@@ -0,0 +1,56 @@
+import csv
+import os
+import pytest
+from my_app.services.credentials import Credentials
+from my_app.utils.passwords import hash_password
+
+
+@pytest.fixture
+def legacy(server):
+    """Instalação anterior a credentials.csv: a senha fica em employees.csv."""
+    with server.app_context():
+        pwhash = hash_password("segredo")
+
+    employees = os.path.join(server.instance_path, "employees.csv")
+    with open(employees, newline="") as f:
+        rows = list(csv.DictReader(f))
+    with open(employees, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=[*rows[0], "password"])
+        writer.writeheader()
+        writer.writerows({**row, "password": pwhash} for row in rows)
+
+    os.remove(os.path.join(server.instance_path, "credentials.csv"))
+    return server
+
+
+def read(path: str) -> list:
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_migrate_moves_the_password_column(legacy):
+    with legacy.app_context():
+        assert Credentials().migrate() == 1
+        assert Credentials().migrate() is None
+
+    employees = read(os.path.join(legacy.instance_path, "employees.csv"))
+    credentials = read(os.path.join(legacy.instance_path, "credentials.csv"))
+    assert "password" not in employees[0]
+    assert credentials[0] == ["id", "password"]
+    assert [row[0] for row in credentials[1:]] == ["1"]
+
+
+def test_cli_command_reports_the_migration(legacy):
+    runner = legacy.test_cli_runner()
+
+    ## o comando `flask` ativa o contexto do app antes de chamar o comando
+    with legacy.app_context():
+        assert "1 funcionário(s) migrado(s)" in runner.invoke(args=["migrate-credentials"]).output
+        assert "já não tem a coluna" in runner.invoke(args=["migrate-credentials"]).output
+
+
+def test_login_migrates_on_first_use(legacy):
+    response = legacy.test_client().post("/auth/login", json={"email": "leo@ifal.edu.br", "password": "segredo"})
+
+    assert response.status_code == 200
+    assert os.path.exists(os.path.join(legacy.instance_path, "credentials.csv"))
@@ -0,0 +1,53 @@
+import pytest
+from my_app.utils.expand import parse_expand
+
+SERVICE = {"name": "Banho", "description": "Banho e tosa", "value": 50}
+APPOINTMENT = {"pet_id": 2, "service_id": 1, "employee_id": 1, "scheduled_at": "2030-05-02T10:00:00.000000"}
+
+
+@pytest.mark.parametrize("value, tree", [
+    (None, {}),
+    ("pet", {"pet": {}}),
+    ("pet.owner,service", {"pet": {"owner": {}}, "service": {}}),
+    ("pet, pet.owner,,", {"pet": {"owner": {}}}),
+])
+def test_parse_expand(value, tree):
+    assert parse_expand(value) == tree
+
+
+@pytest.fixture
+def appointment(client, auth):
+    client.post("/services/", json=SERVICE, headers=auth)
+    assert client.post("/appointments/", json=APPOINTMENT, headers=auth).status_code == 201
+
+
+def created(client, auth, query: str = "") -> dict:
+    ## o instance/ de exemplo já tem agendamentos: o criado é o do horário acima
+    rows = client.get(f"/appointments/{query}", headers=auth).json["data"]
+    return next(row for row in rows if row["scheduled_at"].startswith("2030-05-02T10:00"))
+
+
+def test_relationships_are_ids_by_default(client, auth, appointment):
+    row = created(client, auth)
+
+    assert str(row["pet_id"]) == "2"
+    assert "pet" not in row
+
+
+def test_expand_hydrates_only_the_requested_levels(client, auth, appointment):
+    row = created(client, auth, "?expand=pet,service")
+    assert row["pet"]["name"] == "Biruta"
+    assert str(row["pet"]["owner_id"]) == "2"
+    assert row["service"]["name"] == "Banho"
+    assert str(row["employee_id"]) == "1"
+
+    row = created(client, auth, "?expand=pet.owner")
+    assert row["pet"]["owner_id"]["name"] == "MARCOS VINICIUS BEZERRA SILVA"
+
+
+def test_clients_list_pet_ids_unless_expanded(client, auth):
+    clients = {row["id"]: row for row in client.get("/clients/", headers=auth).json["data"]}
+    assert clients["2"]["pets"] == ["2"]
+
+    clients = {row["id"]: row for row in client.get("/clients/?expand=pets", headers=auth).json["data"]}
+    assert [pet["name"] for pet in clients["2"]["pets"]] == ["Biruta"]
@@ -0,0 +1,40 @@
+import pytest
+from my_app.services.appointments import Appointments
+from my_app.services.pets import Pets
+from my_app.services.services import Services
+from my_app.utils.data_handler import DataHandler
+
+
+def appointment(**data) -> dict:
+    return {"pet_id": 1, "service_id": 1, "employee_id": 1, "scheduled_at": "2030-05-02T10:00:00.000000", **data}
+
+
+def test_exists_sees_rows_written_after_the_id_set_was_built(app):
+    handler = DataHandler("services")
+    assert not handler.exists(1)
+
+    Services().create({"name": "Banho", "description": "", "value": 10})
+
+    assert handler.exists(1)
+    assert handler.exists("1")
+    assert not handler.exists(None)
+    assert not handler.exists("")
+
+
+@pytest.mark.parametrize("field, message", [
+    ("pet_id", "Pet não encontrado"),
+    ("service_id", "Serviço não encontrado"),
+    ("employee_id", "Funcionário não encontrado"),
+])
+def test_appointment_references_must_exist(app, field, message):
+    Services().create({"name": "Banho", "description": "", "value": 10})
+
+    with pytest.raises(Exception, match=message):
+        Appointments().create(appointment(**{field: 999}))
+
+
+def test_pet_update_keeps_an_owner_that_is_not_in_clients(app):
+    ## os pets do instance/ de exemplo apontam para clientes que não existem mais
+    Pets().update(1, {"owner_id": 1, "name": "Abel"})
+
+    assert Pets().get_by_id(1)["name"] == "Abel"
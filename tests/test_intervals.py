@@ -0,0 +1,64 @@
+import random
+from my_app.utils.intervals import IntervalIndex
+
+
+def test_touching_intervals_do_not_overlap():
+    index = IntervalIndex([(10, 20, "a")])
+
+    assert index.overlap(20, 30) is None
+    assert index.overlap(0, 10) is None
+
+
+def test_overlap_at_the_edges():
+    index = IntervalIndex([(10, 20, "a")])
+
+    assert index.overlap(19, 30) == "a"
+    assert index.overlap(0, 11) == "a"
+    assert index.overlap(10, 20) == "a"
+    assert index.overlap(12, 18) == "a"
+
+
+def test_long_interval_before_shorter_ones():
+    ## o intervalo longo começa antes e termina depois dos outros: só o maior fim da árvore o encontra
+    index = IntervalIndex([(0, 100, "long"), (10, 20, "short")])
+
+    assert index.overlap(50, 60) == "long"
+    assert index.overlap(100, 110) is None
+
+
+def test_ignored_ids():
+    index = IntervalIndex([(10, 20, "a"), (15, 25, "b")])
+
+    assert index.overlap(12, 18, {"a"}) == "b"
+    assert index.overlap(12, 18, {"a", "b"}) is None
+
+
+def test_add_keeps_the_index_ordered():
+    index = IntervalIndex([(50, 60, "c")])
+    index.add(0, 100, "long")
+    index.add(10, 20, "a")
+
+    assert index.starts == [0, 10, 50]
+    assert index.overlap(70, 80) == "long"
+    assert index.overlap(100, 120) is None
+
+
+def test_long_interval_does_not_scan_the_shorter_ones():
+    index = IntervalIndex([(0, 10_000, "long"), *((start, start + 1, str(start)) for start in range(1, 5000, 2))])
+
+    ## só os trechos da árvore com um fim depois de 9000 são visitados
+    assert list(index.ending_after(9000, len(index))) == [0]
+    assert index.overlap(9500, 9600, {"long"}) is None
+
+
+def test_between_matches_a_full_scan():
+    generator = random.Random(1)
+    intervals = [(start, start + generator.randint(1, 300), str(id)) for id, start in enumerate(generator.sample(range(1000), 200))]
+    index = IntervalIndex(intervals)
+
+    for _ in range(200):
+        start = generator.randint(-50, 1300)
+        end = start + generator.randint(1, 100)
+        expected = sorted(item for item in intervals if item[0] < end and item[1] > start)
+        assert index.between(start, end) == expected
+        assert (index.overlap(start, end) is None) == (not expected)
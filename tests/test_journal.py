@@ -0,0 +1,54 @@
+import csv
+from my_app.services.services import Services
+from my_app.utils.data_handler import DataHandler
+from my_app.utils.journal import Journal, journal
+
+SERVICE = {"name": "Banho", "description": "Banho e tosa", "value": 50}
+
+
+def other_worker(handler: DataHandler) -> Journal:
+    """O journal da tabela mapeado de novo, como em outro processo."""
+    path = journal(handler.filename).path
+    return Journal(path, handler.filename)
+
+
+def test_each_write_moves_the_version_to_the_next_even_value(app):
+    handler = DataHandler("services")
+    before = handler.version()
+    assert before % 2 == 0
+
+    Services().create(SERVICE)
+
+    assert handler.version() == before + 2
+
+
+def test_other_workers_see_the_new_version(app):
+    handler = DataHandler("services")
+    other = other_worker(handler)
+
+    Services().create(SERVICE)
+
+    assert other.read() == handler.version()
+
+
+def test_a_write_left_unfinished_is_closed_when_the_journal_is_opened(app):
+    handler = DataHandler("services")
+    journal(handler.filename).begin_write()
+    assert handler.version() % 2 == 1
+    assert handler.read_version() is None
+
+    assert other_worker(handler).read() % 2 == 0
+
+
+def test_writes_from_other_workers_are_read_from_the_file(app):
+    handler = DataHandler("services")
+    assert handler.snapshot().rows == ()
+
+    ## outro processo grava o csv e avança a versão no journal
+    other = other_worker(handler)
+    other.begin_write()
+    with open(handler.filename, "a", newline="") as f:
+        csv.writer(f).writerow(["1", "Tosa", "Tosa", "30", "2025-01-01 00:00:00.000000", "60"])
+    other.end_write()
+
+    assert [row["name"] for row in handler.snapshot().rows] == ["Tosa"]
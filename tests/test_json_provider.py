@@ -0,0 +1,65 @@
+import json
+from flask import g
+from my_app.services.clients import Clients
+from my_app.services.pets import Pets
+from my_app.utils.data_handler import DataHandler
+from my_app.utils.journal import journal
+from my_app.utils.json_provider import FragmentCache
+
+
+def encode(cache: FragmentCache, table: str, rows: list, variant: str = "") -> dict:
+    return {json.loads(raw)["id"]: raw for raw in cache.encode_rows(table, rows, variant)}
+
+
+def pets(expand: dict = None) -> list:
+    ## cada leitura faz o papel de uma requisição nova, sem os snapshots fixados pela anterior
+    g.pop("_snapshots", None)
+    return Pets().get_relationship(Pets().handler.list_all(), expand)
+
+
+def test_unchanged_rows_reuse_their_fragments(app):
+    cache = FragmentCache()
+    first = encode(cache, "pets", pets())
+    second = encode(cache, "pets", pets())
+
+    assert first == second
+    assert all(second[id] is first[id] for id in first)
+
+
+def test_a_write_only_invalidates_the_written_rows(app):
+    cache = FragmentCache()
+    first = encode(cache, "pets", pets())
+
+    Pets().update(1, {"name": "Tom"})
+    second = encode(cache, "pets", pets())
+
+    assert json.loads(second["1"])["name"] == "Tom"
+    assert second["1"] is not first["1"]
+    assert all(second[id] is first[id] for id in first if id != "1")
+
+
+def test_writing_an_expanded_row_invalidates_the_rows_that_expand_it(app):
+    cache = FragmentCache()
+    first = encode(cache, "pets", pets({"owner": {}}), "owner")
+
+    Clients().update(2, {"name": "Marcos"})
+    second = encode(cache, "pets", pets({"owner": {}}), "owner")
+
+    assert json.loads(second["2"])["owner_id"]["name"] == "Marcos"
+    assert all(second[id] is first[id] for id in first if id != "2")
+
+
+def test_writes_from_other_processes_drop_the_rows_that_expand_the_table(app):
+    cache = FragmentCache()
+    first = encode(cache, "pets", pets({"owner": {}}), "owner")
+
+    ## escrita sem passar pelo DataHandler deste processo: apenas a versão muda
+    clients = journal(DataHandler("clients").filename)
+    clients.begin_write()
+    clients.end_write()
+
+    second = encode(cache, "pets", pets({"owner": {}}), "owner")
+    assert first == second
+    ## só o pet 2 tem um dono que existe em clients.csv
+    assert second["2"] is not first["2"]
+    assert all(second[id] is first[id] for id in first if id != "2")
@@ -0,0 +1,69 @@
+import pytest
+from my_app.services.credentials import Credentials
+from my_app.services.employees import Employees
+from my_app.utils import passwords
+from my_app.utils.throttle import login_throttle
+
+EMPLOYEE = {"name": "Ana", "job_title": "Tosadora", "email": "Ana@Example.com", "password": "segredo"}
+
+
+@pytest.fixture(autouse=True)
+def empty_throttle():
+    login_throttle._store = None
+
+
+@pytest.fixture
+def employee(client, auth):
+    response = client.post("/employees/", json=EMPLOYEE, headers=auth)
+    assert response.status_code == 201
+
+
+def login(client, email: str, password: str = "segredo"):
+    return client.post("/auth/login", json={"email": email, "password": password})
+
+
+def test_login_finds_the_email_without_case(client, employee):
+    response = login(client, "ANA@example.com")
+
+    assert response.status_code == 200
+    assert response.json["access_token"] and response.json["refresh_token"]
+    assert login(client, "ana@example.com", "errada").status_code == 400
+
+
+def test_unknown_emails_do_not_hash(client, monkeypatch):
+    hashes = []
+    monkeypatch.setattr(passwords, "check_password_hash", lambda *args: hashes.append(args) or False)
+
+    assert login(client, "ninguem@example.com").status_code == 400
+    assert hashes == []
+
+
+def test_duplicate_emails_are_rejected(client, auth, employee):
+    response = client.post("/employees/", json={**EMPLOYEE, "email": "ana@example.com"}, headers=auth)
+
+    assert response.status_code == 400
+    assert response.json["message"] == "O e-mail informado já está em uso"
+
+
+def test_email_index_is_rebuilt_only_after_writes(app):
+    employees = Employees()
+    index = employees.handler.get_index("email")
+    assert employees.handler.get_index("email") is index
+
+    employees.create({**EMPLOYEE})
+
+    assert employees.get_by_email("ana@example.com")["name"] == "Ana"
+    assert employees.handler.get_index("email") is not index
+
+
+def test_login_rehashes_passwords_made_with_old_parameters(server, client):
+    with server.app_context():
+        server.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+        Employees().create({**EMPLOYEE})
+        server.config["PASSWORD_HASH_METHOD"] = "scrypt"
+
+    assert login(client, "ana@example.com").status_code == 200
+
+    with server.app_context():
+        id = Employees().get_by_email("ana@example.com")["id"]
+        assert Credentials().get_hash(id).startswith("scrypt:")
@@ -0,0 +1,67 @@
+from my_app.utils.partitioned_handler import PartitionedDataHandler
+
+
+def appointment(scheduled_at: str) -> dict:
+    return {
+        "pet_id": 1, "service_id": 1, "employee_id": 1, "status": "scheduled",
+        "scheduled_at": scheduled_at, "created_at": "2026-01-01 10:00:00.000000",
+    }
+
+
+def partition_ids(handler, key: str):
+    return [row["id"] for row in handler.partition(key).iter_rows()]
+
+
+def test_update_moves_the_row_to_the_partition_of_the_new_month(app):
+    handler = PartitionedDataHandler("appointments")
+    handler.create(appointment("2030-01-31T23:30:00.000000"))
+    id = str(handler.state()["manifest"]["last_id"])
+
+    handler.update({"id": id, "scheduled_at": "2030-02-01T09:00:00.000000"})
+
+    assert id not in partition_ids(handler, "2030-01")
+    assert id in partition_ids(handler, "2030-02")
+    assert handler.state()["ids"][id] == "2030-02"
+    assert handler.get_by_id(id)["scheduled_at"] == "2030-02-01T09:00:00.000000"
+
+    partitions = handler.state()["manifest"]["partitions"]
+    assert partitions["2030-01"]["rows"] == 0
+    assert partitions["2030-02"]["rows"] == 1
+
+
+def test_bulk_update_moves_rows_in_both_directions(app):
+    handler = PartitionedDataHandler("appointments")
+    handler.bulk_create([appointment("2030-03-10T10:00:00.000000"), appointment("2030-04-10T10:00:00.000000")])
+    march, april = partition_ids(handler, "2030-03")[0], partition_ids(handler, "2030-04")[0]
+
+    handler.bulk_update([
+        {"id": march, "scheduled_at": "2030-04-11T10:00:00.000000"},
+        {"id": april, "scheduled_at": "2030-03-11T10:00:00.000000"},
+    ])
+
+    assert partition_ids(handler, "2030-03") == [april]
+    assert partition_ids(handler, "2030-04") == [march]
+    assert {row["id"] for row in handler.iter_rows()} >= {march, april}
+
+
+def test_rebuild_splits_the_legacy_csv_by_month(app):
+    handler = PartitionedDataHandler("appointments")
+    handler.bulk_create([appointment("2030-05-10T10:00:00.000000"), appointment("2030-06-10T10:00:00.000000")])
+    total = len(handler.state()["ids"])
+
+    ## refazer o manifest e o mapa de IDs a partir das partições não muda nada
+    assert handler.rebuild() == total
+    assert len(handler.state()["ids"]) == total
+    assert {"2030-05", "2030-06"} <= set(handler.partitions())
+
+
+def test_range_reads_only_the_partitions_in_the_range(app):
+    handler = PartitionedDataHandler("appointments")
+    handler.bulk_create([appointment(f"2030-{month:02d}-10T10:00:00.000000") for month in (7, 8, 9)])
+
+    assert handler.partitions("2030-08-01", "2030-09-01") == ["2030-08"]
+    rows = handler.list_between("2030-08-01", "2030-09-01")
+    assert [row["scheduled_at"] for row in rows] == ["2030-08-10T10:00:00.000000"]
+
+    criteria = {"criteria": [{"key": "scheduled_at", "operator": "CONTAINS", "value": "2030-09"}]}
+    assert handler.prune_bounds(criteria) == ("2030-09", "2030-09\uffff")
@@ -0,0 +1,21 @@
+from my_app.services.pets import Pets
+from my_app.utils.data_handler import DataHandler
+
+
+def test_owners_are_loaded_once_for_the_whole_list(app, monkeypatch):
+    calls = []
+    get_many = DataHandler.get_many
+    monkeypatch.setattr(DataHandler, "get_many", lambda self, ids: calls.append(self.table) or get_many(self, ids))
+
+    pets = {pet["id"]: pet for pet in Pets().get_relationship(Pets().handler.list_all(), {"owner": {}})}
+
+    assert calls == ["clients"]
+    assert pets["2"]["owner_id"]["name"] == "MARCOS VINICIUS BEZERRA SILVA"
+    ## os pets do instance/ de exemplo que apontam para clientes removidos ficam sem dono
+    assert pets["1"]["owner_id"] is None
+
+
+def test_owner_is_kept_as_id_without_expand(app):
+    pets = {pet["id"]: pet for pet in Pets().get_relationship(Pets().handler.list_all())}
+
+    assert pets["2"]["owner_id"] == "2"
@@ -0,0 +1,31 @@
+from my_app.services.recurrences import Recurrences
+from my_app.utils.intervals import parse_epoch
+
+
+def dates(rule: dict, start: str, end: str):
+    return [date[:10] for date in Recurrences().dates(rule, parse_epoch(start), parse_epoch(end))]
+
+
+def test_monthly_rule_starting_on_the_31st_uses_the_last_day_of_shorter_months(app):
+    rule = {"starts_at": "2027-01-31T10:00:00.000000", "frequency": "monthly"}
+
+    assert dates(rule, "2027-01-01", "2027-06-01") == ["2027-01-31", "2027-02-28", "2027-03-31", "2027-04-30", "2027-05-31"]
+
+
+def test_monthly_rule_in_a_leap_year_and_across_the_year(app):
+    rule = {"starts_at": "2027-01-31T10:00:00.000000", "frequency": "monthly"}
+
+    assert dates(rule, "2027-12-01", "2028-03-01") == ["2027-12-31", "2028-01-31", "2028-02-29"]
+
+
+def test_monthly_rule_with_interval_and_count(app):
+    rule = {"starts_at": "2027-01-31T10:00:00.000000", "frequency": "monthly", "interval": 2, "count": 3}
+
+    assert dates(rule, "2027-01-01", "2028-01-01") == ["2027-01-31", "2027-03-31", "2027-05-31"]
+    assert dates(rule, "2027-04-01", "2028-01-01") == ["2027-05-31"]
+
+
+def test_weekly_window_starts_at_the_first_occurrence_inside_it(app):
+    rule = {"starts_at": "2027-03-01T10:00:00.000000", "frequency": "weekly", "until": "2027-03-22T10:00:00"}
+
+    assert dates(rule, "2027-03-02", "2027-04-01") == ["2027-03-08", "2027-03-15", "2027-03-22"]
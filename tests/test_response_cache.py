@@ -0,0 +1,53 @@
+import pytest
+from my_app.utils.response_cache import response_caches
+
+CLIENT = {"name": "Ana", "phone": "82999990000", "email": "ana@example.com"}
+SERVICE = {"name": "Banho", "description": "Banho e tosa", "value": 50}
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    ## os caches são globais ao processo: cada teste começa sem entradas e sem contadores
+    response_caches.clear()
+
+
+def stats(blueprint: str) -> dict:
+    return response_caches[blueprint].stats()
+
+
+def test_repeated_reads_are_served_from_the_cache(client, auth):
+    first = client.get("/pets/", headers=auth)
+    second = client.get("/pets/", headers=auth)
+
+    assert second.data == first.data
+    assert stats("pets")["misses"] == 1
+    assert stats("pets")["hits"] == 1
+
+
+def test_a_write_to_a_dependency_invalidates_the_cached_responses(client, auth):
+    client.get("/pets/", headers=auth)
+
+    assert client.post("/clients/", json=CLIENT, headers=auth).status_code == 201
+
+    client.get("/pets/", headers=auth)
+    assert stats("pets")["invalidations"] == 1
+    assert stats("pets")["hits"] == 0
+
+
+def test_a_write_to_an_unrelated_table_keeps_the_cached_responses(client, auth):
+    client.get("/pets/", headers=auth)
+
+    assert client.post("/services/", json=SERVICE, headers=auth).status_code == 201
+
+    client.get("/pets/", headers=auth)
+    assert stats("pets")["invalidations"] == 0
+    assert stats("pets")["hits"] == 1
+
+
+def test_the_cached_response_reflects_the_write(client, auth):
+    client.get("/services/", headers=auth)
+
+    client.post("/services/", json=SERVICE, headers=auth)
+
+    response = client.get("/services/", headers=auth)
+    assert [service["name"] for service in response.json["data"]] == ["Banho"]
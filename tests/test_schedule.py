@@ -0,0 +1,47 @@
+import pytest
+from my_app.services.appointments import Appointments
+from my_app.services.schedule import Schedule
+from my_app.services.services import Services
+
+
+@pytest.fixture
+def appointments(app):
+    Services().create({"name": "Banho", "description": "", "value": 10, "duration": 60})
+    return Appointments()
+
+
+def appointment(time: str) -> dict:
+    return {"pet_id": 1, "service_id": 1, "employee_id": 1, "scheduled_at": f"2030-05-02T{time}:00.000000"}
+
+
+def test_back_to_back_appointments_do_not_conflict(appointments):
+    appointments.create(appointment("10:00"))
+    appointments.create(appointment("11:00"))
+    appointments.create(appointment("09:00"))
+
+    with pytest.raises(Exception, match="agendamento neste horário"):
+        appointments.create(appointment("10:59"))
+
+
+def test_conflict_inside_a_batch_reports_the_item_index(appointments):
+    results, applied = appointments.bulk_create([appointment("10:00"), appointment("12:00"), appointment("12:30")], transactional=False)
+
+    assert applied
+    assert results[2]["message"] == "O funcionário já tem um agendamento neste horário (item 1 do lote)"
+
+
+def test_conflict_with_a_saved_appointment_reports_its_id(appointments):
+    appointments.create(appointment("10:00"))
+    id = appointments.handler.state()["manifest"]["last_id"]
+
+    results, _ = appointments.bulk_create([appointment("10:30")])
+
+    assert results[0]["message"] == f"O funcionário já tem um agendamento neste horário (agendamento {id})"
+
+
+def test_unlabeled_reservations(appointments):
+    schedule = Schedule(appointments.handler)
+    schedule.reserve({**appointment("10:00"), "status": "scheduled"})
+
+    with pytest.raises(Exception, match=r"\(outro agendamento criado ao mesmo tempo\)"):
+        schedule.reserve({**appointment("10:30"), "status": "scheduled"})
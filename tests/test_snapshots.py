@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from my_app.services.services import Services
+from my_app.utils.data_handler import DataHandler
+
+SERVICE = {"name": "Banho", "description": "Banho e tosa", "value": 50}
+
+
+def in_other_request(server, fn):
+    """Executa `fn` em outra thread, com o seu próprio contexto (outra requisição)."""
+    def run():
+        with server.app_context():
+            return fn()
+
+    with ThreadPoolExecutor(1) as pool:
+        return pool.submit(run).result(timeout=5)
+
+
+def test_a_request_keeps_reading_the_version_it_pinned(app):
+    handler = DataHandler("services")
+    assert handler.list_all() == []
+
+    in_other_request(app, lambda: Services().create(SERVICE))
+
+    assert handler.list_all() == []
+    assert len(handler.snapshot().rows) == 1
+
+
+def test_a_request_reads_its_own_writes(app):
+    handler = DataHandler("services")
+    assert handler.list_all() == []
+
+    Services().create(SERVICE)
+
+    assert [row["name"] for row in handler.list_all()] == ["Banho"]
+
+
+def test_readers_are_not_blocked_by_a_write_in_progress(app):
+    handler = DataHandler("services")
+    Services().create(SERVICE)
+    writing = threading.Event()
+    release = threading.Event()
+
+    def write():
+        with handler.writing() as base:
+            handler.write_rows([{**row, "name": "Tosa"} for row in base.rows])
+            writing.set()
+            release.wait(5)
+
+    writer = threading.Thread(target=lambda: in_other_request(app, write))
+    writer.start()
+    try:
+        assert writing.wait(5)
+        ## a escrita está com o lock e o csv já foi regravado: a leitura usa o snapshot publicado
+        assert in_other_request(app, lambda: [row["name"] for row in handler.list_all()]) == ["Banho"]
+        assert in_other_request(app, handler.read_version) is None
+    finally:
+        release.set()
+        writer.join()
+
+    assert in_other_request(app, lambda: [row["name"] for row in handler.list_all()]) == ["Tosa"]
+
+
+def test_list_all_returns_copies(app):
+    Services().create(SERVICE)
+    handler = DataHandler("services")
+
+    handler.list_all()[0]["name"] = "Alterado"
+
+    assert handler.list_all()[0]["name"] == "Banho"
+    assert handler.snapshot().rows[0]["name"] == "Banho"
@@ -0,0 +1,41 @@
+import json
+import pytest
+from my_app.utils.streaming import chunked
+
+SERVICES = [{"name": f"Serviço {index}", "description": "Serviço", "value": 10 + index} for index in range(3)]
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+
+@pytest.mark.parametrize("query, headers", [
+    ("?stream=1", {}),
+    ("", {"Accept": "application/x-ndjson"}),
+])
+def test_lists_stream_one_object_per_line(client, auth, query, headers):
+    client.post("/services/bulk", json={"items": SERVICES}, headers=auth)
+
+    response = client.get(f"/services/{query}", headers={**auth, **headers})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["name"] for row in rows] == [service["name"] for service in SERVICES]
+
+
+def test_stream_follows_the_filters(client, auth):
+    client.post("/services/bulk", json={"items": SERVICES}, headers=auth)
+
+    response = client.get("/services/?stream=1&name=Serviço 1", headers=auth)
+
+    assert [json.loads(line)["name"] for line in response.get_data(as_text=True).splitlines()] == ["Serviço 1"]
+
+
+def test_stream_off_returns_the_json_list(client, auth):
+    response = client.get("/services/?stream=0", headers={**auth, "Accept": "application/x-ndjson"})
+
+    assert response.mimetype == "application/json"
+    assert response.json["data"] == []
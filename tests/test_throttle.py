@@ -0,0 +1,49 @@
+import pytest
+from my_app.utils import throttle
+from my_app.utils.throttle import FileBucketStore, MemoryBucketStore, login_throttle
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    ## o limitador é global ao processo: cada teste começa com os baldes cheios
+    login_throttle._store = None
+    yield
+    login_throttle._store = None
+
+
+def login(client, email: str = "ana@example.com"):
+    return client.post("/auth/login", json={"email": email, "password": "errada"})
+
+
+def test_too_many_attempts_for_an_email_get_429_with_retry_after(client):
+    assert [login(client).status_code for _ in range(5)] == [400] * 5
+
+    response = login(client)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 12
+    assert response.json["point"] == "login"
+
+    ## outro email ainda pode tentar
+    assert login(client, "bia@example.com").status_code == 400
+
+
+def test_too_many_attempts_from_an_ip_get_429(server, client):
+    server.config["LOGIN_THROTTLE_IP"] = "3/60"
+
+    statuses = [login(client, f"user{index}@example.com").status_code for index in range(4)]
+    assert statuses == [400, 400, 400, 429]
+
+
+@pytest.mark.parametrize("store", ["memory", "file"])
+def test_buckets_refill_with_time(tmp_path, monkeypatch, store):
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, "time", lambda: now[0])
+    buckets = MemoryBucketStore() if store == "memory" else FileBucketStore(str(tmp_path / "buckets.json"))
+
+    assert buckets.take("ip:1", 2, 10, 1) == 0
+    assert buckets.take("ip:1", 2, 10, 1) == 0
+    assert buckets.take("ip:1", 2, 10, 1) == pytest.approx(5)
+
+    now[0] += 5
+    assert buckets.take("ip:1", 2, 10, 1) == 0
+    assert buckets.take("ip:2", 2, 10, 1) == 0
@@ -0,0 +1,39 @@
+from flask_jwt_extended import decode_token
+from my_app.utils.revocation import RevocationStore
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_refresh_rotates_the_refresh_token(client, tokens):
+    response = client.post("/auth/refresh", headers=bearer(tokens["refresh_token"]))
+    assert response.status_code == 200
+    rotated = response.json
+    assert client.get("/pets/", headers=bearer(rotated["access_token"])).status_code == 200
+
+    ## o refresh token usado foi revogado; o novo continua válido
+    assert client.post("/auth/refresh", headers=bearer(tokens["refresh_token"])).status_code == 401
+    assert client.post("/auth/refresh", headers=bearer(rotated["refresh_token"])).status_code == 200
+
+
+def test_access_tokens_cannot_refresh(client, tokens):
+    assert client.post("/auth/refresh", headers=bearer(tokens["access_token"])).status_code == 422
+
+
+def test_logout_revokes_both_tokens_of_the_pair(client, tokens):
+    assert client.post("/auth/logout", headers=bearer(tokens["access_token"])).status_code == 200
+
+    assert client.get("/pets/", headers=bearer(tokens["access_token"])).status_code == 401
+    assert client.post("/auth/refresh", headers=bearer(tokens["refresh_token"])).status_code == 401
+
+
+def test_revocations_are_shared_through_the_instance_file(server, client, tokens):
+    client.post("/auth/logout", headers=bearer(tokens["refresh_token"]))
+
+    ## outro worker: o mesmo arquivo, outra memória
+    other = RevocationStore()
+    other.init_app(server)
+    with server.app_context():
+        jti = decode_token(tokens["refresh_token"])["jti"]
+    assert other.is_revoked(jti)
@@ -0,0 +1,26 @@
+import json
+
+CSV = "name,description,value\nBanho,Banho e tosa,50\nTosa,,30\nHidratação,Pelos longos,80\n"
+
+
+def test_csv_import_reports_invalid_lines(client, auth):
+    response = client.post("/services/import", data=CSV, content_type="text/csv", headers=auth)
+
+    assert response.status_code == 200
+    assert response.json["imported"] == 2
+    assert response.json["failed"] == 1
+    assert response.json["errors"][0]["line"] == 2
+
+
+def test_export_uses_the_table_columns(client, auth):
+    client.post("/services/import", data=CSV, content_type="text/csv", headers=auth)
+
+    response = client.get("/services/export?format=csv", headers=auth)
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "id,name,description,value,created_at,duration"
+    assert [line.split(",")[1] for line in lines[1:]] == ["Banho", "Hidratação"]
+
+    response = client.get("/services/export", headers={**auth, "Accept": "application/x-ndjson"})
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert set(rows[0]) == {"id", "name", "description", "value", "created_at", "duration"}
+    assert [row["name"] for row in rows] == ["Banho", "Hidratação"]
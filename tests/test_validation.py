@@ -0,0 +1,46 @@
+import pytest
+from marshmallow import ValidationError
+from my_app.schemas.pets import CreatePetSchema, UpdatePetSchema
+from my_app.utils.validate import loadBody
+
+PET = {"name": "Rex", "specie": "Cachorro", "sex": "m", "age": "5", "owner_id": "2"}
+
+
+def test_create_converts_types_and_drops_unknown_fields():
+    assert loadBody(CreatePetSchema(), {**PET, "color": "preto"}) == {**PET, "sex": "M", "age": 5, "owner_id": 2}
+
+
+def test_empty_values_count_as_missing_on_create():
+    with pytest.raises(ValidationError) as error:
+        loadBody(CreatePetSchema(), {**PET, "name": "", "specie": None})
+
+    assert sorted(error.value.messages["missing"]) == ["name", "specie"]
+
+
+def test_invalid_values_are_reported_by_field():
+    with pytest.raises(ValidationError) as error:
+        loadBody(CreatePetSchema(), {**PET, "sex": "x", "age": "velho"})
+
+    assert set(error.value.messages["invalid"]) == {"sex", "age"}
+    assert error.value.messages["invalid"]["age"] == ["Informe um número inteiro."]
+
+
+def test_update_rejects_blocked_fields_and_blanking_required_ones():
+    with pytest.raises(ValidationError) as error:
+        loadBody(UpdatePetSchema(), {"id": 3, "name": "Rex"}, blocked=["id"])
+    assert error.value.messages["blocked"] == ["id"]
+
+    with pytest.raises(ValidationError) as error:
+        loadBody(UpdatePetSchema(), {"name": ""})
+    assert "name" in error.value.messages["invalid"]
+
+
+def test_routes_answer_422_with_the_validation_body(client, auth):
+    response = client.post("/pets/", json={"name": "Rex"}, headers=auth)
+    assert response.status_code == 422
+    assert response.json["success"] is False
+    assert "specie" in response.json["missing"]
+
+    response = client.patch("/pets/2", json={"created_at": "2025-01-01"}, headers=auth)
+    assert response.status_code == 422
+    assert response.json["blocked"] == ["created_at"]
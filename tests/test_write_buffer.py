@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from my_app.utils.data_handler import DataHandler
+from my_app.utils.write_buffer import WriteBuffer
+
+SERVICE = {"name": "Banho", "description": "Banho e tosa", "value": 50, "duration": 60}
+
+
+def test_concurrent_submits_share_one_write_and_keep_their_own_errors():
+    calls = []
+
+    def write(items):
+        calls.append(list(items))
+        return [ValueError(item) if item < 0 else None for item in items]
+
+    buffer = WriteBuffer()
+    start = threading.Barrier(4)
+
+    def submit(item):
+        start.wait()
+        try:
+            buffer.submit(item, 0.05, write)
+            return "ok"
+        except ValueError:
+            return "error"
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(submit, [1, 2, -3, 4]))
+
+    assert results == ["ok", "ok", "error", "ok"]
+    assert len(calls) == 1
+    assert sorted(calls[0]) == [-3, 1, 2, 4]
+
+
+def test_concurrent_creates_are_written_together(server, auth, monkeypatch):
+    server.config["WRITE_BUFFER_WINDOW_MS"] = 50
+    writes = []
+    bulk_create = DataHandler.bulk_create
+    monkeypatch.setattr(DataHandler, "bulk_create", lambda self, items, fsync=None: writes.append(len(items)) or bulk_create(self, items, fsync))
+
+    start = threading.Barrier(8)
+
+    def create(index):
+        start.wait()
+        return server.test_client().post("/services/", json={**SERVICE, "name": f"Serviço {index}"}, headers=auth).status_code
+
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(create, range(8))) == [201] * 8
+
+    assert sum(writes) == 8
+    assert len(writes) < 8
+    services = server.test_client().get("/services/", headers=auth).json["data"]
+    assert sorted(int(service["id"]) for service in services) == list(range(1, 9))
+
+
+def test_creates_in_the_same_window_do_not_book_the_same_slot(server, auth):
+    server.config["WRITE_BUFFER_WINDOW_MS"] = 50
+    client = server.test_client()
+    client.post("/services/", json=SERVICE, headers=auth)
+    appointment = {"pet_id": 1, "service_id": 1, "employee_id": 1, "scheduled_at": "2030-05-02T10:00:00.000000"}
+
+    start = threading.Barrier(2)
+
+    def create(_):
+        start.wait()
+        return server.test_client().post("/appointments/", json=appointment, headers=auth).status_code
+
+    with ThreadPoolExecutor(2) as pool:
+        assert sorted(pool.map(create, range(2))) == [201, 400]